@@ -1,52 +1,119 @@
 from fastapi import Depends, HTTPException, status, Cookie
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 import uuid
-from typing import Optional, Dict
+from typing import Optional
 
 from app.dependencies import get_db
 from app.models.user import User
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.sessions import create_session_store
+from app.core.security import check_password
 
-# Простое хранилище сессий в памяти (для MVP)
-# В реальном проекте лучше использовать Redis или базу данных
-active_sessions: Dict[str, int] = {}
+# Хранилище сессий: в памяти процесса или общее для воркеров (SESSION_BACKEND)
+session_store = create_session_store()
+
+# Короткоживущий кэш текущего пользователя: user_id -> копия User без пароля.
+# Позволяет не делать SELECT по users на каждый аутентифицированный запрос.
+principal_cache = TTLCache(maxsize=settings.PRINCIPAL_CACHE_SIZE, ttl=settings.PRINCIPAL_CACHE_TTL)
 
 security = HTTPBasic()
 
-def authenticate_user(email: str, password: str, db: Session) -> User:
-    """Проверяет email и пароль, возвращает пользователя."""
-    user = db.query(User).filter(User.email == email).first()
-    if not user or user.password != password:  # В MVP простое сравнение, в реальном проекте - bcrypt
+def _find_user_by_email(db: Session, email: str) -> Optional[User]:
+    return db.query(User).filter(User.email == email).first()
+
+def _save_password_hash(db: Session, user: User, password_hash: str):
+    user.password = password_hash
+    db.commit()
+
+async def authenticate_user(email: str, password: str, db: Session) -> Optional[User]:
+    """
+    Проверяет email и пароль, возвращает пользователя.
+
+    Запросы к БД выполняются в threadpool, проверка пароля - в пуле
+    процессов. Пароль в открытом виде или со слабыми параметрами
+    хэширования после успешного входа заменяется новым хэшем.
+    """
+    user = await run_in_threadpool(_find_user_by_email, db, email)
+    if not user:
+        return None
+
+    valid, new_hash = await check_password(password, user.password)
+    if not valid:
         return None
+    if new_hash:
+        await run_in_threadpool(_save_password_hash, db, user, new_hash)
     return user
 
 def create_session_token(user_id: int) -> str:
     """Создаёт новый токен сессии и сохраняет его."""
     token = str(uuid.uuid4())
-    active_sessions[token] = user_id
+    session_store.set(token, user_id)
     return token
 
-def get_current_user(
-    session_token: Optional[str] = Cookie(None, alias="session_token"),
-    db: Session = Depends(get_db)
-) -> User:
-    """Получает текущего пользователя по токену сессии."""
-    if not session_token or session_token not in active_sessions:
+def delete_session(session_token: str):
+    """Удаляет сессию и сбрасывает кэш её пользователя."""
+    user_id = session_store.get(session_token)
+    session_store.delete(session_token)
+    if user_id is not None:
+        invalidate_principal(user_id)
+
+def invalidate_principal(user_id: int):
+    """Сбрасывает закэшированного пользователя (после logout или изменения данных)."""
+    principal_cache.delete(user_id)
+
+def _make_principal(user: User) -> User:
+    """Отсоединённая копия пользователя для кэша (без пароля, только для чтения)."""
+    return User(**{
+        column.key: getattr(user, column.key)
+        for column in User.__table__.columns
+        if column.key != "password"
+    })
+
+def _session_user_id(session_token: Optional[str]) -> int:
+    """id пользователя по токену сессии или 401."""
+    user_id = session_store.get(session_token) if session_token else None
+    if user_id is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Требуется аутентификация",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
-    user_id = active_sessions[session_token]
-    user = db.query(User).filter(User.id == user_id).first()
-    
+    return user_id
+
+def _resolve_principal(session_token: str, user: Optional[User]) -> User:
+    """Положить найденного пользователя в кэш или 401, если он удалён."""
     if not user:
         # Если пользователь удалён, но сессия осталась
-        del active_sessions[session_token]
+        session_store.delete(session_token)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Пользователь не найден",
         )
-    
-    return user 
\ No newline at end of file
+
+    principal = _make_principal(user)
+    principal_cache.set(user.id, principal)
+    return principal
+
+def get_current_user(
+    session_token: Optional[str] = Cookie(None, alias="session_token"),
+    db: Session = Depends(get_db)
+) -> User:
+    """Получает текущего пользователя по токену сессии."""
+    user_id = _session_user_id(session_token)
+
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+
+    user = db.query(User).filter(User.id == user_id).first()
+    return _resolve_principal(session_token, user)
+
+# Изменение или удаление пользователя через ORM сбрасывает его кэш
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_principal_on_change(mapper, connection, target: User):
+    invalidate_principal(target.id)
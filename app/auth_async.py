@@ -0,0 +1,43 @@
+from fastapi import Depends, Cookie
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from app.dependencies import get_async_db
+from app.models.user import User
+from app.auth import principal_cache, _session_user_id, _resolve_principal
+from app.core.security import check_password
+
+# Асинхронные версии функций авторизации (DB_MODE=async).
+# Вынесены в отдельный модуль, чтобы синхронному режиму не требовался greenlet.
+
+
+async def authenticate_user_async(email: str, password: str, db: AsyncSession) -> User:
+    """Проверяет email и пароль (в пуле процессов), при необходимости обновляет хэш."""
+    result = await db.execute(select(User).where(User.email == email))
+    user = result.scalars().first()
+    if not user:
+        return None
+
+    valid, new_hash = await check_password(password, user.password)
+    if not valid:
+        return None
+    if new_hash:
+        user.password = new_hash
+        await db.commit()
+    return user
+
+
+async def get_current_user_async(
+    session_token: Optional[str] = Cookie(None, alias="session_token"),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """Получает текущего пользователя по токену сессии."""
+    user_id = _session_user_id(session_token)
+
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+
+    user = await db.get(User, user_id)
+    return _resolve_principal(session_token, user)
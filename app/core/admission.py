@@ -0,0 +1,274 @@
+import logging
+import math
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import anyio
+from starlette.responses import JSONResponse
+
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Маршруты, которые не ограничиваются (health-check и наблюдение)
+EXEMPT_PREFIXES = ("/ping", "/metrics", "/debug/")
+
+# Метка маршрута в метриках для путей без правил (путь запроса не ограничен по значениям)
+OTHER_ROUTE = "other"
+
+# Потоков для блокирующего хранилища корзин: отдельно от threadpool эндпоинтов,
+# чтобы проверка лимита не ждала занятые обработчики
+STORE_THREADS = 8
+
+
+class Limit(NamedTuple):
+    """Token bucket: rate токенов в секунду, не больше burst."""
+    rate: float
+    burst: float
+
+
+def parse_rules(rules: str) -> Dict[str, Limit]:
+    """
+    Разобрать правила вида "POST /login=1/10,POST /users=0.5/5".
+
+    Returns:
+        "МЕТОД /путь" -> Limit
+    """
+    parsed: Dict[str, Limit] = {}
+    for item in filter(None, (part.strip() for part in rules.split(","))):
+        route, _, limit = item.rpartition("=")
+        rate, _, burst = limit.partition("/")
+        method, _, path = route.strip().partition(" ")
+        parsed[route_key(method, path.strip())] = Limit(float(rate), float(burst or rate))
+    return parsed
+
+
+def route_key(method: str, path: str) -> str:
+    """Ключ маршрута для правил: метод и путь без завершающего '/'."""
+    return f"{method.upper()} {path.rstrip('/') or '/'}"
+
+
+def take_token(tokens: float, updated: float, now: float, limit: Limit) -> Tuple[float, float]:
+    """
+    Пополнить корзину за прошедшее время и взять один токен.
+
+    Returns:
+        (токенов осталось, через сколько секунд повторить; 0 - запрос разрешён)
+    """
+    tokens = min(limit.burst, tokens + max(0.0, now - updated) * limit.rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    # rate=0 - маршрут закрыт, корзина не пополняется
+    return tokens, (1 - tokens) / limit.rate if limit.rate > 0 else 3600.0
+
+
+class RateLimitStore(ABC):
+    """Интерфейс хранилища корзин: ключ -> (токены, время обновления)."""
+
+    # True - acquire() выполняет блокирующий ввод-вывод и вызывается вне event loop
+    blocking = False
+
+    @abstractmethod
+    def acquire(self, key: str, limit: Limit) -> float:
+        """Взять токен из корзины key. 0 - разрешено, иначе через сколько секунд повторить."""
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """
+    Корзины в памяти процесса (LRU).
+
+    Лимиты действуют отдельно в каждом процессе uvicorn. Вытесненная
+    корзина создаётся заново полной - так же, как давно не использованная.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, limit: Limit) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (limit.burst, now))
+            tokens, retry_after = take_token(tokens, updated, now, limit)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+
+class SQLiteRateLimitStore(RateLimitStore):
+    """
+    Общие для нескольких процессов корзины в файле SQLite.
+
+    Чтение и обновление корзины выполняются в одной транзакции
+    BEGIN IMMEDIATE, поэтому воркеры не теряют списания друг друга.
+    Если файл заблокирован дольше BUSY_TIMEOUT, запрос пропускается:
+    ограничение нагрузки не должно само становиться узким местом.
+    """
+
+    blocking = True
+    BUSY_TIMEOUT = 0.1
+    # Как часто удалять давно не использованные корзины (секунды)
+    PURGE_INTERVAL = 60.0
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._last_purge = 0.0
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limits ("
+            "key TEXT PRIMARY KEY, "
+            "tokens REAL NOT NULL, "
+            "updated REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_rate_limits_updated ON rate_limits (updated)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Отдельное соединение на каждый поток."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.BUSY_TIMEOUT, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def acquire(self, key: str, limit: Limit) -> float:
+        now = time.time()
+        conn = self._connection()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT tokens, updated FROM rate_limits WHERE key = ?", (key,)).fetchone()
+                tokens, updated = row if row else (limit.burst, now)
+                tokens, retry_after = take_token(tokens, updated, now, limit)
+                conn.execute(
+                    "INSERT OR REPLACE INTO rate_limits (key, tokens, updated) VALUES (?, ?, ?)",
+                    (key, tokens, now),
+                )
+                if now - self._last_purge >= self.PURGE_INTERVAL:
+                    self._last_purge = now
+                    # Корзина, не использованная дольше часа, заведомо полная
+                    conn.execute("DELETE FROM rate_limits WHERE updated < ?", (now - 3600,))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.OperationalError as e:
+            logger.warning(f"Хранилище лимитов недоступно, запрос пропущен без проверки: {e}")
+            return 0.0
+        return retry_after
+
+
+def create_rate_limit_store() -> RateLimitStore:
+    """Создать хранилище корзин согласно RATE_LIMIT_BACKEND."""
+    if settings.RATE_LIMIT_BACKEND == "sqlite":
+        logger.info(f"Лимиты запросов хранятся в SQLite: {settings.RATE_LIMIT_SQLITE_PATH}")
+        return SQLiteRateLimitStore(settings.RATE_LIMIT_SQLITE_PATH)
+
+    return MemoryRateLimitStore(settings.RATE_LIMIT_MAX_KEYS)
+
+
+def _client_id(scope) -> str:
+    """IP клиента (из X-Forwarded-For, если приложение за доверенным прокси)."""
+    if settings.RATE_LIMIT_TRUST_FORWARDED:
+        for name, value in scope.get("headers", ()):
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def _reject(status_code: int, detail: str, retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        {"detail": detail},
+        status_code=status_code,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware: отклонить запрос до того, как он займёт поток, соединение с БД
+    или отправку в Kafka.
+
+    - token bucket на пару (клиент, маршрут) и на маршрут в целом -> 429;
+    - больше ADMISSION_MAX_CONCURRENCY запросов в обработке -> 503.
+
+    Отказы считаются в метрике admission_rejected_total (маршрут из правил
+    или "other", причина). Блокирующее хранилище (SQLite) опрашивается
+    в отдельных потоках, event loop его не ждёт.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.client_rules = parse_rules(settings.RATE_LIMIT_CLIENT_RULES)
+        self.route_rules = parse_rules(settings.RATE_LIMIT_ROUTE_RULES)
+        self.store: Optional[RateLimitStore] = None
+        self._store_limiter: Optional[anyio.CapacityLimiter] = None
+        self.in_flight = 0
+
+    def _metric_route(self, route: str) -> str:
+        """Маршрут для метки метрики: только маршруты из правил, остальные - "other"."""
+        return route if route in self.client_rules or route in self.route_rules else OTHER_ROUTE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.RATE_LIMIT_ENABLED or scope["path"].startswith(EXEMPT_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        route = route_key(scope["method"], scope["path"])
+        rejection = await self._check_rate(scope, route)
+        if rejection is None and settings.ADMISSION_MAX_CONCURRENCY and self.in_flight >= settings.ADMISSION_MAX_CONCURRENCY:
+            metrics.ADMISSION_REJECTED.inc(self._metric_route(route), "concurrency")
+            rejection = _reject(503, "Сервер перегружен, повторите запрос позже", 1)
+
+        if rejection is not None:
+            await rejection(scope, receive, send)
+            return
+
+        self.in_flight += 1
+        metrics.ADMISSION_IN_FLIGHT.set(self.in_flight)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+            metrics.ADMISSION_IN_FLIGHT.set(self.in_flight)
+
+    async def _acquire(self, key: str, limit: Limit) -> float:
+        if not self.store.blocking:
+            return self.store.acquire(key, limit)
+        if self._store_limiter is None:
+            self._store_limiter = anyio.CapacityLimiter(STORE_THREADS)
+        return await anyio.to_thread.run_sync(self.store.acquire, key, limit, limiter=self._store_limiter)
+
+    async def _check_rate(self, scope, route: str) -> Optional[JSONResponse]:
+        client_limit = self.client_rules.get(route)
+        route_limit = self.route_rules.get(route)
+        if client_limit is None and route_limit is None:
+            return None
+        if self.store is None:
+            # Хранилище SQLite создаёт файл и таблицу - тоже вне event loop
+            self.store = await anyio.to_thread.run_sync(create_rate_limit_store)
+
+        # Сначала лимит клиента: слишком активный клиент не расходует общий лимит маршрута
+        if client_limit is not None:
+            retry_after = await self._acquire(f"client:{_client_id(scope)}:{route}", client_limit)
+            if retry_after:
+                metrics.ADMISSION_REJECTED.inc(route, "client_rate")
+                return _reject(429, "Слишком много запросов, повторите позже", retry_after)
+        if route_limit is not None:
+            retry_after = await self._acquire(f"route:{route}", route_limit)
+            if retry_after:
+                metrics.ADMISSION_REJECTED.inc(route, "route_rate")
+                return _reject(429, "Слишком много запросов к маршруту, повторите позже", retry_after)
+        return None
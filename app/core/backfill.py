@@ -0,0 +1,239 @@
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.database import ReadSessionLocal
+from app.core.event_bus import BusItem, EventBus, get_event_bus
+from app.models.course import Course
+from app.models.user import User
+from app.schemas.events import CourseCreatedEvent, UserCreatedEvent
+
+logger = logging.getLogger(__name__)
+
+# Пространство имён для event_id событий backfill: id зависит только от
+# топика, id строки и run_id, поэтому события, повторно отправленные после
+# прерванного запуска, consumers с дедупликацией отбрасывают
+BACKFILL_NAMESPACE = uuid.UUID("5b0f3c6e-9a41-4d8e-8f7a-2c1d6e4b9a30")
+
+# Как часто писать прогресс в лог (секунды)
+PROGRESS_INTERVAL = 5.0
+
+# Поле-признак повтора (backfill с mark_replay): проекции, которые уже учли
+# исходное событие (статистика), такие события пропускают
+REPLAY_FIELD = "replay"
+
+
+def _user_event(row, timestamp: str, run_id: str = "") -> Dict[str, Any]:
+    return UserCreatedEvent(
+        event_id=backfill_event_id(settings.KAFKA_TOPIC_USER_EVENTS, row.id, run_id),
+        user_id=row.id,
+        email=row.email,
+        name=row.name,
+        age=row.age,
+        is_admin=row.is_admin,
+        timestamp=timestamp
+    ).dict()
+
+
+def _course_event(row, timestamp: str, run_id: str = "") -> Dict[str, Any]:
+    return CourseCreatedEvent(
+        event_id=backfill_event_id(settings.KAFKA_TOPIC_COURSE_EVENTS, row.id, run_id),
+        course_id=row.id,
+        title=row.title,
+        price=float(row.price),
+        created_by=0,  # автор курса в таблице не хранится
+        timestamp=timestamp
+    ).dict()
+
+
+# Сущность -> (колонки, топик, построение события)
+ENTITIES: Dict[str, Tuple[tuple, Callable[[], str], Callable[[Any, str, str], Dict[str, Any]]]] = {
+    "users": (
+        (User.id, User.email, User.name, User.age, User.is_admin),
+        lambda: settings.KAFKA_TOPIC_USER_EVENTS,
+        _user_event,
+    ),
+    "courses": (
+        (Course.id, Course.title, Course.price),
+        lambda: settings.KAFKA_TOPIC_COURSE_EVENTS,
+        _course_event,
+    ),
+}
+
+
+def backfill_event_id(topic: str, row_id: int, run_id: str = "") -> str:
+    """
+    Детерминированный event_id события backfill для строки row_id.
+
+    run_id меняет все id: повторный запуск с новым run_id не отбрасывается
+    дедупликацией consumers как повтор предыдущего.
+    """
+    name = f"{run_id}:{topic}:{row_id}" if run_id else f"{topic}:{row_id}"
+    return uuid.uuid5(BACKFILL_NAMESPACE, name).hex
+
+
+def load_checkpoint(path: str) -> Dict[str, int]:
+    """Последние отправленные id по сущностям (пусто, если файла нет)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_checkpoint(path: str, checkpoint: Dict[str, int]):
+    """Сохранить checkpoint атомарно (через временный файл)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+class Backfill:
+    """
+    Повторная отправка событий created по строкам таблиц users и courses.
+
+    - строки читаются по возрастанию id с серверного курсора (yield_per),
+      в памяти одновременно только одна пачка;
+    - с mark_replay события помечены replay=True, и счётчики /stats их
+      не учитывают (исходные события уже посчитаны); без него backfill
+      заново строит /stats после потери топика или сброса проекции;
+    - run_id - новые event_id для намеренного повторного запуска:
+      с прежними id consumers отбросили бы события как уже обработанные
+      (в пределах окна дедупликации); позиция запуска хранится отдельно;
+    - пачка отправляется целиком (publish_batch) через шину for_bulk -
+      для Kafka это отдельный producer со сжатием и крупными батчами;
+    - после доставки пачки её последний id сохраняется в checkpoint,
+      поэтому прерванный запуск продолжается со следующей строки;
+    - rate ограничивает скорость отправки (событий в секунду, 0 - без ограничения).
+    """
+
+    def __init__(
+        self,
+        bus: EventBus,
+        checkpoint_path: str,
+        batch_size: int = settings.BACKFILL_BATCH_SIZE,
+        rate: float = settings.BACKFILL_RATE,
+        mark_replay: bool = False,
+        run_id: str = "",
+    ):
+        self.bus = bus
+        self.checkpoint_path = checkpoint_path
+        self.batch_size = batch_size
+        self.rate = rate
+        self.mark_replay = mark_replay
+        self.run_id = run_id
+        self.checkpoint = load_checkpoint(checkpoint_path)
+
+    def _checkpoint_key(self, entity: str) -> str:
+        return f"{entity}@{self.run_id}" if self.run_id else entity
+
+    def _build_item(self, topic: str, build_event, row, timestamp: str) -> BusItem:
+        event = build_event(row, timestamp, self.run_id)
+        if self.mark_replay:
+            event[REPLAY_FIELD] = True
+        return topic, event, str(row.id)
+
+    def _throttle(self, sent: int, started: float):
+        """Подождать, пока средняя скорость не опустится до rate."""
+        if self.rate > 0:
+            delay = sent / self.rate - (time.perf_counter() - started)
+            if delay > 0:
+                time.sleep(delay)
+
+    def run_entity(self, entity: str) -> int:
+        """
+        Отправить события по всем строкам сущности после checkpoint.
+
+        Returns:
+            Количество отправленных событий
+
+        Raises:
+            RuntimeError: шина не приняла пачку (checkpoint - на последней доставленной)
+        """
+        columns, topic_of, build_event = ENTITIES[entity]
+        topic = topic_of()
+        model_id = columns[0]
+        checkpoint_key = self._checkpoint_key(entity)
+        last_id = self.checkpoint.get(checkpoint_key, 0)
+        if last_id:
+            logger.info(f"{entity}: продолжение после id={last_id}")
+
+        stmt = (
+            select(*columns)
+            .where(model_id > last_id)
+            .order_by(model_id)
+            .execution_options(yield_per=self.batch_size)
+        )
+        sent = 0
+        started = reported = time.perf_counter()
+        db = ReadSessionLocal()
+        try:
+            for rows in db.execute(stmt).partitions():
+                timestamp = datetime.now().isoformat()
+                items: List[BusItem] = [self._build_item(topic, build_event, row, timestamp) for row in rows]
+                delivered = self.bus.publish_batch(items)
+                if delivered:
+                    sent += delivered
+                    self.checkpoint[checkpoint_key] = rows[delivered - 1].id
+                    save_checkpoint(self.checkpoint_path, self.checkpoint)
+                if delivered < len(items):
+                    raise RuntimeError(
+                        f"{entity}: шина не приняла события, отправлено {sent}, "
+                        f"checkpoint id={self.checkpoint.get(checkpoint_key, 0)}"
+                    )
+
+                now = time.perf_counter()
+                if now - reported >= PROGRESS_INTERVAL:
+                    reported = now
+                    logger.info(f"{entity}: отправлено {sent} событий, {sent / (now - started):.0f} строк/с")
+                self._throttle(sent, started)
+        finally:
+            db.close()
+
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        logger.info(
+            f"✅ {entity}: отправлено {sent} событий в '{topic}' за {elapsed:.1f} с "
+            f"({sent / elapsed:.0f} строк/с)"
+        )
+        return sent
+
+    def run(self, entities: List[str]) -> Dict[str, int]:
+        """Отправить события по сущностям по очереди."""
+        return {entity: self.run_entity(entity) for entity in entities}
+
+
+def run_backfill(
+    entities: List[str],
+    checkpoint_path: str = settings.BACKFILL_CHECKPOINT_PATH,
+    batch_size: int = settings.BACKFILL_BATCH_SIZE,
+    rate: float = settings.BACKFILL_RATE,
+    restart: bool = False,
+    mark_replay: bool = False,
+    run_id: str = "",
+) -> Dict[str, int]:
+    """
+    Выполнить backfill сущностей entities ("users", "courses").
+
+    restart=True удаляет checkpoint и начинает с первой строки.
+    mark_replay и run_id - см. Backfill.
+    """
+    if restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    bus = get_event_bus().for_bulk(settings.BACKFILL_COMPRESSION, settings.BACKFILL_BATCH_BYTES)
+    try:
+        return Backfill(
+            bus, checkpoint_path, batch_size=batch_size, rate=rate, mark_replay=mark_replay, run_id=run_id,
+        ).run(entities)
+    finally:
+        bus.flush()
+        if bus is not get_event_bus():
+            bus.close()
@@ -0,0 +1,87 @@
+import json
+from typing import Any, AsyncIterator, List, Tuple, Type
+
+from fastapi import HTTPException, Request, status
+from pydantic import BaseModel, ValidationError
+
+from app.core.config import settings
+
+# Типы содержимого, которые читаются построчно (NDJSON)
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+# Строка импорта: (номер строки, валидные данные или None, текст ошибки или None)
+BulkRow = Tuple[int, Any, str | None]
+
+
+def _format_validation_error(error: ValidationError) -> str:
+    """Короткое описание ошибок валидации для сводки импорта."""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}"
+        for err in error.errors()
+    )
+
+
+def _validate(row_no: int, raw: Any, schema: Type[BaseModel]) -> BulkRow:
+    if not isinstance(raw, dict):
+        return row_no, None, "Ожидается JSON-объект"
+    try:
+        return row_no, schema(**raw), None
+    except ValidationError as e:
+        return row_no, None, _format_validation_error(e)
+
+
+async def _iter_raw_rows(request: Request) -> AsyncIterator[Tuple[int, Any, str | None]]:
+    """Прочитать строки из JSON-массива или потокового NDJSON."""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+
+    if content_type in NDJSON_CONTENT_TYPES:
+        # NDJSON читаем по мере поступления, не загружая тело целиком
+        row_no = 0
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield _parse_line(row_no, line)
+                    row_no += 1
+        if buffer.strip():
+            yield _parse_line(row_no, buffer)
+        return
+
+    try:
+        payload = await request.json()
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректный JSON"
+        )
+    if not isinstance(payload, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ожидается JSON-массив или NDJSON"
+        )
+    for row_no, raw in enumerate(payload):
+        yield row_no, raw, None
+
+
+def _parse_line(row_no: int, line: bytes) -> Tuple[int, Any, str | None]:
+    try:
+        return row_no, json.loads(line), None
+    except ValueError:
+        return row_no, None, "Некорректный JSON"
+
+
+async def iter_row_chunks(request: Request, schema: Type[BaseModel]) -> AsyncIterator[List[BulkRow]]:
+    """
+    Прочитать и провалидировать строки импорта, отдавая их пачками
+    по BULK_CHUNK_SIZE (каждая пачка вставляется отдельной транзакцией).
+    """
+    chunk: List[BulkRow] = []
+    async for row_no, raw, error in _iter_raw_rows(request):
+        chunk.append((row_no, None, error) if error else _validate(row_no, raw, schema))
+        if len(chunk) >= settings.BULK_CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
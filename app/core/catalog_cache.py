@@ -0,0 +1,96 @@
+import hashlib
+import threading
+from typing import Any, Dict, Hashable, NamedTuple, Optional
+
+from fastapi import Request, Response, status
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.codecs import json_dumps
+
+
+class CachedResponse(NamedTuple):
+    """Готовый JSON-ответ каталога вместе с его ETag."""
+    etag: str
+    body: bytes
+    headers: Dict[str, str]
+
+
+# Read-through кэш каталога курсов: отдельные курсы и страницы списка
+_cache = TTLCache(maxsize=settings.CATALOG_CACHE_SIZE, ttl=settings.CATALOG_CACHE_TTL)
+
+# Поколение списков: при изменении каталога увеличивается, и все
+# закэшированные страницы списка становятся недостижимыми
+_generation = 0
+_lock = threading.Lock()
+
+
+def course_key(course_id: int) -> Hashable:
+    return ("course", course_id)
+
+
+def list_key(*params: Any) -> Hashable:
+    return ("list", _generation, params)
+
+
+def total_key(*filters: Any) -> Hashable:
+    return ("total", _generation, filters)
+
+
+def get(key: Hashable) -> Optional[CachedResponse]:
+    """Получить закэшированный ответ (None, если его нет или он устарел)."""
+    return _cache.get(key)
+
+
+def put(key: Hashable, content: Any, headers: Optional[Dict[str, str]] = None) -> CachedResponse:
+    """Сериализовать ответ, вычислить ETag и сохранить в кэш."""
+    body = json_dumps(content)
+    etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    entry = CachedResponse(etag=etag, body=body, headers=headers or {})
+    _cache.set(key, entry)
+    return entry
+
+
+def get_total(key: Hashable) -> Optional[int]:
+    """Закэшированное количество курсов под фильтры (None, если нет)."""
+    return _cache.get(key)
+
+
+def put_total(key: Hashable, total: int):
+    """Сохранить количество курсов; сбрасывается вместе со страницами списка."""
+    _cache.set(key, total)
+
+
+def invalidate_course(course_id: int | None = None, lists: bool = True):
+    """
+    Сбросить курс (если указан), все страницы списка курсов и их количество.
+
+    lists=False сбрасывает только сам курс: для частых изменений (записи
+    на курс), при которых страницы списка могут отставать до CATALOG_CACHE_TTL.
+    """
+    global _generation
+
+    if course_id is not None:
+        _cache.delete(course_key(course_id))
+    if not lists:
+        return
+    with _lock:
+        _generation += 1
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates
+
+
+def respond(request: Request, entry: CachedResponse) -> Response:
+    """Ответ из кэша: 304, если у клиента актуальная версия, иначе 200 с телом."""
+    headers = {"ETag": entry.etag, **entry.headers}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, entry.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(content=entry.body, media_type="application/json", headers=headers)
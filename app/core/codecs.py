@@ -0,0 +1,220 @@
+import json
+import struct
+from abc import ABC, abstractmethod
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+
+from fastapi import Response
+from pydantic import BaseModel
+
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:  # orjson - необязательная зависимость
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """Типы, которые JSON не умеет сериализовать сам (как в pydantic mode="json")."""
+    if isinstance(value, Decimal):
+        return str(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Объект типа {type(value).__name__} не сериализуется в JSON")
+
+
+if orjson is not None:
+    def json_dumps(obj: Any) -> bytes:
+        """Сериализовать в компактный JSON (UTF-8)."""
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+    json_loads = orjson.loads
+else:
+    def json_dumps(obj: Any) -> bytes:
+        """Сериализовать в компактный JSON (UTF-8)."""
+        return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    json_loads = json.loads
+
+
+class Codec(ABC):
+    """Кодек событий Kafka: dict <-> bytes."""
+
+    name: str
+
+    @abstractmethod
+    def encode(self, event: Dict[str, Any]) -> bytes:
+        """Сериализовать событие."""
+
+    @abstractmethod
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        """Десериализовать событие."""
+
+
+class JsonCodec(Codec):
+    """JSON (orjson, если установлен, иначе стандартный json)."""
+
+    name = "json"
+
+    def encode(self, event: Dict[str, Any]) -> bytes:
+        return json_dumps(event)
+
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        return json_loads(data)
+
+
+# Заголовок бинарного формата: магические байты, версия формата,
+# id схемы события и версия схемы
+MAGIC = b"\xceV"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct(">2sBBB")
+
+# Типы полей: q - int64, i - int32, ? - bool, d - double, s - строка UTF-8
+# (uint32 длина + байты). Раскладку опубликованной версии схемы менять нельзя:
+# новое поле - новая версия схемы, старые версии остаются для чтения.
+EVENT_SCHEMAS: Dict[Tuple[int, int], Tuple[str, Tuple[Tuple[str, str], ...]]] = {
+    (1, 1): ("user.created", (
+        ("user_id", "q"), ("age", "i"), ("is_admin", "?"),
+        ("email", "s"), ("name", "s"), ("timestamp", "s"),
+    )),
+    (2, 1): ("user.logged_in", (
+        ("user_id", "q"),
+        ("email", "s"), ("timestamp", "s"),
+    )),
+    (3, 1): ("course.created", (
+        ("course_id", "q"), ("price", "d"), ("created_by", "q"),
+        ("title", "s"), ("timestamp", "s"),
+    )),
+    # Версия 2: добавлен event_id (версия 1 остаётся для чтения старых сообщений)
+    (1, 2): ("user.created", (
+        ("user_id", "q"), ("age", "i"), ("is_admin", "?"),
+        ("email", "s"), ("name", "s"), ("timestamp", "s"), ("event_id", "s"),
+    )),
+    (2, 2): ("user.logged_in", (
+        ("user_id", "q"),
+        ("email", "s"), ("timestamp", "s"), ("event_id", "s"),
+    )),
+    (3, 2): ("course.created", (
+        ("course_id", "q"), ("price", "d"), ("created_by", "q"),
+        ("title", "s"), ("timestamp", "s"), ("event_id", "s"),
+    )),
+    (4, 2): ("course.enrolled", (
+        ("course_id", "q"), ("user_id", "q"),
+        ("timestamp", "s"), ("event_id", "s"),
+    )),
+}
+
+_LENGTH = struct.Struct(">I")
+
+
+class _Layout:
+    """Скомпилированная раскладка схемы: фиксированная часть + строки."""
+
+    def __init__(self, schema_id: int, version: int, event_type: str, fields: Tuple[Tuple[str, str], ...]):
+        self.header = _HEADER.pack(MAGIC, FORMAT_VERSION, schema_id, version)
+        self.event_type = event_type
+        self.fixed_names = [name for name, kind in fields if kind != "s"]
+        self.string_names = [name for name, kind in fields if kind == "s"]
+        self.fixed = struct.Struct(">" + "".join(kind for _, kind in fields if kind != "s"))
+
+
+_layouts: Dict[Tuple[int, int], _Layout] = {
+    key: _Layout(key[0], key[1], event_type, fields)
+    for key, (event_type, fields) in EVENT_SCHEMAS.items()
+}
+
+# Для записи используется последняя версия схемы с тем же числом полей,
+# что и у события (события без event_id пишутся версией 1)
+_writers: Dict[Tuple[str, int], _Layout] = {}
+for _key in sorted(_layouts):
+    _layout = _layouts[_key]
+    _writers[(_layout.event_type, len(_layout.fixed_names) + len(_layout.string_names) + 1)] = _layout
+
+
+class BinaryEventCodec(Codec):
+    """
+    Компактный бинарный формат для событий из app.schemas.events.
+
+    События без схемы (или с лишними/недостающими полями) пишутся
+    в JSON; decode различает форматы по магическим байтам, поэтому
+    в топике могут лежать сообщения обоих форматов.
+    """
+
+    name = "binary"
+
+    def encode(self, event: Dict[str, Any]) -> bytes:
+        layout = _writers.get((event.get("event_type"), len(event)))
+        if layout is None:
+            return json_dumps(event)
+        try:
+            parts = [layout.header, layout.fixed.pack(*[event[name] for name in layout.fixed_names])]
+            for name in layout.string_names:
+                value = event[name].encode("utf-8")
+                parts.append(_LENGTH.pack(len(value)))
+                parts.append(value)
+        except (KeyError, AttributeError, struct.error):
+            return json_dumps(event)
+        return b"".join(parts)
+
+    def decode(self, data: bytes) -> Dict[str, Any]:
+        if not data.startswith(MAGIC):
+            return json_loads(data)
+
+        _, format_version, schema_id, version = _HEADER.unpack_from(data)
+        layout = _layouts.get((schema_id, version))
+        if format_version != FORMAT_VERSION or layout is None:
+            raise ValueError(f"Неизвестная схема события: {schema_id} v{version} (формат {format_version})")
+
+        event: Dict[str, Any] = {"event_type": layout.event_type}
+        offset = _HEADER.size
+        event.update(zip(layout.fixed_names, layout.fixed.unpack_from(data, offset)))
+        offset += layout.fixed.size
+        for name in layout.string_names:
+            (length,) = _LENGTH.unpack_from(data, offset)
+            offset += _LENGTH.size
+            event[name] = data[offset:offset + length].decode("utf-8")
+            offset += length
+        return event
+
+
+CODECS: Dict[str, Codec] = {codec.name: codec for codec in (JsonCodec(), BinaryEventCodec())}
+
+
+def get_codec(name: Optional[str] = None) -> Codec:
+    """Кодек по имени (по умолчанию - KAFKA_CODEC из настроек)."""
+    name = name or settings.KAFKA_CODEC
+    if name not in CODECS:
+        raise ValueError(f"Неизвестный кодек '{name}', доступны: {', '.join(CODECS)}")
+    return CODECS[name]
+
+
+def encode_event(event: Dict[str, Any]) -> bytes:
+    """Сериализовать событие кодеком из настроек (value_serializer producer'а)."""
+    return get_codec().encode(event)
+
+
+def decode_event(data: bytes) -> Dict[str, Any]:
+    """
+    Десериализовать событие (value_deserializer consumer'а).
+
+    Формат определяется по содержимому, поэтому consumer читает
+    и JSON, и бинарные сообщения независимо от KAFKA_CODEC.
+    """
+    return CODECS["binary"].decode(data)
+
+
+def serialize_rows(rows: Iterable[Any], schema: Type[BaseModel]) -> List[Dict[str, Any]]:
+    """
+    ORM-объекты -> словари с полями схемы ответа, без валидации pydantic.
+
+    Используется для списков: строки из БД уже соответствуют схеме,
+    повторная проверка каждой строки только тратит время.
+    """
+    fields = tuple(schema.model_fields)
+    return [{name: getattr(row, name) for name in fields} for row in rows]
+
+
+def fast_json_response(content: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    """JSON-ответ, сериализованный json_dumps (минуя jsonable_encoder FastAPI)."""
+    return Response(content=json_dumps(content), media_type="application/json", headers=headers)
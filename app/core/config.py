@@ -9,11 +9,146 @@ class Settings(BaseSettings):
     DB_URL: str = os.getenv("DB_URL", "sqlite:///./test.db")
     SECRET_KEY: str = os.getenv("SECRET_KEY", "dev-secret")
     
+    # Режим работы с БД: "sync" - Session в threadpool, "async" - AsyncSession
+    # (нужен aiosqlite для SQLite или aiomysql для MySQL)
+    DB_MODE: str = "sync"
+    
+    # Реплика для чтения (GET-эндпоинты); пусто - читаем с основной БД
+    DB_READ_URL: str = ""
+    
+    # Пул соединений
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0           # ожидание свободного соединения (секунды)
+    DB_POOL_RECYCLE: int = 1800             # пересоздавать соединения старше N секунд
+    DB_POOL_PRE_PING: bool = False          # проверка соединения перед выдачей (лишний round trip)
+    
+    # Настройки SQLite для параллельного чтения
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    
     # Настройки Kafka
     KAFKA_BOOTSTRAP_SERVERS: str = "localhost:9092"
     KAFKA_TOPIC_USER_EVENTS: str = "user-events"
     KAFKA_TOPIC_COURSE_EVENTS: str = "course-events"
     
+    # Режим отправки событий: "sync" - ждём подтверждения брокера,
+    # "async" - кладём событие в очередь и сразу возвращаем управление
+    KAFKA_PRODUCER_MODE: str = "async"
+    KAFKA_QUEUE_MAXSIZE: int = 10000        # размер очереди событий в памяти
+    KAFKA_OVERFLOW_POLICY: str = "block"    # block | drop | spill
+    KAFKA_ENQUEUE_TIMEOUT: float = 0.5      # сколько ждать места в очереди (block)
+    KAFKA_SPILL_PATH: str = "./kafka_spill.jsonl"  # файл для policy=spill
+    KAFKA_LINGER_MS: int = 5                # задержка для накопления батча
+    KAFKA_BATCH_SIZE: int = 65536           # размер батча в байтах
+    KAFKA_COMPRESSION_TYPE: str = ""        # gzip | snappy | lz4 | zstd | "" (без сжатия)
+    KAFKA_CODEC: str = "json"               # json | binary (компактный формат событий)
+    KAFKA_MAX_IN_FLIGHT: int = 1            # 1 - порядок гарантирован при ретраях
+    KAFKA_SEND_TIMEOUT: float = 10.0        # таймаут подтверждения в режиме sync
+    
+    # Шина событий: kafka | inprocess (в памяти процесса, без брокера) | log (локальный журнал)
+    EVENT_BUS_BACKEND: str = "kafka"
+    EVENT_BUS_QUEUE_SIZE: int = 10000       # очередь подписчика шины inprocess
+    EVENT_LOG_DIR: str = "./event_log"      # каталог журналов шины log
+    EVENT_LOG_FSYNC: bool = False           # fsync после каждой записи в журнал
+    
+    # Consumers: чтение пачками и параллельная обработка
+    CONSUMER_WORKERS: int = 4               # потоков-обработчиков на топик
+    CONSUMER_MAX_POLL_RECORDS: int = 500    # сообщений в пачке
+    CONSUMER_POLL_TIMEOUT_MS: int = 1000
+    CONSUMER_MAX_BATCH_RETRIES: int = 5     # повторов пачки при ошибке обработчика
+    CONSUMER_RETRY_BACKOFF: float = 0.5     # начальная пауза между повторами (секунды)
+    CONSUMER_COMMIT_INTERVAL: float = 1.0   # секунды между коммитами offset'ов (и сбросом буферов обработчиков)
+
+    # Идемпотентная обработка: индекс уже обработанных event_id за окно времени
+    DEDUP_ENABLED: bool = True
+    DEDUP_DIR: str = "./dedup"              # файлы индекса (по consumer'у и топику)
+    DEDUP_WINDOW_SECONDS: float = 86400.0   # сколько помнить event_id (секунды)
+    DEDUP_GENERATIONS: int = 24             # поколений в окне (старые удаляются целиком)
+    DEDUP_MAX_IDS: int = 2000000            # лимит id в памяти на индекс
+    # События, не обработанные после CONSUMER_MAX_BATCH_RETRIES, уходят в <топик><DLQ_SUFFIX>
+    DLQ_SUFFIX: str = ".dlq"
+
+    # Процесс consumers (python -m app.worker)
+    RUN_CONSUMERS_IN_WEB: bool = False      # запускать обработчики событий в веб-процессе
+    CATALOG_CACHE_EVENTS: bool = True       # сбрасывать кэш каталога по событиям (в каждом веб-процессе)
+    WORKER_PROCESSES: int = 0               # процессов воркера (0 - по числу партиций)
+    WORKER_METRICS_PORT: int = 0            # порт /metrics воркера (процесс i - порт + i, 0 - выкл.)
+    
+    # Статистика (GET /stats), считается по событиям Kafka
+    STATS_ENABLED: bool = True
+    STATS_STORE_PATH: str = "./stats_projection.json"
+    STATS_CHECKPOINT_INTERVAL: float = 5.0  # секунды между сохранениями состояния
+    STATS_HOURLY_RETENTION: int = 168       # сколько часовых интервалов хранить (7 дней)
+    STATS_PRICE_BUCKETS: str = "0,10,50,100,500,1000"  # границы гистограммы цен
+    STATS_PARTITIONS_REFRESH_INTERVAL: float = 30.0  # как часто проверять новые топики/партиции (секунды)
+    
+    # Метрики Prometheus (GET /metrics)
+    METRICS_ENABLED: bool = True
+    
+    # Transactional outbox: события пишутся в БД вместе с данными,
+    # фоновый relay пересылает их в Kafka
+    OUTBOX_RELAY_ENABLED: bool = True       # запускать relay в этом процессе
+    OUTBOX_BATCH_SIZE: int = 1000           # событий за одну пересылку
+    OUTBOX_POLL_INTERVAL: float = 0.5       # пауза, когда outbox пуст (секунды)
+    OUTBOX_RETENTION_SECONDS: int = 3600    # сколько хранить доставленные события
+    OUTBOX_PRUNE_INTERVAL: float = 60.0     # как часто чистить outbox (секунды)
+    OUTBOX_LEASE_SECONDS: float = 30.0      # аренда relay (больше KAFKA_SEND_TIMEOUT)
+    
+    # Сессии и кэш текущего пользователя
+    SESSION_BACKEND: str = "memory"         # memory | sqlite (общее для воркеров)
+    SESSION_TTL_SECONDS: int = 3600 * 24 * 7  # 7 дней
+    SESSION_MAX_ENTRIES: int = 100000       # лимит сессий для backend=memory
+    SESSION_SQLITE_PATH: str = "./sessions.db"
+    PRINCIPAL_CACHE_TTL: float = 30.0       # сколько кэшировать пользователя (секунды)
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    
+    # Ограничение нагрузки: token bucket на клиента и на маршрут, лимит одновременных запросов.
+    # Правила: "МЕТОД /путь=запросов_в_секунду/burst" через запятую.
+    # За прокси/балансировщиком включайте вместе с RATE_LIMIT_TRUST_FORWARDED,
+    # иначе все клиенты попадут в одну корзину (адрес прокси)
+    RATE_LIMIT_ENABLED: bool = False
+    RATE_LIMIT_BACKEND: str = "memory"      # memory | sqlite (общие счётчики для воркеров)
+    RATE_LIMIT_SQLITE_PATH: str = "./rate_limits.db"
+    RATE_LIMIT_MAX_KEYS: int = 100000       # лимит корзин для backend=memory
+    RATE_LIMIT_CLIENT_RULES: str = (
+        "POST /login=1/10,POST /users=1/10,POST /users/bulk=0.2/2,"
+        "POST /courses=2/20,POST /courses/bulk=0.2/2"
+    )
+    RATE_LIMIT_ROUTE_RULES: str = "POST /login=200/400,POST /users=100/200"
+    RATE_LIMIT_TRUST_FORWARDED: bool = False  # клиент из X-Forwarded-For (за прокси)
+    ADMISSION_MAX_CONCURRENCY: int = 256    # одновременных запросов на процесс (0 - без лимита)
+
+    # Хэширование паролей (scrypt) в отдельном пуле процессов
+    PASSWORD_HASH_WORKERS: int = 2          # процессов в пуле (0 - без пула, в threadpool)
+    PASSWORD_SCRYPT_N: int = 16384          # стоимость по CPU/памяти (степень двойки)
+    PASSWORD_SCRYPT_R: int = 8              # размер блока
+    PASSWORD_SCRYPT_P: int = 1              # параллелизм
+    
+    # Массовый импорт: строк в одной транзакции
+    BULK_CHUNK_SIZE: int = 1000
+    
+    # Пагинация списков: наибольший limit страницы
+    PAGE_MAX_LIMIT: int = 1000
+    
+    # Выборка по списку id (GET /users?ids=, GET /courses?ids=)
+    MULTI_GET_MAX_IDS: int = 1000
+    
+    # Потоковый экспорт: строк за одну выборку с серверного курсора
+    EXPORT_BATCH_SIZE: int = 1000
+    
+    # Backfill событий created из таблиц (python -m app.manage backfill)
+    BACKFILL_BATCH_SIZE: int = 5000         # строк за одну выборку и отправку
+    BACKFILL_RATE: float = 0.0              # событий в секунду (0 - без ограничения)
+    BACKFILL_COMPRESSION: str = "gzip"      # сжатие отдельного producer'а Kafka
+    BACKFILL_BATCH_BYTES: int = 1048576     # размер батча producer'а в байтах
+    BACKFILL_CHECKPOINT_PATH: str = "./backfill_checkpoint.json"
+    
+    # Кэш каталога курсов (GET /courses, GET /courses/{id})
+    CATALOG_CACHE_SIZE: int = 1024          # записей (курсов и страниц списка)
+    CATALOG_CACHE_TTL: float = 60.0         # секунд
+    
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
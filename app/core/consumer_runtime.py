@@ -0,0 +1,392 @@
+import logging
+import threading
+import time
+import zlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.core import metrics
+from app.core.dedup import SeenIndex
+from app.core.event_bus import get_event_bus
+
+logger = logging.getLogger(__name__)
+
+EventHandler = Callable[[Dict[str, Any]], None]
+
+# Реестр обработчиков: event_type -> обработчики в порядке регистрации
+_handlers: Dict[str, List[EventHandler]] = defaultdict(list)
+
+# Функции, которые сохраняют накопленные обработчиками изменения перед коммитом
+# offset'ов: топик -> функции в порядке регистрации
+_commit_hooks: Dict[str, List[Callable[[], None]]] = defaultdict(list)
+
+
+def handler(event_type: str):
+    """
+    Зарегистрировать обработчик события.
+
+    Пример:
+        @handler('user.created')
+        def send_welcome_email(event): ...
+    """
+    def decorator(func: EventHandler) -> EventHandler:
+        _handlers[event_type].append(func)
+        return func
+    return decorator
+
+
+def before_commit(topic: str):
+    """
+    Зарегистрировать функцию, которая вызывается перед коммитом offset'ов группы топика.
+
+    Обработчик может накапливать изменения в памяти, а эта функция -
+    записывать их одной операцией. Её вызывает только consumer группы
+    этого топика, непосредственно перед своим коммитом: consumers других
+    топиков не записывают изменения раньше, чем коммитятся offset'ы
+    событий, из которых они получены. Если функция завершилась ошибкой,
+    offset'ы не коммитятся: после перезапуска события будут прочитаны снова,
+    поэтому запись должна быть идемпотентной.
+
+    Пример:
+        @before_commit('user-events')
+        def flush_counters(): ...
+    """
+    def decorator(func: Callable[[], None]) -> Callable[[], None]:
+        _commit_hooks[topic].append(func)
+        return func
+    return decorator
+
+
+class HandlerStats:
+    """Пропускная способность и задержка обработчиков."""
+
+    def __init__(self):
+        self._started = time.monotonic()
+        self._stats: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: {"count": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+        )
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float, failed: bool):
+        with self._lock:
+            stats = self._stats[name]
+            stats["count"] += 1
+            stats["errors"] += int(failed)
+            stats["total_seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        uptime = max(time.monotonic() - self._started, 1e-9)
+        with self._lock:
+            return {
+                name: {
+                    "count": stats["count"],
+                    "errors": stats["errors"],
+                    "per_second": stats["count"] / uptime,
+                    "avg_ms": stats["total_seconds"] / stats["count"] * 1000 if stats["count"] else 0.0,
+                    "max_ms": stats["max_seconds"] * 1000,
+                }
+                for name, stats in self._stats.items()
+            }
+
+
+handler_stats = HandlerStats()
+
+
+def dispatch(event: Dict[str, Any]):
+    """Вызвать все обработчики, зарегистрированные для event_type события."""
+    for func in _handlers.get(event.get('event_type'), ()):
+        started = time.perf_counter()
+        failed = True
+        try:
+            func(event)
+            failed = False
+        finally:
+            handler_stats.record(func.__name__, time.perf_counter() - started, failed)
+
+
+class ConsumerRuntime:
+    """
+    Цикл чтения топика пачками с параллельной обработкой.
+
+    - poll() забирает до CONSUMER_MAX_POLL_RECORDS сообщений;
+    - сообщения раскладываются по CONSUMER_WORKERS "дорожкам" по ключу
+      (без ключа - по партиции), внутри дорожки обрабатываются по порядку,
+      поэтому порядок событий одного ключа сохраняется;
+    - offset'ы коммитятся вручную только после успешной обработки всей пачки
+      и не чаще CONSUMER_COMMIT_INTERVAL; перед коммитом вызываются функции
+      before_commit топика, которые сохраняют накопленные обработчиками изменения;
+    - при ошибке позиции откатываются на начало пачки, и она повторяется;
+    - следующая пачка не читается, пока воркеры заняты текущей (backpressure).
+
+    С seen_index событие с уже обработанным event_id пропускается, поэтому
+    повтор пачки, replay и повторная отправка producer'а не обрабатываются
+    дважды. При перераспределении партиций группы consumer сохраняет отметки
+    и offset'ы перед отдачей партиций, а получив партиции, дочитывает
+    отметки других процессов (seen_index.reload). С dead_letter_topic пачка, не обработанная после
+    CONSUMER_MAX_BATCH_RETRIES повторов, разбирается по одному событию,
+    и события с ошибкой отправляются в dead-letter топик вместо пропуска.
+    """
+
+    def __init__(
+        self,
+        topic: str,
+        consumer_factory: Callable[..., Any],
+        group_id: str | None = 'crm-consumer-group',
+        dispatcher: EventHandler = dispatch,
+        workers: int | None = None,
+        name: str | None = None,
+        seen_index: Optional[SeenIndex] = None,
+        dead_letter_topic: str | None = None,
+    ):
+        self.topic = topic
+        self.group_id = group_id
+        # Имя для логов и метрик (consumers без группы различаются только им)
+        self.name = name or group_id or topic
+        self.consumer_factory = consumer_factory
+        self.dispatcher = dispatcher
+        self.workers = workers or settings.CONSUMER_WORKERS
+        self.seen_index = seen_index
+        self.dead_letter_topic = dead_letter_topic
+        self._stop_event = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._uncommitted = False
+        self._last_commit = time.monotonic()
+        self._consumer = None
+
+    def _lane(self, record) -> int:
+        key = record.key if record.key is not None else f"partition-{record.partition}"
+        return zlib.crc32(str(key).encode('utf-8')) % self.workers
+
+    def handle_record(self, record):
+        """Обработать одно сообщение (по умолчанию - dispatcher по event_type)."""
+        self.dispatcher(record.value)
+
+    def _event_id(self, record) -> Optional[str]:
+        """event_id для дедупликации (None - индекса нет или событие без id)."""
+        if self.seen_index is None:
+            return None
+        return record.value.get('event_id')
+
+    def _handle_once(self, record):
+        """Обработать событие, если его event_id ещё не встречался."""
+        event_id = self._event_id(record)
+        if event_id and self.seen_index.contains(event_id):
+            metrics.KAFKA_CONSUMER_DUPLICATES.inc(self.topic, self.name)
+            return
+
+        started = time.perf_counter()
+        try:
+            self.handle_record(record)
+        finally:
+            metrics.KAFKA_CONSUMER_LATENCY.observe(
+                time.perf_counter() - started, self.topic, str(record.value.get('event_type'))
+            )
+        if event_id:
+            self.seen_index.add(event_id)
+
+    def _run_lane(self, records: List[Any]):
+        for record in records:
+            self._handle_once(record)
+
+    def _dead_letter(self, records: List[Any]) -> bool:
+        """
+        Обработать пачку по одному событию, события с ошибкой - в dead-letter топик.
+
+        Уже обработанные события пропускаются по seen_index. Отправленные
+        в dead-letter топик события не отмечаются обработанными, поэтому
+        после redrive-dlq они обрабатываются заново.
+
+        Returns:
+            False, если dead-letter топик не принял события (пачку нужно повторить)
+        """
+        failed = []
+        for record in records:
+            try:
+                self._handle_once(record)
+            except Exception as e:
+                failed.append((record, e))
+        if not failed:
+            return True
+
+        items = [
+            (self.dead_letter_topic, {
+                'event_type': 'dead_letter',
+                'source_topic': record.topic,
+                'partition': record.partition,
+                'offset': record.offset,
+                'key': record.key,
+                'error': repr(error),
+                'failed_at': datetime.now().isoformat(),
+                'event': record.value,
+            }, record.key)
+            for record, error in failed
+        ]
+        delivered = get_event_bus().publish_batch(items)
+        if delivered < len(items):
+            logger.error(f"Dead-letter топик '{self.dead_letter_topic}' недоступен, пачка будет повторена")
+            return False
+
+        metrics.KAFKA_CONSUMER_DEAD_LETTERS.inc(self.topic, amount=len(items))
+        for record, error in failed:
+            logger.error(
+                f"Событие {record.value.get('event_id')} из '{self.topic}' "
+                f"(партиция {record.partition}, offset {record.offset}) "
+                f"отправлено в '{self.dead_letter_topic}': {error}"
+            )
+        return True
+
+    def _record_lag(self, consumer, batch: Dict[Any, List[Any]]):
+        """Отставание от конца партиции после обработанной пачки."""
+        for tp, records in batch.items():
+            highwater = consumer.highwater(tp)
+            if highwater is not None:
+                metrics.KAFKA_CONSUMER_LAG.set(
+                    highwater - records[-1].offset - 1, tp.topic, str(tp.partition), self.name
+                )
+
+    def before_poll(self, consumer):
+        """Вызывается перед каждым poll() (между пачками)."""
+
+    def on_batch_done(self, batch: Dict[Any, List[Any]]):
+        """Вызывается после обработки пачки, перед коммитом offset'ов."""
+
+    def _commit(self, consumer) -> bool:
+        """
+        Сохранить изменения обработчиков и отметки событий, закоммитить offset'ы.
+
+        Returns:
+            False, если функция before_commit завершилась ошибкой (offset'ы не закоммичены)
+        """
+        if self.group_id is not None:
+            try:
+                for hook in _commit_hooks.get(self.topic, ()):
+                    hook()
+            except Exception as e:
+                logger.error(f"Изменения обработчиков '{self.topic}' не сохранены, offset'ы не закоммичены: {e}")
+                return False
+        # Отметки обработанных событий сохраняются после изменений и до коммита offset'ов
+        if self.seen_index is not None:
+            self.seen_index.flush()
+        if self.group_id is not None:
+            consumer.commit()
+        self._uncommitted = False
+        self._last_commit = time.monotonic()
+        return True
+
+    def on_partitions_revoked(self, revoked):
+        """Партиции уходят другому участнику группы: сохранить отметки и offset'ы."""
+        if self._consumer is None or not self._uncommitted:
+            return
+        try:
+            self._commit(self._consumer)
+        except Exception as e:
+            logger.error(f"Не удалось закоммитить '{self.topic}' перед перераспределением партиций: {e}")
+
+    def on_partitions_assigned(self, assigned):
+        """Получены партиции: дочитать события, которые успел обработать их прежний владелец."""
+        if self.seen_index is not None:
+            self.seen_index.reload()
+
+    def _commit_due(self) -> bool:
+        return self._uncommitted and time.monotonic() - self._last_commit >= settings.CONSUMER_COMMIT_INTERVAL
+
+    def process_batch(self, pool: ThreadPoolExecutor, records: List[Any]):
+        """Обработать пачку; исключение любого обработчика прерывает пачку."""
+        lanes: Dict[int, List[Any]] = defaultdict(list)
+        for record in records:
+            lanes[self._lane(record)].append(record)
+
+        futures = [pool.submit(self._run_lane, lane_records) for lane_records in lanes.values()]
+        errors = [f.exception() for f in futures if f.exception() is not None]
+        if errors:
+            raise errors[0]
+
+    def run(self):
+        """Основной цикл consumer'а (блокирующий, запускается в отдельном потоке)."""
+        if self.group_id is not None and self.seen_index is not None:
+            consumer = self.consumer_factory(self.topic, group_id=self.group_id, rebalance_listener=self)
+        else:
+            consumer = self.consumer_factory(self.topic, group_id=self.group_id)
+        self._consumer = consumer
+        logger.info(f"🚀 Consumer для топика '{self.topic}' запущен ({self.workers} воркеров)")
+
+        attempts = 0
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"{self.topic}-worker") as pool:
+            while not self._stop_event.is_set():
+                self.before_poll(consumer)
+                batch = consumer.poll(
+                    timeout_ms=settings.CONSUMER_POLL_TIMEOUT_MS,
+                    max_records=settings.CONSUMER_MAX_POLL_RECORDS,
+                )
+                if not batch:
+                    if self._commit_due():
+                        self._commit(consumer)
+                    continue
+
+                records = [record for partition_records in batch.values() for record in partition_records]
+                try:
+                    self.process_batch(pool, records)
+                except Exception as e:
+                    metrics.KAFKA_CONSUMER_FAILED_BATCHES.inc(self.topic)
+                    attempts += 1
+                    if attempts <= settings.CONSUMER_MAX_BATCH_RETRIES:
+                        logger.error(
+                            f"Ошибка при обработке пачки из '{self.topic}' "
+                            f"(попытка {attempts}): {e}"
+                        )
+                        # Откатываем позиции на начало пачки и повторяем её
+                        for tp, partition_records in batch.items():
+                            consumer.seek(tp, partition_records[0].offset)
+                        backoff = min(settings.CONSUMER_RETRY_BACKOFF * 2 ** (attempts - 1), 30.0)
+                        self._stop_event.wait(backoff)
+                        continue
+                    if self.dead_letter_topic is None:
+                        logger.error(
+                            f"Пачка из '{self.topic}' пропущена после {attempts} попыток: {e}"
+                        )
+                    elif not self._dead_letter(records):
+                        for tp, partition_records in batch.items():
+                            consumer.seek(tp, partition_records[0].offset)
+                        self._stop_event.wait(30.0)
+                        continue
+
+                attempts = 0
+                self._record_lag(consumer, batch)
+                self.on_batch_done(batch)
+                self._uncommitted = True
+                if self._commit_due():
+                    self._commit(consumer)
+
+        if self._uncommitted:
+            self._commit(consumer)
+        consumer.close(autocommit=False)
+        self._consumer = None
+        logger.info(f"Consumer для топика '{self.topic}' остановлен")
+
+    def _run_safe(self):
+        try:
+            self.run()
+        except Exception as e:
+            logger.error(f"Consumer для топика '{self.topic}' завершился с ошибкой: {e}")
+
+    def start(self) -> "ConsumerRuntime":
+        """Запустить consumer в отдельном потоке."""
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run_safe,
+            daemon=True,
+            name=f"{self.topic}-consumer",
+        )
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float | None = None):
+        """Остановить consumer: дождаться текущей пачки и закрыть соединение."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
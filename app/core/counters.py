@@ -0,0 +1,47 @@
+import logging
+from typing import Dict
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.models.counter import RowCounter
+from app.models.course import Course
+
+logger = logging.getLogger(__name__)
+
+# Счётчик -> модель, строки которой он считает
+COUNTED_MODELS: Dict[str, type] = {
+    "courses": Course,
+}
+
+
+def increment(db: Session, name: str, delta: int = 1):
+    """
+    Изменить счётчик на delta в текущей транзакции.
+
+    UPDATE value = value + delta атомарен, поэтому параллельные вставки
+    не теряют изменения друг друга. Если счётчик ещё не создан (init_counters),
+    ничего не делает: его значение при чтении считается через COUNT(*).
+    """
+    db.execute(update(RowCounter).where(RowCounter.name == name).values(value=RowCounter.value + delta))
+
+
+def read_count(db: Session, name: str) -> int:
+    """Значение счётчика (без счётчика - COUNT(*) по таблице)."""
+    value = db.execute(select(RowCounter.value).where(RowCounter.name == name)).scalar_one_or_none()
+    if value is None:
+        logger.warning(f"Счётчик '{name}' не создан, количество строк считается через COUNT(*)")
+        return count_rows(db, COUNTED_MODELS[name])
+    return value
+
+
+def count_rows(db: Session, model, *filters) -> int:
+    """COUNT(*) по строкам model, подходящим под filters."""
+    return db.execute(select(func.count()).select_from(model).where(*filters)).scalar_one()
+
+
+def init_counters(db: Session):
+    """Создать счётчики или пересчитать их по таблицам (выполняется в init_db)."""
+    for name, model in COUNTED_MODELS.items():
+        db.merge(RowCounter(name=name, value=count_rows(db, model)))
+    db.commit()
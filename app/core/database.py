@@ -1,8 +1,244 @@
-from sqlalchemy import create_engine
+import threading
+import time
+from collections import deque
+from typing import Any, Dict
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 from app.core.config import settings
+from app.core import metrics
+
+# Сколько последних ожиданий соединения хранить для статистики
+_WAIT_SAMPLES = 1024
+
+
+class PoolWaitStats:
+    """Статистика ожидания соединения из пула (для подбора размера пула)."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._recent: deque = deque(maxlen=_WAIT_SAMPLES)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+            self._recent.append(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            recent = sorted(self._recent)
+            count, total, max_wait = self.count, self.total, self.max
+
+        def percentile(p: float) -> float:
+            return recent[min(len(recent) - 1, int(len(recent) * p))] * 1000 if recent else 0.0
+
+        return {
+            "checkouts": count,
+            "avg_wait_ms": total / count * 1000 if count else 0.0,
+            "p50_wait_ms": percentile(0.50),
+            "p95_wait_ms": percentile(0.95),
+            "p99_wait_ms": percentile(0.99),
+            "max_wait_ms": max_wait * 1000,
+        }
+
+
+class _TimedPoolMixin:
+    """Замер времени ожидания свободного соединения из пула."""
+
+    wait_stats: PoolWaitStats | None = None
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if self.wait_stats is not None:
+                self.wait_stats.record(time.perf_counter() - started)
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    """QueuePool, который замеряет время ожидания свободного соединения."""
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    """Пул асинхронного движка с замером времени ожидания соединения."""
+
+
+# Статистика ожидания по каждому движку: "primary", "replica", "async_primary", ...
+pool_wait_stats: Dict[str, PoolWaitStats] = {}
+
+# Все созданные движки по имени (для статистики пулов)
+engines: Dict[str, Engine] = {}
+
+
+def _is_sqlite_memory(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def _pool_kwargs(url) -> Dict[str, Any]:
+    """Параметры пула из настроек (для SQLite в памяти пул не настраивается)."""
+    if _is_sqlite_memory(url):
+        return {}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def _tune_sqlite(engine: Engine, url):
+    """PRAGMA для SQLite: WAL для параллельного чтения и ожидание блокировки."""
+    is_memory = _is_sqlite_memory(url)
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not is_memory:
+            cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.close()
+
+
+def create_db_engine(db_url: str, name: str) -> Engine:
+    """Создать движок с настроенным пулом и статистикой ожидания соединений."""
+    url = make_url(db_url)
+    kwargs = _pool_kwargs(url)
+    if kwargs:
+        kwargs["poolclass"] = TimedQueuePool
+
+    engine = create_engine(url, future=True, **kwargs)
+    _register_engine(engine, name)
+    if url.get_backend_name() == "sqlite":
+        _tune_sqlite(engine, url)
+    return engine
+
+
+def _register_engine(engine: Engine, name: str):
+    engines[name] = engine
+    if isinstance(engine.pool, _TimedPoolMixin):
+        pool_wait_stats[name] = engine.pool.wait_stats = PoolWaitStats()
+    if settings.METRICS_ENABLED:
+        _instrument_engine(engine, name)
+
+
+def _instrument_engine(engine: Engine, name: str):
+    """Хуки движка: количество и время SQL-запросов для /metrics."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_metrics_started", None)
+        if started is not None:
+            metrics.observe_query(name, time.perf_counter() - started)
+
+
+def _collect_pool_metrics():
+    """Снять состояние пулов перед выдачей /metrics."""
+    for name, db_engine in engines.items():
+        pool = db_engine.pool
+        if isinstance(pool, QueuePool):
+            metrics.DB_POOL_SIZE.set(pool.size(), name)
+            metrics.DB_POOL_CHECKED_OUT.set(pool.checkedout(), name)
+            metrics.DB_POOL_OVERFLOW.set(max(pool.overflow(), 0), name)
+        if name in pool_wait_stats:
+            stats = pool_wait_stats[name]
+            metrics.DB_POOL_WAIT_SECONDS.set_total(stats.total, name)
+            metrics.DB_POOL_CHECKOUTS.set_total(stats.count, name)
+
+
+metrics.registry.on_collect(_collect_pool_metrics)
+
+
+# Основная БД (запись) и реплика для чтения (по умолчанию - та же БД)
+engine = create_db_engine(settings.DB_URL, "primary")
+read_engine = create_db_engine(settings.DB_READ_URL, "replica") if settings.DB_READ_URL else engine
 
-engine = create_engine(settings.DB_URL, pool_pre_ping=True, future=True)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+ReadSessionLocal = sessionmaker(bind=read_engine, autoflush=False, expire_on_commit=False)
+
+Base = declarative_base()
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Состояние пулов соединений и время ожидания соединения."""
+    stats = {}
+    for name, db_engine in engines.items():
+        pool = db_engine.pool
+        info: Dict[str, Any] = {"status": pool.status()}
+        if isinstance(pool, QueuePool):
+            info.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                overflow=pool.overflow(),
+                checked_in=pool.checkedin(),
+            )
+        if name in pool_wait_stats:
+            info.update(pool_wait_stats[name].snapshot())
+        stats[name] = info
+    return stats
+
+
+# Асинхронные драйверы для DB_MODE=async
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "mysql": "aiomysql",
+}
+
+
+def to_async_url(url: str) -> str:
+    """Заменить драйвер в URL БД на асинхронный (sqlite -> sqlite+aiosqlite)."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"Асинхронный режим не поддерживается для '{backend}'")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+# Асинхронные движки создаются только в DB_MODE=async,
+# чтобы синхронному режиму не требовались асинхронные драйверы
+async_engine = None
+async_read_engine = None
+AsyncSessionLocal = None
+AsyncReadSessionLocal = None
+
+if settings.DB_MODE == "async":
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    def _create_async_db_engine(db_url: str, name: str):
+        async_url = make_url(to_async_url(db_url))
+        kwargs = _pool_kwargs(async_url)
+        if kwargs:
+            kwargs["poolclass"] = TimedAsyncQueuePool
+
+        async_db_engine = create_async_engine(async_url, **kwargs)
+        _register_engine(async_db_engine.sync_engine, name)
+        if async_url.get_backend_name() == "sqlite":
+            _tune_sqlite(async_db_engine.sync_engine, async_url)
+        return async_db_engine
 
-Base = declarative_base() 
\ No newline at end of file
+    async_engine = _create_async_db_engine(settings.DB_URL, "async_primary")
+    async_read_engine = (
+        _create_async_db_engine(settings.DB_READ_URL, "async_replica")
+        if settings.DB_READ_URL else async_engine
+    )
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+    AsyncReadSessionLocal = async_sessionmaker(bind=async_read_engine, autoflush=False, expire_on_commit=False)
@@ -0,0 +1,216 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Расширение файлов поколений: массив 64-битных ключей без заголовка
+FILE_SUFFIX = ".ids"
+
+
+def event_key(event_id: str) -> int:
+    """
+    64-битный ключ event_id для индекса.
+
+    uuid4 (32 hex-символа) берётся напрямую, остальные строки хэшируются.
+    Вероятность совпадения ключей при миллионе id в окне - порядка 1e-8.
+    """
+    try:
+        return int(event_id[:16], 16)
+    except ValueError:
+        return int.from_bytes(hashlib.blake2b(event_id.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class SeenIndex:
+    """
+    Индекс обработанных event_id за последние window секунд.
+
+    Окно разбито на generations поколений (наборов ключей) одинаковой
+    длительности: проверка - поиск в нескольких set, старые поколения
+    удаляются целиком, без обхода отдельных записей. Если ключей больше
+    max_ids, самое старое поколение удаляется раньше срока.
+
+    Каждое поколение хранится на диске в файлах <начало поколения>.<pid>.ids -
+    массивах 64-битных ключей (8 байт на событие), новые ключи дописываются
+    при flush(). Каждый процесс пишет в свой файл и удаляет раньше срока
+    только свои файлы. При запуске читаются файлы всех процессов, а reload()
+    дочитывает то, что другие процессы дописали позже (consumer вызывает
+    его при получении партиций), поэтому индекс общий для группы consumers
+    на одной машине.
+    """
+
+    def __init__(self, directory: str, window: float, generations: int, max_ids: int):
+        self.directory = directory
+        self.window = window
+        self.generation_seconds = max(window / generations, 1.0)
+        self.max_ids = max_ids
+        self._generations: "OrderedDict[int, Set[int]]" = OrderedDict()
+        self._pending: Dict[int, List[int]] = {}
+        self._size = 0
+        # Сколько байт каждого файла уже прочитано (файлы только дописываются)
+        self._read_offsets: Dict[str, int] = {}
+        # Поколения раньше этого вытеснены по max_ids и заново не загружаются
+        self._floor = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        loaded = self._read_files(own=True)
+        if loaded:
+            logger.info(f"Индекс обработанных событий '{self.directory}': загружено {self._size} id")
+
+    def _generation_start(self, now: float) -> int:
+        return int(now // self.generation_seconds * self.generation_seconds)
+
+    def _own_suffix(self) -> str:
+        return f".{os.getpid()}{FILE_SUFFIX}"
+
+    def reload(self) -> int:
+        """
+        Дочитать ключи, которые другие процессы дописали после запуска.
+
+        Читаются только новые байты файлов. Вызывается при назначении
+        партиций: события, уже обработанные прежним владельцем партиции,
+        не обрабатываются повторно.
+
+        Returns:
+            Количество новых id
+        """
+        added = self._read_files(own=False)
+        if added:
+            logger.info(f"Индекс обработанных событий '{self.directory}': дочитано {added} id")
+        return added
+
+    def _read_files(self, own: bool) -> int:
+        """Прочитать новые байты файлов поколений (own=False - кроме файлов этого процесса)."""
+        own_suffix = self._own_suffix()
+        added = 0
+        with self._lock:
+            expired = self._generation_start(time.time() - self.window)
+            for filename in sorted(os.listdir(self.directory)):
+                if not filename.endswith(FILE_SUFFIX) or (not own and filename.endswith(own_suffix)):
+                    continue
+                path = os.path.join(self.directory, filename)
+                try:
+                    start = int(filename.split(".", 1)[0])
+                except ValueError:
+                    continue
+                if start < expired:
+                    self._remove_file(path)
+                    continue
+                if start < self._floor:
+                    continue
+                offset = self._read_offsets.get(filename, 0)
+                try:
+                    with open(path, "rb") as f:
+                        f.seek(offset)
+                        data = f.read()
+                except OSError:
+                    continue  # файл удалён другим процессом по сроку
+                # Хвост, который ещё дописывается (или недописан при аварии), читается позже
+                keys = array("Q")
+                usable = len(data) - len(data) % keys.itemsize
+                if not usable:
+                    continue
+                keys.frombytes(data[:usable])
+                self._read_offsets[filename] = offset + usable
+                generation = self._generations.get(start)
+                if generation is None:
+                    generation = self._generations[start] = set()
+                    self._generations = OrderedDict(sorted(self._generations.items()))
+                before = len(generation)
+                generation.update(keys)
+                added += len(generation) - before
+            self._size += added
+            while self._size > self.max_ids and len(self._generations) > 1:
+                self._drop_oldest(expired=False)
+        return added
+
+    def contains(self, event_id: str) -> bool:
+        """Было ли событие уже обработано (в пределах окна)."""
+        key = event_key(event_id)
+        with self._lock:
+            self._expire(time.time())
+            return any(key in generation for generation in self._generations.values())
+
+    def add(self, event_id: str):
+        """Отметить событие обработанным (на диск попадёт при flush)."""
+        key = event_key(event_id)
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            start = self._generation_start(now)
+            generation = self._generations.get(start)
+            if generation is None:
+                generation = self._generations[start] = set()
+            if key in generation:
+                return
+            generation.add(key)
+            self._size += 1
+            self._pending.setdefault(start, []).append(key)
+            while self._size > self.max_ids and len(self._generations) > 1:
+                self._drop_oldest(expired=False)
+
+    def _expire(self, now: float):
+        oldest = self._generation_start(now - self.window)
+        while self._generations and next(iter(self._generations)) < oldest:
+            self._drop_oldest(expired=True)
+
+    def _drop_oldest(self, expired: bool):
+        """
+        Удалить самое старое поколение.
+
+        Вышедшее из окна поколение не нужно никому - удаляются файлы всех
+        процессов. Вытесненное по max_ids - только файл этого процесса:
+        другим процессам их id ещё нужны.
+        """
+        start, generation = self._generations.popitem(last=False)
+        self._size -= len(generation)
+        self._pending.pop(start, None)
+        if not expired:
+            self._floor = max(self._floor, start + 1)
+            filenames = [f"{start}{self._own_suffix()}"]
+        else:
+            filenames = [
+                filename for filename in os.listdir(self.directory)
+                if filename.startswith(f"{start}.") and filename.endswith(FILE_SUFFIX)
+            ]
+        for filename in filenames:
+            self._read_offsets.pop(filename, None)
+            self._remove_file(os.path.join(self.directory, filename))
+
+    def _remove_file(self, path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def flush(self):
+        """Дописать новые ключи в файлы поколений (вызывается перед коммитом offset'ов)."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for start, keys in pending.items():
+            path = os.path.join(self.directory, f"{start}{self._own_suffix()}")
+            with open(path, "ab") as f:
+                array("Q", keys).tofile(f)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._size
+
+
+def open_seen_index(name: str) -> Optional[SeenIndex]:
+    """Индекс для consumer'а name (None, если дедупликация выключена)."""
+    if not settings.DEDUP_ENABLED:
+        return None
+    return SeenIndex(
+        os.path.join(settings.DEDUP_DIR, name),
+        window=settings.DEDUP_WINDOW_SECONDS,
+        generations=settings.DEDUP_GENERATIONS,
+        max_ids=settings.DEDUP_MAX_IDS,
+    )
@@ -0,0 +1,125 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.sql import Select
+
+from app.core.config import settings
+from app.core.outbox import add_outbox_events
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models.course import Course
+from app.models.enrollment import Enrollment
+from app.models.user import User
+from app.schemas.events import CourseEnrolledEvent
+
+ALREADY_ENROLLED = "Пользователь уже записан на курс"
+USER_NOT_FOUND = "Пользователь не найден"
+
+
+def enroll_users(db: Session, course_id: int, user_ids: List[int]) -> Tuple[List[Enrollment], Dict[int, str]]:
+    """
+    Записать пользователей на курс одной транзакцией.
+
+    Записи, enrolled_count курса и события course.enrolled (в outbox)
+    сохраняются вместе. Счётчик увеличивается атомарным UPDATE
+    enrolled_count = enrolled_count + n, поэтому параллельные записи
+    на один курс не теряют друг друга. Повторная запись на курс
+    (в том числе параллельная) отклоняется уникальным индексом.
+
+    Returns:
+        (созданные записи, user_id -> причина отказа); транзакция не коммитится
+    """
+    if db.get(Course, course_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Курс не найден"
+        )
+
+    requested = list(dict.fromkeys(user_ids))
+    enrolled = set(db.execute(
+        select(Enrollment.user_id)
+        .where(Enrollment.course_id == course_id, Enrollment.user_id.in_(requested))
+    ).scalars())
+    known = set(db.execute(select(User.id).where(User.id.in_(requested))).scalars())
+
+    errors: Dict[int, str] = {}
+    for user_id in requested:
+        if user_id not in known:
+            errors[user_id] = USER_NOT_FOUND
+        elif user_id in enrolled:
+            errors[user_id] = ALREADY_ENROLLED
+
+    enrollments = [
+        Enrollment(user_id=user_id, course_id=course_id)
+        for user_id in requested if user_id not in errors
+    ]
+    if enrollments:
+        db.add_all(enrollments)
+        db.flush()  # пачка INSERT'ов; дубликат из параллельного запроса - IntegrityError
+        db.execute(
+            update(Course)
+            .where(Course.id == course_id)
+            .values(enrolled_count=Course.enrolled_count + len(enrollments))
+        )
+
+        timestamp = datetime.now().isoformat()
+        add_outbox_events(db, settings.KAFKA_TOPIC_COURSE_EVENTS, [
+            (CourseEnrolledEvent(
+                course_id=course_id,
+                user_id=enrollment.user_id,
+                timestamp=timestamp
+            ).dict(), str(course_id))
+            for enrollment in enrollments
+        ])
+
+    return enrollments, errors
+
+
+def _page(
+    owner_column, item_column, owner_id: int, related, cursor: Optional[str], limit: int,
+) -> Select:
+    """
+    Страница записей владельца (пользователя или курса) по возрастанию id
+    связанной сущности, со связанной сущностью в том же запросе (JOIN).
+
+    Keyset-пагинация по индексу (owner_column, item_column): пара уникальна,
+    поэтому курсор - последний id связанной сущности.
+    """
+    stmt = (
+        select(Enrollment)
+        .where(owner_column == owner_id)
+        .options(related)
+        .order_by(item_column)
+        .limit(limit)
+    )
+    if cursor:
+        _, last_id = decode_cursor(cursor, item_column.key)
+        stmt = stmt.where(item_column > last_id)
+    return stmt
+
+
+def user_courses_page(user_id: int, cursor: Optional[str], limit: int) -> Select:
+    """Курсы пользователя (Enrollment с загруженным course)."""
+    return _page(
+        Enrollment.user_id, Enrollment.course_id, user_id,
+        joinedload(Enrollment.course, innerjoin=True), cursor, limit,
+    )
+
+
+def course_students_page(course_id: int, cursor: Optional[str], limit: int) -> Select:
+    """Студенты курса (Enrollment с загруженным user, без пароля)."""
+    return _page(
+        Enrollment.course_id, Enrollment.user_id, course_id,
+        joinedload(Enrollment.user, innerjoin=True).load_only(User.id, User.email, User.name),
+        cursor, limit,
+    )
+
+
+def enrollments_next_cursor(enrollments: List[Enrollment], item_key: str, limit: int) -> Optional[str]:
+    """Курсор следующей страницы (по item_key - course_id или user_id) или None."""
+    if not enrollments or len(enrollments) < limit:
+        return None
+    last_id = getattr(enrollments[-1], item_key)
+    return encode_cursor(item_key, last_id, last_id)
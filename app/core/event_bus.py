@@ -0,0 +1,535 @@
+import itertools
+import logging
+import os
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.core.codecs import json_dumps, json_loads
+from app.schemas.events import new_event_id
+
+logger = logging.getLogger(__name__)
+
+# Событие для публикации: (топик, событие, ключ)
+BusItem = Tuple[str, Dict[str, Any], Optional[str]]
+
+
+class TopicPartition(NamedTuple):
+    """Партиция топика (совместима с kafka.TopicPartition)."""
+    topic: str
+    partition: int
+
+
+class Record(NamedTuple):
+    """Прочитанное сообщение (те же поля, что у ConsumerRecord в kafka-python)."""
+    topic: str
+    partition: int
+    offset: int
+    key: Optional[str]
+    value: Dict[str, Any]
+
+
+class EventBus(ABC):
+    """
+    Шина событий: публикация и создание consumers.
+
+    Consumers всех бэкендов поддерживают то подмножество API KafkaConsumer,
+    которым пользуется ConsumerRuntime (poll/seek/commit/close/highwater,
+    assignment/seek_to_beginning), поэтому обработчики работают без изменений.
+    """
+
+    name: str
+    # Группа потребителей может состоять из нескольких процессов
+    distributed: bool = False
+
+    @abstractmethod
+    def publish(self, topic: str, event: Dict[str, Any], key: Optional[str] = None) -> bool:
+        """Опубликовать событие. True, если событие принято."""
+
+    def publish_batch(self, items: List[BusItem]) -> int:
+        """
+        Опубликовать пачку событий по порядку и дождаться доставки.
+
+        Returns:
+            Длина непрерывного префикса доставленных событий
+        """
+        for delivered, (topic, event, key) in enumerate(items):
+            if not self.publish(topic, event, key):
+                return delivered
+        return len(items)
+
+    @abstractmethod
+    def create_consumer(
+        self, topic: str, group_id: Optional[str] = None, assign_all: bool = False, from_beginning: bool = False,
+        rebalance_listener=None,
+    ):
+        """
+        Создать consumer топика.
+
+        Args:
+            group_id: Группа потребителей (события делятся между её участниками,
+                позиция чтения сохраняется при commit); None - без группы
+            assign_all: Назначить все партиции сразу (для ручного seek)
+            from_beginning: Новая группа читает топик с начала, а не только новые события
+            rebalance_listener: Объект с on_partitions_revoked(partitions) и
+                on_partitions_assigned(partitions) - вызываются внутри poll()
+                при перераспределении партиций группы (только у шин, которые
+                делят партиции между процессами)
+        """
+
+    def partitions(self, topic: str) -> int:
+        """Количество партиций топика (столько участников группы читают параллельно)."""
+        return 1
+
+    def for_bulk(self, compression: str, batch_bytes: int) -> "EventBus":
+        """
+        Шина для массовой отправки (backfill): крупные сжатые батчи.
+
+        По умолчанию - та же шина (сжатие есть только у Kafka).
+        Возвращённую шину закрывает вызывающий код.
+        """
+        return self
+
+    def flush(self, timeout: Optional[float] = None):
+        """Дождаться отправки опубликованных событий."""
+
+    def close(self):
+        """Освободить ресурсы (вызывается при завершении приложения)."""
+
+
+# --- Kafka ---
+
+class KafkaBus(EventBus):
+    """Kafka через kafka-python (app.core.kafka_producer / kafka_consumer)."""
+
+    name = "kafka"
+    distributed = True
+
+    def __init__(self, producer=None):
+        # Отдельный producer (for_bulk); None - общий producer приложения
+        self._producer = producer
+
+    def publish(self, topic: str, event: Dict[str, Any], key: Optional[str] = None) -> bool:
+        if self._producer is not None:
+            return self.publish_batch([(topic, event, key)]) == 1
+
+        from app.core.kafka_producer import send_event
+
+        return send_event(topic, event, key)
+
+    def publish_batch(self, items: List[BusItem]) -> int:
+        from app.core.kafka_producer import get_producer, record_send_failure, track_delivery
+
+        producer = self._producer or get_producer()
+        futures = []
+        for topic, event, key in items:
+            started = time.perf_counter()
+            try:
+                future = producer.send(topic, value=event, key=key)
+            except Exception as e:
+                # Остальные события пачки не отправляем: доставляется только префикс
+                logger.error(f"Kafka producer не принял событие для '{topic}': {e}")
+                record_send_failure()
+                break
+            track_delivery(future, topic, started)
+            futures.append(future)
+        producer.flush(timeout=settings.KAFKA_SEND_TIMEOUT)
+
+        for delivered, future in enumerate(futures):
+            if not (future.is_done and future.succeeded()):
+                logger.error(f"Ошибка доставки события в Kafka: {future.exception}")
+                return delivered
+        return len(futures)
+
+    def create_consumer(
+        self, topic: str, group_id: Optional[str] = None, assign_all: bool = False, from_beginning: bool = False,
+        rebalance_listener=None,
+    ):
+        from app.core.kafka_consumer import create_consumer
+
+        return create_consumer(
+            topic, group_id=group_id, assign_all=assign_all, from_beginning=from_beginning,
+            rebalance_listener=rebalance_listener,
+        )
+
+    def partitions(self, topic: str) -> int:
+        from kafka import KafkaConsumer
+
+        consumer = KafkaConsumer(bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS.split(','))
+        try:
+            return len(consumer.partitions_for_topic(topic) or ()) or 1
+        finally:
+            consumer.close()
+
+    def for_bulk(self, compression: str, batch_bytes: int) -> EventBus:
+        from app.core.kafka_producer import create_producer
+
+        return KafkaBus(create_producer(
+            compression_type=compression or None,
+            batch_size=batch_bytes,
+            linger_ms=50,
+        ))
+
+    def flush(self, timeout: Optional[float] = None):
+        if self._producer is not None:
+            self._producer.flush(timeout=timeout)
+            return
+
+        from app.core.kafka_producer import flush_producer
+
+        flush_producer(timeout)
+
+    def close(self):
+        if self._producer is not None:
+            self._producer.close()
+            return
+
+        from app.core.kafka_producer import close_producer
+
+        close_producer()
+
+
+# --- Шина в памяти процесса ---
+
+class InProcessConsumer:
+    """
+    Consumer шины в памяти: очередь подписчика + повтор последней пачки.
+
+    После seek() на начало пачки (ошибка обработки) те же записи
+    выдаются повторно; следующий poll() без seek() подтверждает пачку.
+    """
+
+    def __init__(self, bus: "InProcessBus", topic: str, records: "queue.Queue[Record]"):
+        self._bus = bus
+        self._topic = topic
+        self._records = records
+        self._inflight: List[Record] = []
+        self._redeliver: List[Record] = []
+        self._tp = TopicPartition(topic, bus.epoch)
+
+    def poll(self, timeout_ms: int = 0, max_records: int = 500) -> Dict[TopicPartition, List[Record]]:
+        if self._redeliver:
+            batch, self._redeliver = self._redeliver[:max_records], self._redeliver[max_records:]
+        else:
+            try:
+                batch = [self._records.get(timeout=timeout_ms / 1000)]
+            except queue.Empty:
+                self._inflight = []
+                return {}
+            while len(batch) < max_records:
+                try:
+                    batch.append(self._records.get_nowait())
+                except queue.Empty:
+                    break
+        self._inflight = batch
+        return {self._tp: batch}
+
+    def seek(self, tp: TopicPartition, offset: int):
+        self._redeliver = [r for r in self._inflight if r.offset >= offset] + self._redeliver
+
+    def seek_to_beginning(self, tp: TopicPartition):
+        """Прошлые события шина не хранит - читать можно только новые."""
+
+    def assignment(self) -> Set[TopicPartition]:
+        return {self._tp}
+
+    def highwater(self, tp: TopicPartition) -> Optional[int]:
+        return self._bus.highwater(self._topic)
+
+    def commit(self):
+        self._inflight = []
+
+    def close(self, autocommit: bool = False):
+        self._bus.unsubscribe(self._topic, self._records)
+
+
+class InProcessBus(EventBus):
+    """
+    Шина в памяти процесса: события передаются consumers как есть,
+    без сериализации. Подходит для одного процесса без брокера.
+
+    Consumers одной группы делят общую очередь, consumer без группы
+    получает собственную копию всех событий топика. События, опубликованные
+    до подписки, не доставляются (как auto_offset_reset='latest').
+    """
+
+    name = "inprocess"
+
+    # Как часто проверять, освободилось ли место в очередях подписчиков (секунды)
+    SPACE_POLL_INTERVAL = 0.005
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        # "Партиция" - время создания шины: offset'ы нового процесса не путаются
+        # с сохранёнными offset'ами предыдущего (например, в проекции статистики)
+        self.epoch = int(time.time())
+        self._lock = threading.Lock()
+        # Публикация под отдельной блокировкой: записи попадают в очереди
+        # в порядке offset'ов, а подписка/отписка не ждёт заполненную очередь
+        self._publish_lock = threading.Lock()
+        self._group_queues: Dict[Tuple[str, str], "queue.Queue[Record]"] = {}
+        self._subscribers: Dict[str, List["queue.Queue[Record]"]] = defaultdict(list)
+        self._counters: Dict[str, "itertools.count[int]"] = defaultdict(itertools.count)
+        self._last_offsets: Dict[str, int] = {}
+
+    def publish(self, topic: str, event: Dict[str, Any], key: Optional[str] = None) -> bool:
+        with self._publish_lock:
+            with self._lock:
+                subscribers = list(self._subscribers.get(topic, ()))
+            # Событие получают все подписчики или ни один: иначе повтор публикации
+            # доставил бы его уже получившим подписчикам ещё раз с новым offset'ом.
+            # При заполненной очереди ждём consumer (backpressure), но не дольше
+            # KAFKA_ENQUEUE_TIMEOUT. Пока держим _publish_lock, в очереди никто
+            # не пишет, поэтому освободившееся место не пропадёт до записи
+            deadline = time.monotonic() + settings.KAFKA_ENQUEUE_TIMEOUT
+            while any(records.full() for records in subscribers):
+                if time.monotonic() >= deadline:
+                    logger.error(f"Очередь подписчика '{topic}' заполнена, событие не доставлено")
+                    return False
+                time.sleep(self.SPACE_POLL_INTERVAL)
+
+            with self._lock:
+                offset = next(self._counters[topic])
+                self._last_offsets[topic] = offset
+            record = Record(topic, self.epoch, offset, key, event)
+            for records in subscribers:
+                records.put_nowait(record)
+        return True
+
+    def create_consumer(
+        self, topic: str, group_id: Optional[str] = None, assign_all: bool = False, from_beginning: bool = False,
+        rebalance_listener=None,
+    ):
+        with self._lock:
+            if group_id is not None and (topic, group_id) in self._group_queues:
+                records = self._group_queues[(topic, group_id)]
+            else:
+                records = queue.Queue(maxsize=self.maxsize)
+                self._subscribers[topic].append(records)
+                if group_id is not None:
+                    self._group_queues[(topic, group_id)] = records
+        return InProcessConsumer(self, topic, records)
+
+    def unsubscribe(self, topic: str, records: "queue.Queue[Record]"):
+        with self._lock:
+            if records in self._group_queues.values():
+                return  # очередь группы остаётся для остальных участников
+            if records in self._subscribers.get(topic, ()):
+                self._subscribers[topic].remove(records)
+
+    def highwater(self, topic: str) -> Optional[int]:
+        with self._lock:
+            last = self._last_offsets.get(topic)
+        return None if last is None else last + 1
+
+
+# --- Локальный журнал (append-only файл) ---
+
+class LogConsumer:
+    """
+    Consumer локального журнала: чтение файла топика с позиции (offset - байт).
+
+    Позиция группы сохраняется в файл <топик>.<группа>.offset при commit();
+    новая группа начинает с конца журнала (как auto_offset_reset='latest'),
+    с from_beginning - с начала.
+    """
+
+    # Как часто проверять появление новых записей (секунды)
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, bus: "LogBus", topic: str, group_id: Optional[str], from_beginning: bool = False):
+        self._bus = bus
+        self._topic = topic
+        self._path = bus.topic_path(topic)
+        self._offset_path = os.path.join(bus.directory, f"{topic}.{group_id}.offset") if group_id else None
+        self._tp = TopicPartition(topic, 0)
+        self._position = self._load_position(from_beginning)
+
+    def _load_position(self, from_beginning: bool) -> int:
+        if self._offset_path and os.path.exists(self._offset_path):
+            with open(self._offset_path, encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        return 0 if from_beginning else self._size()
+
+    def _size(self) -> int:
+        try:
+            return os.path.getsize(self._path)
+        except OSError:
+            return 0
+
+    def poll(self, timeout_ms: int = 0, max_records: int = 500) -> Dict[TopicPartition, List[Record]]:
+        deadline = time.monotonic() + timeout_ms / 1000
+        while True:
+            records = self._read(max_records)
+            if records or time.monotonic() >= deadline:
+                return {self._tp: records} if records else {}
+            time.sleep(self.POLL_INTERVAL)
+
+    def _read(self, max_records: int) -> List[Record]:
+        if self._size() <= self._position:
+            return []
+        records: List[Record] = []
+        with open(self._path, "rb") as f:
+            f.seek(self._position)
+            while len(records) < max_records:
+                offset = f.tell()
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    break  # запись ещё дописывается
+                item = json_loads(line)
+                records.append(Record(self._topic, 0, offset, item.get("key"), item["event"]))
+                self._position = f.tell()
+        return records
+
+    def seek(self, tp: TopicPartition, offset: int):
+        self._position = offset
+
+    def seek_to_beginning(self, tp: TopicPartition):
+        self._position = 0
+
+    def assignment(self) -> Set[TopicPartition]:
+        return {self._tp}
+
+    def highwater(self, tp: TopicPartition) -> Optional[int]:
+        return None  # offset'ы - байты файла, отставание в сообщениях неизвестно
+
+    def commit(self):
+        if self._offset_path:
+            tmp_path = f"{self._offset_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(str(self._position))
+            os.replace(tmp_path, self._offset_path)
+
+    def close(self, autocommit: bool = False):
+        if autocommit:
+            self.commit()
+
+
+class LogBus(EventBus):
+    """
+    Надёжная локальная шина: каждый топик - append-only файл JSON Lines.
+
+    Запись - один вызов write() в файл с O_APPEND, поэтому в журнал
+    могут писать несколько процессов одной машины. События переживают
+    перезапуск, consumers продолжают чтение с сохранённой позиции.
+    """
+
+    name = "log"
+
+    def __init__(self, directory: str, fsync: bool):
+        self.directory = directory
+        self.fsync = fsync
+        os.makedirs(directory, exist_ok=True)
+        self._fds: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def topic_path(self, topic: str) -> str:
+        return os.path.join(self.directory, f"{topic}.log")
+
+    def _fd(self, topic: str) -> int:
+        with self._lock:
+            if topic not in self._fds:
+                self._fds[topic] = os.open(self.topic_path(topic), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            return self._fds[topic]
+
+    def publish(self, topic: str, event: Dict[str, Any], key: Optional[str] = None) -> bool:
+        try:
+            fd = self._fd(topic)
+            os.write(fd, json_dumps({"key": key, "event": event}) + b"\n")
+            if self.fsync:
+                os.fsync(fd)
+            return True
+        except OSError as e:
+            logger.error(f"Ошибка записи события в журнал '{topic}': {e}")
+            return False
+
+    def create_consumer(
+        self, topic: str, group_id: Optional[str] = None, assign_all: bool = False, from_beginning: bool = False,
+        rebalance_listener=None,
+    ):
+        return LogConsumer(self, topic, group_id, from_beginning)
+
+    def close(self):
+        with self._lock:
+            for fd in self._fds.values():
+                os.close(fd)
+            self._fds.clear()
+
+
+# --- Подготовка события ---
+
+# Поля, по которым выбирается ключ партиции, если ключ не указан явно
+PARTITION_KEY_FIELDS = ("user_id", "course_id")
+
+
+def stamp_event(event: Dict[str, Any], key: Optional[str] = None) -> Tuple[Dict[str, Any], Optional[str]]:
+    """
+    Назначить событию event_id (если его ещё нет) и ключ партиции.
+
+    Ключ по умолчанию - id сущности события, поэтому события одного
+    пользователя или курса попадают в одну партицию и обрабатываются по порядку.
+    """
+    if "event_id" not in event:
+        event = {**event, "event_id": new_event_id()}
+    if key is None:
+        key = next((str(event[name]) for name in PARTITION_KEY_FIELDS if event.get(name) is not None), None)
+    return event, key
+
+
+# --- Выбор бэкенда ---
+
+_bus: Optional[EventBus] = None
+_bus_lock = threading.Lock()
+
+
+def create_event_bus() -> EventBus:
+    """Создать шину по EVENT_BUS_BACKEND."""
+    backend = settings.EVENT_BUS_BACKEND
+    if backend == "kafka":
+        return KafkaBus()
+    if backend == "inprocess":
+        return InProcessBus(maxsize=settings.EVENT_BUS_QUEUE_SIZE)
+    if backend == "log":
+        return LogBus(settings.EVENT_LOG_DIR, fsync=settings.EVENT_LOG_FSYNC)
+    raise ValueError(f"Неизвестный EVENT_BUS_BACKEND: '{backend}' (kafka | inprocess | log)")
+
+
+def get_event_bus() -> EventBus:
+    """Шина событий приложения (создаётся при первом обращении)."""
+    global _bus
+
+    with _bus_lock:
+        if _bus is None:
+            _bus = create_event_bus()
+            logger.info(f"Шина событий: {_bus.name}")
+        return _bus
+
+
+def send_event(topic: str, event: Dict[str, Any], key: str | None = None) -> bool:
+    """
+    Отправить событие в шину (бэкенд - EVENT_BUS_BACKEND).
+
+    Args:
+        topic: Название топика (например, "user-events")
+        event: Словарь с данными события
+        key: Ключ события (события с одним ключом обрабатываются по порядку)
+
+    Returns:
+        True если событие принято, False при ошибке
+    """
+    event, key = stamp_event(event, key)
+    return get_event_bus().publish(topic, event, key)
+
+
+def close_event_bus():
+    """Закрыть шину (вызывается при завершении приложения)."""
+    global _bus
+
+    with _bus_lock:
+        if _bus is not None:
+            _bus.close()
+            _bus = None
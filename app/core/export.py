@@ -0,0 +1,83 @@
+import csv
+import io
+import json
+import zlib
+from decimal import Decimal
+from typing import Iterator, List, Literal
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy.sql import Select
+
+from app.core.config import settings
+from app.core.database import ReadSessionLocal
+
+ExportFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Тип {type(value).__name__} не сериализуется в JSON")
+
+
+def _encode_ndjson(columns: List[str], rows) -> bytes:
+    return "".join(
+        json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=_json_default) + "\n"
+        for row in rows
+    ).encode("utf-8")
+
+
+def _encode_csv(rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+def _iter_export(stmt: Select, columns: List[str], fmt: ExportFormat, compress: bool) -> Iterator[bytes]:
+    """
+    Выгрузить результат запроса пачками по EXPORT_BATCH_SIZE строк.
+
+    Строки читаются с серверного курсора (yield_per), поэтому в памяти
+    одновременно находится только одна пачка, независимо от размера таблицы.
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None  # 31 - формат gzip
+
+    def emit(data: bytes) -> bytes:
+        return compressor.compress(data) if compressor else data
+
+    # Отдельная сессия: генератор работает уже после выхода из эндпоинта
+    db = ReadSessionLocal()
+    try:
+        if fmt == "csv":
+            yield emit(_encode_csv([columns]))
+
+        result = db.execute(stmt.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+        for rows in result.partitions():
+            data = _encode_csv(rows) if fmt == "csv" else _encode_ndjson(columns, rows)
+            chunk = emit(data)
+            if chunk:
+                yield chunk
+
+        if compressor:
+            yield compressor.flush()
+    finally:
+        db.close()
+
+
+def export_response(stmt: Select, fmt: ExportFormat, compress: bool, filename: str) -> StreamingResponse:
+    """Потоковый ответ с выгрузкой в NDJSON или CSV (опционально gzip)."""
+    columns = [column.key for column in stmt.selected_columns]
+    headers = {"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(
+        _iter_export(stmt, columns, fmt, compress),
+        media_type=MEDIA_TYPES[fmt],
+        headers=headers,
+    )
@@ -1,150 +1,271 @@
-from kafka import KafkaConsumer
-from kafka.errors import KafkaError
-import json
+from kafka import ConsumerRebalanceListener, KafkaConsumer, TopicPartition
 import logging
-from typing import Dict, Any
+from datetime import datetime
+from typing import Dict, Any, List
 
 from app.core.config import settings
+from app.core.codecs import decode_event
+from app.core import catalog_cache
+from app.core.consumer_runtime import ConsumerRuntime, before_commit, handler
+from app.core.login_activity import login_activity
+from app.core.projections import ProjectionRuntime, projection
+from app.core.event_bus import get_event_bus
+from app.core.dedup import open_seen_index
 
 logger = logging.getLogger(__name__)
 
+# Группа consumers обработчиков событий
+GROUP_ID = 'crm-consumer-group'
 
-def create_consumer(topic: str) -> KafkaConsumer:
+# Запущенные consumers (для корректной остановки)
+_runtimes: List[ConsumerRuntime] = []
+
+
+class _RebalanceListener(ConsumerRebalanceListener):
+    """Адаптер: kafka-python принимает только наследников ConsumerRebalanceListener."""
+
+    def __init__(self, target):
+        self.target = target
+
+    def on_partitions_revoked(self, revoked):
+        self.target.on_partitions_revoked(revoked)
+
+    def on_partitions_assigned(self, assigned):
+        self.target.on_partitions_assigned(assigned)
+
+
+def create_consumer(
+    topic: str,
+    group_id: str | None = GROUP_ID,
+    assign_all: bool = False,
+    from_beginning: bool = False,
+    rebalance_listener=None,
+) -> KafkaConsumer:
     """
     Создать KafkaConsumer для чтения событий из топика.
-    
+
     Args:
         topic: Название топика для чтения
-    
+        group_id: Группа потребителей; None - читать все партиции
+            без группы (каждый процесс получает все события)
+        assign_all: Назначить все партиции топика вручную (без подписки),
+            чтобы сразу можно было сделать seek
+        from_beginning: Группа без сохранённых offset'ов читает с начала топика
+        rebalance_listener: Уведомлять о перераспределении партиций группы
+            (on_partitions_revoked / on_partitions_assigned)
+
     Returns:
         Настроенный KafkaConsumer
     """
     consumer = KafkaConsumer(
-        topic,
+        *(() if assign_all or rebalance_listener else (topic,)),
         bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS.split(','),
-        value_deserializer=lambda m: json.loads(m.decode('utf-8')),
+        value_deserializer=decode_event,
         key_deserializer=lambda k: k.decode('utf-8') if k else None,
         # Начинаем читать с последнего непрочитанного сообщения
-        auto_offset_reset='latest',
+        auto_offset_reset='earliest' if from_beginning else 'latest',
         # Группа потребителей (для балансировки нагрузки)
-        group_id='crm-consumer-group',
-        # Подтверждаем чтение сообщений
-        enable_auto_commit=True,
-        auto_commit_interval_ms=1000,
+        group_id=group_id,
+        # Offset'ы коммитит ConsumerRuntime после успешной обработки пачки
+        enable_auto_commit=False,
+        max_poll_records=settings.CONSUMER_MAX_POLL_RECORDS,
     )
-    
+    if assign_all:
+        consumer.assign([TopicPartition(topic, p) for p in sorted(consumer.partitions_for_topic(topic) or ())])
+    elif rebalance_listener is not None:
+        consumer.subscribe([topic], listener=_RebalanceListener(rebalance_listener))
+
     logger.info(f"Kafka consumer создан для топика '{topic}'")
     return consumer
 
 
-def process_user_event(event: Dict[str, Any]):
-    """Обработать событие пользователя."""
-    event_type = event.get('event_type')
-    
-    if event_type == 'user.created':
-        logger.info(
-            f"📝 Событие: Пользователь создан - "
-            f"ID: {event.get('user_id')}, "
-            f"Email: {event.get('email')}, "
-            f"Имя: {event.get('name')}"
-        )
-        # Здесь можно добавить дополнительную логику:
-        # - Отправка приветственного email
-        # - Создание профиля пользователя
-        # - Отправка в аналитическую систему
-        
-    elif event_type == 'user.logged_in':
-        logger.info(
-            f"🔐 Событие: Пользователь вошёл в систему - "
-            f"ID: {event.get('user_id')}, "
-            f"Email: {event.get('email')}"
-        )
-        # Здесь можно добавить:
-        # - Логирование активности
-        # - Обновление последнего времени входа
-        # - Отправка уведомления о безопасности
-
-
-def process_course_event(event: Dict[str, Any]):
-    """Обработать событие курса."""
-    event_type = event.get('event_type')
-    
-    if event_type == 'course.created':
-        logger.info(
-            f"📚 Событие: Курс создан - "
-            f"ID: {event.get('course_id')}, "
-            f"Название: {event.get('title')}, "
-            f"Цена: {event.get('price')}, "
-            f"Создан администратором: {event.get('created_by')}"
-        )
-        # Здесь можно добавить:
-        # - Отправка уведомления администраторам
-        # - Создание метаданных курса
-        # - Индексация для поиска
-
-
-def start_user_events_consumer():
-    """Запустить consumer для событий пользователей."""
-    try:
-        consumer = create_consumer(settings.KAFKA_TOPIC_USER_EVENTS)
-        logger.info(f"🚀 Consumer для топика '{settings.KAFKA_TOPIC_USER_EVENTS}' запущен")
-        
-        for message in consumer:
-            try:
-                event = message.value
-                process_user_event(event)
-                
-            except Exception as e:
-                logger.error(f"Ошибка при обработке события пользователя: {e}")
-                
-    except KafkaError as e:
-        logger.error(f"Ошибка Kafka consumer для пользователей: {e}")
-    except Exception as e:
-        logger.error(f"Неожиданная ошибка в consumer пользователей: {e}")
-
-
-def start_course_events_consumer():
-    """Запустить consumer для событий курсов."""
-    try:
-        consumer = create_consumer(settings.KAFKA_TOPIC_COURSE_EVENTS)
-        logger.info(f"🚀 Consumer для топика '{settings.KAFKA_TOPIC_COURSE_EVENTS}' запущен")
-        
-        for message in consumer:
-            try:
-                event = message.value
-                process_course_event(event)
-                
-            except Exception as e:
-                logger.error(f"Ошибка при обработке события курса: {e}")
-                
-    except KafkaError as e:
-        logger.error(f"Ошибка Kafka consumer для курсов: {e}")
-    except Exception as e:
-        logger.error(f"Неожиданная ошибка в consumer курсов: {e}")
+def _seek_from_projection(consumer, topic: str, partitions):
+    """Продолжить чтение партиций с offset'а проекции (новые партиции - с начала)."""
+    for tp in partitions:
+        offset = projection.offset(topic, tp.partition)
+        if offset is None:
+            consumer.seek_to_beginning(tp)
+        else:
+            consumer.seek(tp, offset + 1)
 
 
-def start_consumers():
+def create_projection_consumer(topic: str, group_id: str | None = None):
+    """
+    Создать consumer для проекции статистики (в шине из EVENT_BUS_BACKEND).
+
+    Все партиции топика назначаются сразу, чтение продолжается
+    с offset'а из сохранённого состояния проекции, а для новых
+    партиций - с начала топика.
+    """
+    consumer = get_event_bus().create_consumer(topic, group_id=None, assign_all=True)
+    _seek_from_projection(consumer, topic, consumer.assignment())
+
+    logger.info(f"Consumer статистики создан для топика '{topic}'")
+    return consumer
+
+
+def refresh_projection_partitions(consumer, topic: str) -> int:
     """
-    Запустить все consumers в отдельных потоках.
-    Эта функция вызывается при старте приложения.
+    Назначить consumer'у проекции партиции топика, появившиеся после запуска.
+
+    Нужно только Kafka: топик мог не существовать при запуске или
+    в нём добавили партиции (видны после обновления метаданных клиента).
+    Вызывается между пачками, поэтому позиции всех партиций заново
+    берутся из проекции - assign() не обязан их сохранять.
+
+    Returns:
+        Количество добавленных партиций
     """
-    import threading
-    
-    # Запускаем consumer для событий пользователей
-    user_thread = threading.Thread(
-        target=start_user_events_consumer,
-        daemon=True,  # Поток завершится при завершении основного процесса
-        name="user-events-consumer"
+    if not isinstance(consumer, KafkaConsumer):
+        return 0  # у шин в памяти и журнала набор партиций не меняется
+
+    assigned = consumer.assignment()
+    available = {TopicPartition(topic, p) for p in consumer.partitions_for_topic(topic) or ()}
+    added = available - assigned
+    if not added:
+        return 0
+
+    partitions = sorted(assigned | available)
+    consumer.assign(partitions)
+    _seek_from_projection(consumer, topic, partitions)
+    logger.info(f"Статистика: назначены новые партиции '{topic}': {sorted(tp.partition for tp in added)}")
+    return len(added)
+
+
+@handler('user.created')
+def log_user_created(event: Dict[str, Any]):
+    """Обработать создание пользователя."""
+    logger.info(
+        f"📝 Событие: Пользователь создан - "
+        f"ID: {event.get('user_id')}, "
+        f"Email: {event.get('email')}, "
+        f"Имя: {event.get('name')}"
     )
-    user_thread.start()
-    logger.info("✅ Поток consumer для событий пользователей запущен")
-    
-    # Запускаем consumer для событий курсов
-    course_thread = threading.Thread(
-        target=start_course_events_consumer,
-        daemon=True,
-        name="course-events-consumer"
+    # Здесь можно добавить дополнительную логику:
+    # - Отправка приветственного email
+    # - Создание профиля пользователя
+    # - Отправка в аналитическую систему
+
+
+@handler('user.logged_in')
+def log_user_logged_in(event: Dict[str, Any]):
+    """Обработать вход пользователя в систему."""
+    logger.info(
+        f"🔐 Событие: Пользователь вошёл в систему - "
+        f"ID: {event.get('user_id')}, "
+        f"Email: {event.get('email')}"
     )
-    course_thread.start()
-    logger.info("✅ Поток consumer для событий курсов запущен")
+    # Время и количество входов накапливаются в памяти и записываются
+    # одним UPDATE на пачку пользователей перед коммитом offset'ов
+    login_activity.record(event['user_id'], datetime.fromisoformat(event['timestamp']))
+    # Здесь можно добавить:
+    # - Отправка уведомления о безопасности
+
+
+@before_commit(settings.KAFKA_TOPIC_USER_EVENTS)
+def flush_login_activity():
+    """Записать накопленные входы пользователей до коммита offset'ов."""
+    login_activity.flush()
+
+
+@handler('course.created')
+def log_course_created(event: Dict[str, Any]):
+    """Обработать создание курса."""
+    logger.info(
+        f"📚 Событие: Курс создан - "
+        f"ID: {event.get('course_id')}, "
+        f"Название: {event.get('title')}, "
+        f"Цена: {event.get('price')}, "
+        f"Создан администратором: {event.get('created_by')}"
+    )
+    # Здесь можно добавить:
+    # - Отправка уведомления администраторам
+    # - Создание метаданных курса
+    # Индексация для поиска выполняется в create_course
+    # в той же транзакции (app.core.search.index_courses)
+
+
+def invalidate_catalog_cache(event: Dict[str, Any]):
+    """Сбросить кэш каталога при создании курса или записи на него в любом воркере."""
+    if event.get('event_type') == 'course.created':
+        catalog_cache.invalidate_course(event.get('course_id'))
+    elif event.get('event_type') == 'course.enrolled':
+        catalog_cache.invalidate_course(event.get('course_id'), lists=False)
+
+
+def start_group_consumers():
+    """
+    Обработчики событий пользователей и курсов.
+
+    Общая группа: партиции делятся между всеми процессами, в которых
+    запущены эти consumers (воркеры app.worker или веб-процессы).
+    Повторы отбрасываются по event_id, события, которые не удалось
+    обработать, уходят в <топик>.dlq (см. python -m app.manage redrive-dlq).
+    """
+    bus = get_event_bus()
+    for topic in (settings.KAFKA_TOPIC_USER_EVENTS, settings.KAFKA_TOPIC_COURSE_EVENTS):
+        _runtimes.append(ConsumerRuntime(
+            topic,
+            bus.create_consumer,
+            seen_index=open_seen_index(f"{GROUP_ID}.{topic}"),
+            dead_letter_topic=topic + settings.DLQ_SUFFIX,
+        ).start())
+        logger.info(f"✅ Поток consumer для топика '{topic}' запущен")
+
+
+def start_cache_consumer():
+    """
+    Сброс кэша каталога - без группы, чтобы событие получил каждый
+    веб-процесс и кэши всех процессов оставались согласованными.
+    """
+    _runtimes.append(ConsumerRuntime(
+        settings.KAFKA_TOPIC_COURSE_EVENTS,
+        get_event_bus().create_consumer,
+        group_id=None,
+        dispatcher=invalidate_catalog_cache,
+        workers=1,
+        name='catalog-cache',
+    ).start())
+    logger.info("✅ Поток consumer для сброса кэша каталога запущен")
+
+
+def start_projection_consumers():
+    """
+    Проекция статистики для GET /stats.
+
+    Работает ровно в одном процессе: состояние и offset'ы сохраняются
+    в STATS_STORE_PATH, остальные процессы читают файл. Процесс, который
+    не получил блокировку писателя, consumers проекции не запускает.
+    """
+    if not projection.acquire_writer():
+        logger.info("Статистику ведёт другой процесс, GET /stats читает его файл состояния")
+        return
+    for topic in (settings.KAFKA_TOPIC_USER_EVENTS, settings.KAFKA_TOPIC_COURSE_EVENTS):
+        _runtimes.append(ProjectionRuntime(
+            topic, create_projection_consumer, refresh_partitions=refresh_projection_partitions,
+        ).start())
+    logger.info("✅ Потоки consumer для статистики запущены")
+
+
+def start_consumers():
+    """
+    Запустить все consumers в отдельных потоках текущего процесса.
+
+    Consumers читают из шины EVENT_BUS_BACKEND (Kafka, память процесса
+    или локальный журнал), обработчики от бэкенда не зависят.
+    Обычно обработчики работают в отдельном процессе (python -m app.worker),
+    а веб-процесс запускает их только при RUN_CONSUMERS_IN_WEB.
+    """
+    start_group_consumers()
+    start_cache_consumer()
+    if settings.STATS_ENABLED:
+        start_projection_consumers()
+
 
+def stop_consumers():
+    """Остановить все consumers (вызывается при завершении приложения)."""
+    while _runtimes:
+        _runtimes.pop().stop(timeout=settings.CONSUMER_POLL_TIMEOUT_MS / 1000 + 5)
+    projection.checkpoint(force=True)
+    projection.release_writer()
+    logger.info("Consumers остановлены")
@@ -2,15 +2,100 @@ from kafka import KafkaProducer
 from kafka.errors import KafkaError
 import json
 import logging
-from typing import Dict, Any
+import os
+import queue
+import threading
+import time
+from typing import Dict, Any, Callable, List, Optional, Tuple
 
 from app.core.config import settings
+from app.core.codecs import encode_event
+from app.core import metrics
 
 logger = logging.getLogger(__name__)
 
 # Глобальный producer (создаётся один раз)
 _producer: KafkaProducer | None = None
 
+# Очередь и фоновый поток для асинхронного режима
+_queue: "queue.Queue[Tuple[str, Dict[str, Any], Optional[str]]] | None" = None
+_sender_thread: threading.Thread | None = None
+_stop_event = threading.Event()
+_lock = threading.Lock()
+_spill_lock = threading.Lock()
+
+# Сколько событий забирать из очереди за один проход фонового потока
+_DRAIN_BATCH = 500
+# Как часто пытаться переотправить события из файла переполнения (секунды)
+_SPILL_REPLAY_INTERVAL = 5.0
+
+# Подписчики на результат доставки: callback(topic, event, metadata, error)
+DeliveryCallback = Callable[[str, Dict[str, Any], Any, Optional[Exception]], None]
+_delivery_callbacks: List[DeliveryCallback] = []
+
+# Счётчики для мониторинга
+_metrics: Dict[str, int] = {
+    "enqueued": 0,
+    "delivered": 0,
+    "failed": 0,
+    "dropped": 0,
+    "spilled": 0,
+}
+
+
+def _inc(name: str, value: int = 1):
+    with _lock:
+        _metrics[name] += value
+
+
+def get_producer_metrics() -> Dict[str, int]:
+    """Текущие счётчики producer'а и размер очереди."""
+    with _lock:
+        metrics = dict(_metrics)
+    metrics["queue_size"] = _queue.qsize() if _queue is not None else 0
+    return metrics
+
+
+def _collect_metrics():
+    """Снять счётчики producer'а перед выдачей /metrics."""
+    for outcome, value in get_producer_metrics().items():
+        if outcome == "queue_size":
+            metrics.KAFKA_PRODUCER_QUEUE.set(value)
+        else:
+            metrics.KAFKA_PRODUCER_EVENTS.set_total(value, outcome)
+
+
+metrics.registry.on_collect(_collect_metrics)
+
+
+def add_delivery_callback(callback: DeliveryCallback):
+    """Подписаться на результат доставки событий (успех или ошибка)."""
+    _delivery_callbacks.append(callback)
+
+
+def create_producer(**overrides) -> KafkaProducer:
+    """
+    Новый KafkaProducer с настройками приложения.
+
+    overrides заменяют отдельные параметры - например, сжатие и размер
+    батча для массовой отправки (backfill).
+    """
+    config = dict(
+        bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS.split(','),
+        value_serializer=encode_event,
+        key_serializer=lambda k: k.encode('utf-8') if k else None,
+        # Настройки для надёжности
+        acks='all',  # Ждём подтверждения от всех реплик
+        retries=3,   # Количество попыток при ошибке
+        max_in_flight_requests_per_connection=settings.KAFKA_MAX_IN_FLIGHT,
+        # Настройки батчинга
+        linger_ms=settings.KAFKA_LINGER_MS,
+        batch_size=settings.KAFKA_BATCH_SIZE,
+        compression_type=settings.KAFKA_COMPRESSION_TYPE or None,
+    )
+    config.update(overrides)
+    return KafkaProducer(**config)
+
 
 def get_producer() -> KafkaProducer:
     """
@@ -18,66 +103,320 @@ def get_producer() -> KafkaProducer:
     Используется singleton паттерн - один producer на всё приложение.
     """
     global _producer
-    
+
     if _producer is None:
-        _producer = KafkaProducer(
-            bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS.split(','),
-            value_serializer=lambda v: json.dumps(v).encode('utf-8'),
-            key_serializer=lambda k: k.encode('utf-8') if k else None,
-            # Настройки для надёжности
-            acks='all',  # Ждём подтверждения от всех реплик
-            retries=3,   # Количество попыток при ошибке
-            max_in_flight_requests_per_connection=1,  # Порядок гарантирован
-        )
+        _producer = create_producer()
         logger.info(f"Kafka producer создан. Подключение к {settings.KAFKA_BOOTSTRAP_SERVERS}")
-    
+
     return _producer
 
 
 def send_event(topic: str, event: Dict[str, Any], key: str | None = None) -> bool:
     """
     Отправить событие в Kafka топик.
-    
+
+    В режиме "async" событие только ставится в очередь, отправкой
+    занимается фоновый поток. В режиме "sync" ждём подтверждения брокера.
+
     Args:
         topic: Название топика (например, "user-events")
         event: Словарь с данными события
         key: Опциональный ключ для партиционирования (по умолчанию None)
-    
+
     Returns:
-        True если событие успешно отправлено, False при ошибке
+        True если событие принято (поставлено в очередь или отправлено),
+        False при ошибке
     """
+    if settings.KAFKA_PRODUCER_MODE == "async":
+        return _enqueue(topic, event, key)
+
+    return _send_sync(topic, event, key)
+
+
+def _send_sync(topic: str, event: Dict[str, Any], key: str | None) -> bool:
+    """Синхронная отправка: ждём подтверждения от брокера."""
     try:
         producer = get_producer()
-        
+
         # Отправляем событие в Kafka
+        started = time.perf_counter()
         future = producer.send(topic, value=event, key=key)
-        
-        # Ждём подтверждения (можно сделать асинхронно, но для простоты синхронно)
-        record_metadata = future.get(timeout=10)
-        
+
+        # Ждём подтверждения
+        record_metadata = future.get(timeout=settings.KAFKA_SEND_TIMEOUT)
+        metrics.KAFKA_PRODUCE_LATENCY.observe(time.perf_counter() - started, topic)
+
         logger.info(
             f"Событие отправлено в топик '{topic}'. "
             f"Партиция: {record_metadata.partition}, "
             f"Offset: {record_metadata.offset}"
         )
-        
+        _on_delivered(topic, event, record_metadata)
+
         return True
-        
+
     except KafkaError as e:
         logger.error(f"Ошибка при отправке события в Kafka: {e}")
+        _on_failed(topic, event, key, e, spill=False)
         return False
-    
+
     except Exception as e:
         logger.error(f"Неожиданная ошибка при отправке события: {e}")
+        _on_failed(topic, event, key, e, spill=False)
+        return False
+
+
+def _enqueue(topic: str, event: Dict[str, Any], key: str | None) -> bool:
+    """Поставить событие в очередь с учётом политики переполнения."""
+    q = _ensure_sender()
+    item = (topic, event, key)
+    policy = settings.KAFKA_OVERFLOW_POLICY
+
+    try:
+        if policy == "block":
+            q.put(item, timeout=settings.KAFKA_ENQUEUE_TIMEOUT)
+        else:
+            q.put_nowait(item)
+        _inc("enqueued")
+        return True
+    except queue.Full:
+        pass
+
+    if policy == "spill":
+        return _spill([item])
+
+    _inc("dropped")
+    logger.warning(f"Очередь Kafka переполнена, событие для '{topic}' отброшено")
+    return False
+
+
+def _ensure_sender() -> "queue.Queue":
+    """Создать очередь и запустить фоновый поток отправки (один раз)."""
+    global _queue, _sender_thread
+
+    if _sender_thread is None or not _sender_thread.is_alive():
+        with _lock:
+            if _queue is None:
+                _queue = queue.Queue(maxsize=settings.KAFKA_QUEUE_MAXSIZE)
+            if _sender_thread is None or not _sender_thread.is_alive():
+                _stop_event.clear()
+                _sender_thread = threading.Thread(
+                    target=_sender_loop,
+                    daemon=True,
+                    name="kafka-producer-sender",
+                )
+                _sender_thread.start()
+
+    return _queue
+
+
+def _sender_loop():
+    """Фоновый поток: забирает события из очереди пачками и отдаёт producer'у."""
+    last_replay = time.monotonic()
+
+    while not (_stop_event.is_set() and _queue.empty()):
+        try:
+            batch = [_queue.get(timeout=0.1)]
+        except queue.Empty:
+            if time.monotonic() - last_replay >= _SPILL_REPLAY_INTERVAL:
+                last_replay = time.monotonic()
+                _replay_spill()
+            continue
+
+        while len(batch) < _DRAIN_BATCH:
+            try:
+                batch.append(_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        try:
+            _dispatch(batch)
+        finally:
+            for _ in batch:
+                _queue.task_done()
+
+
+def _dispatch(batch: List[Tuple[str, Dict[str, Any], Optional[str]]], respill: bool = False):
+    """
+    Передать пачку событий producer'у без ожидания подтверждений.
+
+    respill=True - события из файла переполнения: не принятые producer'ом
+    дописываются обратно в файл при любой политике переполнения.
+    """
+    try:
+        producer = get_producer()
+    except Exception as e:
+        logger.error(f"Не удалось создать Kafka producer: {e}")
+        for topic, event, key in batch:
+            _on_failed(topic, event, key, e, respill=respill)
+        # Не крутимся в холостую, пока брокер недоступен
+        time.sleep(1.0)
+        return
+
+    for topic, event, key in batch:
+        started = time.perf_counter()
+        try:
+            future = producer.send(topic, value=event, key=key)
+        except Exception as e:
+            _on_failed(topic, event, key, e, respill=respill)
+            continue
+
+        future.add_callback(_make_success_callback(topic, event, started))
+        future.add_errback(_make_error_callback(topic, event, key, respill))
+
+
+def _make_success_callback(topic: str, event: Dict[str, Any], started: float):
+    def on_success(metadata):
+        metrics.KAFKA_PRODUCE_LATENCY.observe(time.perf_counter() - started, topic)
+        _on_delivered(topic, event, metadata)
+    return on_success
+
+
+def _make_error_callback(topic: str, event: Dict[str, Any], key: str | None, respill: bool = False):
+    return lambda error: _on_failed(topic, event, key, error, respill=respill)
+
+
+def track_delivery(future, topic: str, started: float):
+    """
+    Учесть в метриках доставку события, отправленного в обход очереди
+    (EventBus.publish_batch: outbox relay, dead-letter, backfill).
+
+    Повтор и spill решает вызывающий код, поэтому здесь - только задержка
+    и счётчики delivered/failed.
+    """
+    def on_success(metadata):
+        metrics.KAFKA_PRODUCE_LATENCY.observe(time.perf_counter() - started, topic)
+        _inc("delivered")
+
+    future.add_callback(on_success)
+    future.add_errback(lambda error: _inc("failed"))
+
+
+def record_send_failure():
+    """Учесть событие, которое producer не принял к отправке (publish_batch)."""
+    _inc("failed")
+
+
+def _on_delivered(topic: str, event: Dict[str, Any], metadata):
+    _inc("delivered")
+    _notify(topic, event, metadata, None)
+
+
+def _on_failed(
+    topic: str,
+    event: Dict[str, Any],
+    key: str | None,
+    error: Exception,
+    spill: bool = True,
+    respill: bool = False,
+):
+    _inc("failed")
+    logger.error(f"Ошибка доставки события в топик '{topic}': {error}")
+    # При политике spill не теряем событие - переотправим его позже.
+    # Событие из файла переполнения возвращаем в файл при любой политике.
+    if respill or (spill and settings.KAFKA_OVERFLOW_POLICY == "spill"):
+        _spill([(topic, event, key)])
+    _notify(topic, event, None, error)
+
+
+def _notify(topic: str, event: Dict[str, Any], metadata, error: Optional[Exception]):
+    for callback in _delivery_callbacks:
+        try:
+            callback(topic, event, metadata, error)
+        except Exception as e:
+            logger.error(f"Ошибка в callback доставки: {e}")
+
+
+def _spill(items: List[Tuple[str, Dict[str, Any], Optional[str]]]) -> bool:
+    """Дописать события в файл переполнения (JSON Lines)."""
+    try:
+        with _spill_lock, open(settings.KAFKA_SPILL_PATH, "a", encoding="utf-8") as f:
+            for topic, event, key in items:
+                f.write(json.dumps({"topic": topic, "key": key, "event": event}) + "\n")
+    except OSError as e:
+        _inc("dropped", len(items))
+        logger.error(f"Не удалось записать события в файл переполнения: {e}")
         return False
 
+    _inc("spilled", len(items))
+    return True
+
+
+def _read_spill(path: str) -> List[Tuple[str, Dict[str, Any], Optional[str]]]:
+    """События из файла переполнения; недописанные строки пропускаются."""
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                # Хвост, оборванный падением процесса посреди записи
+                _inc("dropped")
+                logger.error(f"Пропущена повреждённая строка файла переполнения {path}")
+                continue
+            items.append((item["topic"], item["event"], item["key"]))
+    return items
+
+
+def _replay_spill():
+    """
+    Переотправить события, сохранённые в файл переполнения.
+
+    Файл переименовывается в .replay, новые события пишутся в свежий файл.
+    .replay удаляется только после того, как producer отправил всё (flush):
+    при падении процесса или ошибке flush файл остаётся и переотправляется
+    следующим проходом - события могут задублироваться, но не теряются.
+    Если .replay остался от прерванного прохода, сначала переотправляется
+    он, а файл переполнения ждёт следующего прохода. События, которые
+    producer не принял или брокер отверг, _on_failed дописывает обратно
+    в файл переполнения.
+    """
+    path = settings.KAFKA_SPILL_PATH
+    replay_path = path + ".replay"
+
+    with _spill_lock:
+        if not os.path.exists(replay_path):
+            if not os.path.exists(path):
+                return
+            os.replace(path, replay_path)
+
+    items = _read_spill(replay_path)
+
+    logger.info(f"Переотправка {len(items)} событий из файла переполнения")
+    for start in range(0, len(items), _DRAIN_BATCH):
+        _dispatch(items[start:start + _DRAIN_BATCH], respill=True)
+
+    if _producer is not None:
+        try:
+            _producer.flush(timeout=settings.KAFKA_SEND_TIMEOUT)
+        except KafkaError as e:
+            logger.error(f"Переотправка из файла переполнения не подтверждена, повторим позже: {e}")
+            return
+    os.remove(replay_path)
+
+
+def flush_producer(timeout: float | None = None):
+    """Дождаться отправки всех событий из очереди и буферов producer'а."""
+    if _queue is not None and _sender_thread is not None and _sender_thread.is_alive():
+        _queue.join()
+    if _producer is not None:
+        _producer.flush(timeout=timeout)
+
 
 def close_producer():
     """Закрыть producer (вызывается при завершении приложения)."""
-    global _producer
-    
+    global _producer, _sender_thread
+
+    # Останавливаем фоновый поток, предварительно дав ему разобрать очередь
+    if _sender_thread is not None:
+        _stop_event.set()
+        _sender_thread.join(timeout=settings.KAFKA_SEND_TIMEOUT)
+        _sender_thread = None
+
     if _producer is not None:
+        _producer.flush(timeout=settings.KAFKA_SEND_TIMEOUT)
         _producer.close()
         _producer = None
         logger.info("Kafka producer закрыт")
-
@@ -0,0 +1,122 @@
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+from app.core import catalog_cache, counters
+from app.core.pagination import keyset_select, next_cursor, NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER
+from app.core.sparse import load_columns, order_by_ids, select_by_ids
+from app.models.course import Course
+from app.models.user import User
+
+# Выборки списков пользователей и курсов для синхронных и асинхронных роутеров.
+# Функции принимают синхронную Session, асинхронные роутеры выполняют их
+# через AsyncSession.run_sync: фильтры, keyset-пагинация и подсчёт описаны
+# один раз, различается только способ выполнения.
+
+# (min_price, max_price, title_prefix)
+CourseFilterParams = Tuple[Optional[Decimal], Optional[Decimal], Optional[str]]
+
+
+def course_filters(
+    min_price: Optional[Decimal], max_price: Optional[Decimal], title_prefix: Optional[str],
+) -> list:
+    """
+    Условия фильтров списка курсов.
+
+    Префикс названия - диапазон title >= prefix AND title < prefix + U+10FFFF,
+    а не LIKE: диапазон использует индекс по title в любой БД (SQLite
+    не применяет индекс к регистронезависимому LIKE).
+    """
+    filters = []
+    if min_price is not None:
+        filters.append(Course.price >= min_price)
+    if max_price is not None:
+        filters.append(Course.price <= max_price)
+    if title_prefix:
+        filters.append(Course.title >= title_prefix)
+        filters.append(Course.title < title_prefix + "\U0010ffff")
+    return filters
+
+
+def count_courses(db: Session, filters: list) -> int:
+    """Количество курсов: без фильтров - из счётчика строк, иначе COUNT(*) по индексу."""
+    if not filters:
+        return counters.read_count(db, "courses")
+    return counters.count_rows(db, Course, *filters)
+
+
+def _by_ids(db: Session, model, schema: Type[BaseModel], id_list: List[int]) -> List[Any]:
+    """Строки по списку id одним запросом, в порядке списка."""
+    stmt = select_by_ids(model, id_list).options(load_columns(model, schema))
+    return order_by_ids(db.execute(stmt).scalars().all(), id_list)
+
+
+def _cursor_headers(rows: List[Any], order_by: str, limit: int, descending: bool = False) -> Dict[str, str]:
+    cursor_value = next_cursor(rows, order_by, limit, descending=descending)
+    return {NEXT_CURSOR_HEADER: cursor_value} if cursor_value else {}
+
+
+def list_users(
+    db: Session,
+    schema: Type[BaseModel],
+    id_list: Optional[List[int]],
+    cursor: Optional[str],
+    limit: int,
+    skip: int = 0,
+) -> Tuple[List[Any], Dict[str, str]]:
+    """
+    Страница пользователей (или пользователи по списку id) и заголовки ответа.
+
+    Returns:
+        (строки с колонками схемы, заголовки - X-Next-Cursor)
+    """
+    if id_list is not None:
+        return _by_ids(db, User, schema, id_list), {}
+
+    stmt = keyset_select(User, cursor=cursor, limit=limit).options(load_columns(User, schema))
+    if skip and not cursor:
+        stmt = stmt.offset(skip)
+    users = db.execute(stmt).scalars().all()
+    return users, _cursor_headers(users, "id", limit)
+
+
+def list_courses(
+    db: Session,
+    schema: Type[BaseModel],
+    id_list: Optional[List[int]],
+    filter_params: CourseFilterParams,
+    cursor: Optional[str],
+    limit: int,
+    skip: int = 0,
+    order_by: str = "id",
+    descending: bool = False,
+) -> Tuple[List[Any], Dict[str, str]]:
+    """
+    Страница курсов под фильтры (или курсы по списку id) и заголовки ответа.
+
+    Количество курсов под фильтры берётся из кэша каталога, а при промахе
+    считается (count_courses) и кэшируется до изменения каталога.
+
+    Returns:
+        (строки с колонками схемы, заголовки - X-Next-Cursor и X-Total-Count)
+    """
+    if id_list is not None:
+        return _by_ids(db, Course, schema, id_list), {}
+
+    filters = course_filters(*filter_params)
+    stmt = keyset_select(Course, order_by=order_by, cursor=cursor, limit=limit, descending=descending)
+    if skip and not cursor:
+        stmt = stmt.offset(skip)
+    stmt = stmt.where(*filters).options(load_columns(Course, schema, order_by))
+    courses = db.execute(stmt).scalars().all()
+    headers = _cursor_headers(courses, order_by, limit, descending)
+
+    total_key = catalog_cache.total_key(*filter_params)
+    total = catalog_cache.get_total(total_key)
+    if total is None:
+        total = count_courses(db, filters)
+        catalog_cache.put_total(total_key, total)
+    headers[TOTAL_COUNT_HEADER] = str(total)
+    return courses, headers
@@ -0,0 +1,115 @@
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List
+
+from sqlalchemy import bindparam, or_, select, update
+
+from app.core.database import SessionLocal
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+_users = User.__table__
+
+# Сколько пользователей читать одним SELECT (ограничение числа параметров SQLite)
+_SELECT_CHUNK = 500
+
+# Один UPDATE на пользователя; выполняется как executemany по всем накопленным входам.
+# Условие на last_login_at не даёт записать входы поверх более позднего
+_UPDATE_LOGINS = (
+    update(_users)
+    .where(_users.c.id == bindparam("b_user_id"))
+    .where(or_(_users.c.last_login_at.is_(None), _users.c.last_login_at < bindparam("b_last_login_at")))
+    .values(
+        login_count=_users.c.login_count + bindparam("b_count"),
+        last_login_at=bindparam("b_last_login_at"),
+    )
+)
+
+
+class LoginActivity:
+    """
+    Входы пользователей, накопленные между коммитами offset'ов consumer'а.
+
+    record() только добавляет время входа в буфер пользователя, поэтому
+    пик входов не превращается в поток UPDATE по таблице users:
+    flush() записывает всех накопленных пользователей одним executemany.
+    Если запись не удалась, входы возвращаются в буфер и будут записаны
+    при следующем flush().
+
+    Запись идемпотентна: last_login_at служит отметкой уже учтённых входов,
+    и в login_count попадают только входы позже неё. Поэтому события,
+    прочитанные повторно после падения между flush() и коммитом offset'ов,
+    не учитываются дважды. Вход, пришедший позже более позднего входа
+    того же пользователя, тоже не учитывается (события одного пользователя
+    приходят по порядку - ключ сообщения user_id).
+    """
+
+    def __init__(self):
+        self._pending: Dict[int, List[datetime]] = {}
+        self._lock = threading.Lock()
+        # flush() из нескольких потоков выполняется по очереди
+        self._flush_lock = threading.Lock()
+
+    def record(self, user_id: int, logged_in_at: datetime):
+        """Учесть вход пользователя (в БД попадёт при flush)."""
+        with self._lock:
+            self._pending.setdefault(user_id, []).append(logged_in_at)
+
+    def _merge(self, pending: Dict[int, List[datetime]]):
+        with self._lock:
+            for user_id, logins in pending.items():
+                self._pending[user_id] = logins + self._pending.get(user_id, [])
+
+    def _recorded(self, db, user_ids: List[int]) -> Dict[int, datetime | None]:
+        """Последний учтённый вход пользователей из users."""
+        recorded = {}
+        for start in range(0, len(user_ids), _SELECT_CHUNK):
+            chunk = user_ids[start:start + _SELECT_CHUNK]
+            recorded.update(db.execute(
+                select(_users.c.id, _users.c.last_login_at).where(_users.c.id.in_(chunk))
+            ).all())
+        return recorded
+
+    def flush(self) -> int:
+        """
+        Записать накопленные входы в users.
+
+        Returns:
+            Количество обновлённых пользователей
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+
+            db = SessionLocal()
+            try:
+                recorded = self._recorded(db, list(pending))
+                params = []
+                for user_id, logins in pending.items():
+                    last_login_at = recorded.get(user_id)
+                    new = [at for at in logins if last_login_at is None or at > last_login_at]
+                    if new:
+                        params.append({"b_user_id": user_id, "b_count": len(new), "b_last_login_at": max(new)})
+                if params:
+                    db.execute(_UPDATE_LOGINS, params)
+                db.commit()
+            except Exception:
+                db.rollback()
+                self._merge(pending)
+                raise
+            finally:
+                db.close()
+
+        logger.debug(f"Входы записаны для {len(params)} пользователей")
+        return len(params)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+
+login_activity = LoginActivity()
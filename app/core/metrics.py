@@ -0,0 +1,319 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+# Границы гистограмм по умолчанию (секунды)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(ABC):
+    """Базовый класс метрики с метками (формат Prometheus text 0.0.4)."""
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+    @abstractmethod
+    def render(self) -> List[str]:
+        """Строки метрики для /metrics (вместе с HELP и TYPE)."""
+
+
+class Counter(Metric):
+    """Монотонно растущий счётчик."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def set_total(self, value: float, *labels: str):
+        """Выставить значение счётчика, который ведётся в другом месте (снимается при выдаче)."""
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in items
+        ]
+
+
+class Gauge(Metric):
+    """Текущее значение (может уменьшаться)."""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, *labels: str):
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in items
+        ]
+
+
+class Histogram(Metric):
+    """Гистограмма с фиксированными границами корзин."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # метки -> [счётчики по корзинам..., сумма, количество]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(labels, list(state)) for labels, state in self._values.items()]
+        lines = self.header()
+        for labels, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{label_str} {state[-1]}")
+        return lines
+
+
+class Registry:
+    """Набор метрик и функций, обновляющих значения перед выдачей."""
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def on_collect(self, collector: Callable[[], None]):
+        """Функция, которая вызывается перед render (например, снять состояние пула)."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            collector()
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# --- HTTP ---
+
+HTTP_REQUESTS = registry.register(Counter(
+    "http_requests_total", "Количество HTTP-запросов", ("method", "route", "status"),
+))
+HTTP_LATENCY = registry.register(Histogram(
+    "http_request_duration_seconds", "Время обработки HTTP-запроса", ("method", "route"),
+))
+HTTP_DB_QUERIES = registry.register(Histogram(
+    "http_request_db_queries", "SQL-запросов за один HTTP-запрос", ("method", "route"),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+))
+HTTP_DB_SECONDS = registry.register(Histogram(
+    "http_request_db_seconds", "Время SQL-запросов за один HTTP-запрос", ("method", "route"),
+))
+
+# --- Ограничение нагрузки ---
+
+ADMISSION_REJECTED = registry.register(Counter(
+    "admission_rejected_total", "Отклонённые запросы по причине", ("route", "reason"),
+))
+ADMISSION_IN_FLIGHT = registry.register(Gauge(
+    "admission_in_flight_requests", "Запросов в обработке (для ADMISSION_MAX_CONCURRENCY)",
+))
+
+# --- БД ---
+
+DB_QUERIES = registry.register(Counter(
+    "db_queries_total", "Количество SQL-запросов", ("engine",),
+))
+DB_QUERY_LATENCY = registry.register(Histogram(
+    "db_query_duration_seconds", "Время выполнения SQL-запроса", ("engine",),
+))
+DB_POOL_SIZE = registry.register(Gauge(
+    "db_pool_size", "Размер пула соединений", ("engine",),
+))
+DB_POOL_CHECKED_OUT = registry.register(Gauge(
+    "db_pool_checked_out", "Соединений выдано из пула", ("engine",),
+))
+DB_POOL_OVERFLOW = registry.register(Gauge(
+    "db_pool_overflow", "Соединений сверх размера пула", ("engine",),
+))
+DB_POOL_WAIT_SECONDS = registry.register(Counter(
+    "db_pool_wait_seconds_total", "Суммарное ожидание соединения из пула", ("engine",),
+))
+DB_POOL_CHECKOUTS = registry.register(Counter(
+    "db_pool_checkouts_total", "Количество получений соединения из пула", ("engine",),
+))
+
+# --- Kafka producer ---
+
+KAFKA_PRODUCE_LATENCY = registry.register(Histogram(
+    "kafka_produce_duration_seconds", "Время от send() до подтверждения брокера", ("topic",),
+))
+KAFKA_PRODUCER_EVENTS = registry.register(Counter(
+    "kafka_producer_events_total", "События producer'а по результату", ("outcome",),
+))
+KAFKA_PRODUCER_QUEUE = registry.register(Gauge(
+    "kafka_producer_queue_size", "Событий в очереди асинхронного producer'а",
+))
+
+# --- Kafka consumers ---
+
+KAFKA_CONSUMER_LATENCY = registry.register(Histogram(
+    "kafka_consumer_process_seconds", "Время обработки события consumer'ом", ("topic", "event_type"),
+))
+KAFKA_CONSUMER_FAILED_BATCHES = registry.register(Counter(
+    "kafka_consumer_failed_batches_total", "Пачки, обработка которых завершилась ошибкой", ("topic",),
+))
+KAFKA_CONSUMER_DUPLICATES = registry.register(Counter(
+    "kafka_consumer_duplicates_total", "Пропущенные повторы уже обработанных событий", ("topic", "consumer"),
+))
+KAFKA_CONSUMER_DEAD_LETTERS = registry.register(Counter(
+    "kafka_consumer_dead_letters_total", "События, отправленные в dead-letter топик", ("topic",),
+))
+KAFKA_CONSUMER_LAG = registry.register(Gauge(
+    "kafka_consumer_lag", "Отставание consumer'а от конца партиции (сообщений)", ("topic", "partition", "consumer"),
+))
+
+
+# --- SQL-запросы текущего HTTP-запроса ---
+
+class RequestQueries:
+    """Счётчик SQL-запросов, выполненных при обработке одного HTTP-запроса."""
+
+    __slots__ = ("count", "seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+
+_current_request: ContextVar[Optional[RequestQueries]] = ContextVar("metrics_request", default=None)
+
+
+def observe_query(engine_name: str, seconds: float):
+    """Учесть выполненный SQL-запрос (вызывается из хуков движка)."""
+    DB_QUERIES.inc(engine_name)
+    DB_QUERY_LATENCY.observe(seconds, engine_name)
+    queries = _current_request.get()
+    if queries is not None:
+        queries.count += 1
+        queries.seconds += seconds
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware: время ответа, статус и SQL-запросы по маршрутам.
+
+    Маршрут берётся из шаблона пути ('/users/{user_id}'), а не из URL,
+    чтобы число рядов метрик не росло с числом id.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+        queries = RequestQueries()
+        token = _current_request.set(queries)
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _current_request.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            HTTP_REQUESTS.inc(method, path, str(status_code))
+            HTTP_LATENCY.observe(time.perf_counter() - started, method, path)
+            HTTP_DB_QUERIES.observe(queries.count, method, path)
+            HTTP_DB_SECONDS.observe(queries.seconds, method, path)
+
+
+def render() -> str:
+    """Все метрики в текстовом формате Prometheus."""
+    return registry.render()
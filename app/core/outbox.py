@@ -0,0 +1,227 @@
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Any, Iterable, Tuple
+
+from sqlalchemy import select, delete, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.codecs import json_dumps, json_loads
+from app.core.database import SessionLocal
+from app.core.event_bus import get_event_bus, stamp_event
+from app.models.outbox import OutboxEvent, OutboxCheckpoint
+
+logger = logging.getLogger(__name__)
+
+# Имя строки-блокировки relay в таблице outbox_checkpoints
+RELAY_NAME = "kafka-relay"
+
+_relay_thread: threading.Thread | None = None
+_stop_event = threading.Event()
+
+
+def add_outbox_event(db: Session, topic: str, event: Dict[str, Any], key: str | None = None):
+    """
+    Записать событие в outbox в рамках текущей транзакции.
+
+    Событие попадёт в Kafka только после коммита транзакции,
+    вместе с которой были сохранены данные. event_id назначается здесь,
+    поэтому повторная пересылка relay не создаёт "новое" событие.
+    """
+    event, key = stamp_event(event, key)
+    db.add(OutboxEvent(topic=topic, key=key, payload=json_dumps(event).decode('utf-8')))
+
+
+def add_outbox_events(db: Session, topic: str, events: Iterable[Tuple[Dict[str, Any], str | None]]):
+    """Записать пачку событий (событие, ключ) в outbox в рамках текущей транзакции."""
+    stamped = (stamp_event(event, key) for event, key in events)
+    db.add_all([
+        OutboxEvent(topic=topic, key=key, payload=json_dumps(event).decode('utf-8'))
+        for event, key in stamped
+    ])
+
+
+def _relay_owner() -> str:
+    """Владелец аренды relay (вычисляется при вызове: после fork у процесса новый pid)."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def acquire_relay_lease(db: Session) -> bool:
+    """
+    Захватить или продлить аренду relay на OUTBOX_LEASE_SECONDS.
+
+    Условный UPDATE строки-блокировки в короткой транзакции атомарен
+    на любой СУБД (SELECT ... FOR UPDATE в SQLite ничего не блокирует),
+    поэтому из relay всех процессов события пересылает один.
+
+    Returns:
+        False, если аренду держит relay другого процесса
+    """
+    now = datetime.utcnow()
+    owner = _relay_owner()
+    lease = {"owner": owner, "lease_until": now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)}
+    acquired = db.execute(
+        update(OutboxCheckpoint)
+        .where(OutboxCheckpoint.name == RELAY_NAME)
+        .where(or_(
+            OutboxCheckpoint.owner == owner,
+            OutboxCheckpoint.lease_until.is_(None),
+            OutboxCheckpoint.lease_until < now,
+        ))
+        .values(**lease)
+    ).rowcount
+    if not acquired and db.get(OutboxCheckpoint, RELAY_NAME) is None:
+        db.add(OutboxCheckpoint(name=RELAY_NAME, **lease))
+        try:
+            db.commit()
+        except IntegrityError:
+            # Строку одновременно создал relay другого процесса
+            db.rollback()
+            return False
+        return True
+    db.commit()
+    return bool(acquired)
+
+
+def release_relay_lease(db: Session):
+    """Отпустить аренду relay этого процесса (при остановке)."""
+    db.execute(
+        update(OutboxCheckpoint)
+        .where(OutboxCheckpoint.name == RELAY_NAME)
+        .where(OutboxCheckpoint.owner == _relay_owner())
+        .values(lease_until=None)
+    )
+    db.commit()
+
+
+def relay_batch(db: Session) -> int:
+    """
+    Переслать в шину событий (Kafka) очередную пачку событий outbox.
+
+    Доставка отмечается по каждой строке (delivered_at), а не позицией
+    "последний id": id назначаются до коммита, и при параллельных
+    транзакциях событие с меньшим id может стать видимым позже события
+    с большим - сдвиг позиции мимо него потерял бы событие. Такое событие
+    просто попадёт в следующую пачку.
+
+    Транзакции короткие: аренда, чтение пачки и отметка доставки.
+    Публикация (ожидание брокера до KAFKA_SEND_TIMEOUT) выполняется вне
+    транзакции, поэтому запросы API, которые пишут в outbox, её не ждут.
+
+    Returns:
+        Количество доставленных событий
+    """
+    if not acquire_relay_lease(db):
+        return 0
+
+    # Строки, а не объекты ORM: после rollback() их поля не перечитываются из БД
+    events = db.execute(
+        select(OutboxEvent.id, OutboxEvent.topic, OutboxEvent.key, OutboxEvent.payload)
+        .where(OutboxEvent.delivered_at.is_(None))
+        .order_by(OutboxEvent.id)
+        .limit(settings.OUTBOX_BATCH_SIZE)
+    ).all()
+    db.rollback()  # закрыть транзакцию чтения до публикации
+
+    if not events:
+        return 0
+
+    delivered = get_event_bus().publish_batch([
+        (e.topic, json_loads(e.payload), e.key) for e in events
+    ])
+
+    # Помечаем только доставленный префикс: остальные события уйдут
+    # в следующей пачке в том же порядке
+    if delivered < len(events):
+        logger.error(f"Не удалось доставить событие outbox #{events[delivered].id}")
+    if delivered:
+        db.execute(
+            update(OutboxEvent)
+            .where(OutboxEvent.id.in_([e.id for e in events[:delivered]]))
+            .values(delivered_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+    return delivered
+
+
+def prune_delivered(db: Session) -> int:
+    """Удалить события, доставленные раньше чем OUTBOX_RETENTION_SECONDS назад."""
+    threshold = datetime.utcnow() - timedelta(seconds=settings.OUTBOX_RETENTION_SECONDS)
+    result = db.execute(
+        delete(OutboxEvent)
+        .where(OutboxEvent.delivered_at < threshold)
+    )
+    db.commit()
+    return result.rowcount
+
+
+def _relay_loop():
+    """Фоновый цикл relay: пересылка событий и периодическая очистка outbox."""
+    last_prune = 0.0
+
+    while not _stop_event.is_set():
+        delivered = 0
+        db = SessionLocal()
+        try:
+            delivered = relay_batch(db)
+            if delivered:
+                logger.info(f"Relay outbox: доставлено событий - {delivered}")
+
+            if time.monotonic() - last_prune >= settings.OUTBOX_PRUNE_INTERVAL:
+                last_prune = time.monotonic()
+                pruned = prune_delivered(db)
+                if pruned:
+                    logger.info(f"Relay outbox: удалено доставленных событий - {pruned}")
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Ошибка relay outbox: {e}")
+            _stop_event.wait(1.0)
+        finally:
+            db.close()
+
+        # Пока есть полные пачки - забираем следующую без паузы
+        if delivered < settings.OUTBOX_BATCH_SIZE:
+            _stop_event.wait(settings.OUTBOX_POLL_INTERVAL)
+
+    # Relay другого процесса может забрать пересылку, не дожидаясь истечения аренды
+    db = SessionLocal()
+    try:
+        release_relay_lease(db)
+    except Exception as e:
+        logger.error(f"Не удалось отпустить аренду relay outbox: {e}")
+    finally:
+        db.close()
+
+
+def start_outbox_relay():
+    """Запустить relay outbox в отдельном потоке."""
+    global _relay_thread
+
+    if _relay_thread is not None and _relay_thread.is_alive():
+        return
+
+    _stop_event.clear()
+    _relay_thread = threading.Thread(
+        target=_relay_loop,
+        daemon=True,
+        name="outbox-relay",
+    )
+    _relay_thread.start()
+    logger.info("✅ Поток relay outbox запущен")
+
+
+def stop_outbox_relay():
+    """Остановить relay outbox (вызывается при завершении приложения)."""
+    global _relay_thread
+
+    if _relay_thread is not None:
+        _stop_event.set()
+        _relay_thread.join(timeout=settings.KAFKA_SEND_TIMEOUT)
+        _relay_thread = None
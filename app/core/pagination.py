@@ -0,0 +1,112 @@
+import base64
+import json
+from decimal import Decimal, InvalidOperation
+from typing import Any, List, Optional
+
+from fastapi import HTTPException, Query, status
+from sqlalchemy import Numeric, and_, or_, select
+from sqlalchemy.sql import Select
+
+from app.core.config import settings
+
+# Заголовок ответа с курсором следующей страницы
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Заголовок ответа с количеством строк под фильтры запроса (по всем страницам)
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+
+def page_limit(default: int):
+    """
+    Зависимость FastAPI для параметра limit списков.
+
+    limit больше PAGE_MAX_LIMIT не отклоняется, а урезается до него:
+    клиент получает неполный список и курсор следующей страницы
+    в X-Next-Cursor, как и при любой другой полной странице.
+    """
+    def dependency(limit: int = Query(default, ge=1, description="Размер страницы (не больше PAGE_MAX_LIMIT)")) -> int:
+        return min(limit, settings.PAGE_MAX_LIMIT)
+    return dependency
+
+
+def encode_cursor(order_by: str, value: Any, last_id: int) -> str:
+    """Упаковать позицию (значение сортировки, id) в непрозрачный курсор."""
+    if isinstance(value, Decimal):
+        value = str(value)
+    raw = json.dumps([order_by, value, last_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, order_by: str, numeric: bool = False) -> tuple[Any, int]:
+    """
+    Распаковать курсор; курсор должен быть выдан для той же сортировки.
+
+    numeric=True - значение сортировки приводится к Decimal (колонки Numeric).
+    Любой некорректный курсор - ошибка 400.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_order, value, last_id = json.loads(base64.urlsafe_b64decode(padded))
+        if cursor_order != order_by or not isinstance(last_id, int) or isinstance(last_id, bool):
+            raise ValueError
+        if not isinstance(value, (str, int, float)):
+            raise ValueError
+        if numeric:
+            value = Decimal(str(value))
+            if not value.is_finite():
+                raise ValueError
+    except (ValueError, TypeError, InvalidOperation):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректный курсор"
+        )
+    return value, last_id
+
+
+def _cursor_order(order_by: str, descending: bool) -> str:
+    """Сортировка, для которой выдан курсор ("-price" - по убыванию)."""
+    return f"-{order_by}" if descending else order_by
+
+
+def keyset_select(
+    model, order_by: str = "id", cursor: Optional[str] = None, limit: int = 100, descending: bool = False,
+) -> Select:
+    """
+    Запрос страницы с keyset-пагинацией по (order_by, id).
+
+    Вместо OFFSET используется условие "после последней строки предыдущей
+    страницы", поэтому стоимость запроса не зависит от глубины страницы
+    (при наличии индекса по (order_by, id); при descending индекс
+    читается в обратном порядке).
+    """
+    id_column = model.id
+    stmt = select(model)
+    cursor_order = _cursor_order(order_by, descending)
+
+    def after(column, value):
+        return column < value if descending else column > value
+
+    def direction(column):
+        return column.desc() if descending else column.asc()
+
+    if order_by == "id":
+        if cursor:
+            _, last_id = decode_cursor(cursor, cursor_order)
+            stmt = stmt.where(after(id_column, last_id))
+        return stmt.order_by(direction(id_column)).limit(limit)
+
+    sort_column = getattr(model, order_by)
+    if cursor:
+        value, last_id = decode_cursor(cursor, cursor_order, numeric=isinstance(sort_column.type, Numeric))
+        stmt = stmt.where(or_(
+            after(sort_column, value),
+            and_(sort_column == value, after(id_column, last_id)),
+        ))
+    return stmt.order_by(direction(sort_column), direction(id_column)).limit(limit)
+
+
+def next_cursor(rows: List[Any], order_by: str, limit: int, descending: bool = False) -> Optional[str]:
+    """Курсор следующей страницы или None, если страница последняя."""
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(_cursor_order(order_by, descending), getattr(last, order_by), last.id)
@@ -0,0 +1,310 @@
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.consumer_runtime import ConsumerRuntime
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировка писателя недоступна
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Версия формата файла с состоянием (при несовпадении проекция строится заново)
+STORE_VERSION = 1
+
+
+def _hour_bucket(timestamp: Optional[str]) -> str:
+    """Часовой интервал события: '2024-01-01T13:00'."""
+    try:
+        moment = datetime.fromisoformat(timestamp) if timestamp else datetime.now()
+    except ValueError:
+        moment = datetime.now()
+    return moment.strftime("%Y-%m-%dT%H:00")
+
+
+class StatsProjection:
+    """
+    Аналитика, которая поддерживается инкрементально по событиям Kafka.
+
+    - регистрации и входы: общий счётчик и счётчики по часам;
+    - курсы: количество по администраторам;
+    - цены курсов: сумма, min/max и гистограмма по STATS_PRICE_BUCKETS.
+
+    Состояние вместе с offset'ами партиций периодически сохраняется
+    в JSON-файл (атомарная замена), поэтому после перезапуска чтение
+    продолжается ровно с того места, до которого посчитаны агрегаты.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.price_edges: List[float] = [
+            float(edge) for edge in settings.STATS_PRICE_BUCKETS.split(",") if edge.strip()
+        ]
+        self._lock = threading.Lock()
+        self._last_checkpoint = 0.0
+        self._dirty = False
+        # True - проекцию обновляет consumer этого процесса;
+        # иначе состояние перечитывается из файла (см. refresh)
+        self.live = False
+        self._writer_lock = None
+        self._loaded_mtime: Optional[int] = None
+        self._reset()
+        self._load()
+
+    def _reset(self):
+        self.offsets: Dict[str, int] = {}
+        self.signups_total = 0
+        self.signups_per_hour: Dict[str, int] = defaultdict(int)
+        self.logins_total = 0
+        self.logins_per_hour: Dict[str, int] = defaultdict(int)
+        self.courses_per_admin: Dict[str, int] = defaultdict(int)
+        self.price_count = 0
+        self.price_sum = 0.0
+        self.price_min: Optional[float] = None
+        self.price_max: Optional[float] = None
+        self.price_histogram = [0] * (len(self.price_edges) + 1)
+
+    # --- применение событий ---
+
+    def apply(self, topic: str, partition: int, offset: int, event: Dict[str, Any]):
+        """
+        Учесть событие в агрегатах.
+
+        Событие с offset'ом не больше уже учтённого пропускается,
+        поэтому повтор пачки consumer'ом не искажает счётчики.
+        События, помеченные как повтор (backfill --mark-replay), повторяют
+        уже учтённые created и только сдвигают offset.
+        """
+        position = f"{topic}:{partition}"
+        with self._lock:
+            if offset <= self.offsets.get(position, -1):
+                return
+
+            event_type = None if event.get('replay') else event.get('event_type')
+            if event_type == 'user.created':
+                self.signups_total += 1
+                self.signups_per_hour[_hour_bucket(event.get('timestamp'))] += 1
+            elif event_type == 'user.logged_in':
+                self.logins_total += 1
+                self.logins_per_hour[_hour_bucket(event.get('timestamp'))] += 1
+            elif event_type == 'course.created':
+                self.courses_per_admin[str(event.get('created_by'))] += 1
+                self._add_price(float(event.get('price', 0)))
+
+            self.offsets[position] = offset
+            self._dirty = True
+
+    def _add_price(self, price: float):
+        self.price_count += 1
+        self.price_sum += price
+        self.price_min = price if self.price_min is None else min(self.price_min, price)
+        self.price_max = price if self.price_max is None else max(self.price_max, price)
+        self.price_histogram[bisect_right(self.price_edges, price)] += 1
+
+    def _trim_hours(self):
+        """Оставить только последние STATS_HOURLY_RETENTION часовых интервалов."""
+        for per_hour in (self.signups_per_hour, self.logins_per_hour):
+            if len(per_hour) > settings.STATS_HOURLY_RETENTION:
+                for bucket in sorted(per_hour)[:-settings.STATS_HOURLY_RETENTION]:
+                    del per_hour[bucket]
+
+    # --- чтение ---
+
+    def offset(self, topic: str, partition: int) -> Optional[int]:
+        """Последний учтённый offset партиции (None, если событий ещё не было)."""
+        with self._lock:
+            return self.offsets.get(f"{topic}:{partition}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Текущие агрегаты (без запросов к БД)."""
+        with self._lock:
+            labels = self._histogram_labels()
+            return {
+                "signups": {
+                    "total": self.signups_total,
+                    "per_hour": dict(sorted(self.signups_per_hour.items())),
+                },
+                "logins": {
+                    "total": self.logins_total,
+                    "per_hour": dict(sorted(self.logins_per_hour.items())),
+                },
+                "courses_per_admin": dict(self.courses_per_admin),
+                "prices": {
+                    "count": self.price_count,
+                    "sum": self.price_sum,
+                    "mean": self.price_sum / self.price_count if self.price_count else None,
+                    "min": self.price_min,
+                    "max": self.price_max,
+                    "histogram": dict(zip(labels, self.price_histogram)),
+                },
+            }
+
+    def _histogram_labels(self) -> List[str]:
+        edges = [f"{edge:g}" for edge in self.price_edges]
+        if not edges:
+            return ["all"]
+        return (
+            [f"<{edges[0]}"]
+            + [f"{low}-{high}" for low, high in zip(edges, edges[1:])]
+            + [f">={edges[-1]}"]
+        )
+
+    # --- сохранение состояния ---
+
+    def acquire_writer(self) -> bool:
+        """
+        Стать единственным процессом, который ведёт проекцию.
+
+        Блокировка - flock на <path>.lock: её держит процесс до release_writer()
+        или завершения, поэтому при RUN_CONSUMERS_IN_WEB файл состояния пишет
+        только один веб-процесс, остальные читают его (refresh).
+
+        Returns:
+            False, если проекцию уже ведёт другой процесс
+        """
+        if self._writer_lock is not None:
+            return True
+        lock_file = open(f"{self.path}.lock", "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+        self._writer_lock = lock_file
+        # Пока процесс читал файл, писатель мог его обновить
+        with self._lock:
+            self._reset()
+            self._load()
+        self.live = True
+        return True
+
+    def release_writer(self):
+        """Отпустить блокировку писателя (после финального checkpoint)."""
+        if self._writer_lock is not None:
+            self._writer_lock.close()
+            self._writer_lock = None
+        self.live = False
+
+    def refresh(self):
+        """
+        Перечитать состояние из файла, если его обновил другой процесс.
+
+        Используется веб-процессами, когда проекцию ведёт app.worker:
+        данные отстают не больше чем на STATS_CHECKPOINT_INTERVAL.
+        """
+        if self.live:
+            return
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._loaded_mtime:
+            return
+        with self._lock:
+            self._reset()
+            self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            self._loaded_mtime = os.stat(self.path).st_mtime_ns
+            with open(self.path, encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("version") != STORE_VERSION or state.get("price_edges") != self.price_edges:
+                logger.warning("Формат состояния статистики изменился, проекция будет построена заново")
+                return
+            self.offsets = state["offsets"]
+            self.signups_total = state["signups_total"]
+            self.signups_per_hour.update(state["signups_per_hour"])
+            self.logins_total = state["logins_total"]
+            self.logins_per_hour.update(state["logins_per_hour"])
+            self.courses_per_admin.update(state["courses_per_admin"])
+            self.price_count = state["price_count"]
+            self.price_sum = state["price_sum"]
+            self.price_min = state["price_min"]
+            self.price_max = state["price_max"]
+            self.price_histogram = state["price_histogram"]
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Не удалось прочитать состояние статистики '{self.path}': {e}")
+            self._reset()
+
+    def checkpoint(self, force: bool = False):
+        """
+        Сохранить агрегаты и offset'ы одной атомарной записью файла.
+
+        Без force сохранение происходит не чаще STATS_CHECKPOINT_INTERVAL.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not self._dirty or (not force and now - self._last_checkpoint < settings.STATS_CHECKPOINT_INTERVAL):
+                return
+            self._trim_hours()
+            state = {
+                "version": STORE_VERSION,
+                "price_edges": self.price_edges,
+                "offsets": self.offsets,
+                "signups_total": self.signups_total,
+                "signups_per_hour": self.signups_per_hour,
+                "logins_total": self.logins_total,
+                "logins_per_hour": self.logins_per_hour,
+                "courses_per_admin": self.courses_per_admin,
+                "price_count": self.price_count,
+                "price_sum": self.price_sum,
+                "price_min": self.price_min,
+                "price_max": self.price_max,
+                "price_histogram": self.price_histogram,
+            }
+            # Временный файл - свой у процесса: запись не смешивается с чужой
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(state, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+            self._last_checkpoint = now
+            self._dirty = False
+
+
+projection = StatsProjection(settings.STATS_STORE_PATH)
+
+
+class ProjectionRuntime(ConsumerRuntime):
+    """
+    Consumer проекции статистики.
+
+    Читает все партиции топика без группы: позиция чтения хранится
+    в файле проекции, а не в Kafka, и сохраняется вместе с агрегатами.
+    Раз в STATS_PARTITIONS_REFRESH_INTERVAL refresh_partitions назначает
+    партиции, появившиеся после запуска (в том числе топик, которого не было).
+    """
+
+    def __init__(self, topic: str, consumer_factory, refresh_partitions: Optional[Callable[[Any, str], int]] = None):
+        super().__init__(topic, consumer_factory, group_id=None, workers=1, name="stats-projection")
+        self.refresh_partitions = refresh_partitions
+        self._last_refresh = time.monotonic()
+
+    def before_poll(self, consumer):
+        if self.refresh_partitions is None:
+            return
+        if time.monotonic() - self._last_refresh < settings.STATS_PARTITIONS_REFRESH_INTERVAL:
+            return
+        self._last_refresh = time.monotonic()
+        try:
+            self.refresh_partitions(consumer, self.topic)
+        except Exception as e:
+            logger.error(f"Не удалось обновить партиции '{self.topic}' для статистики: {e}")
+
+    def handle_record(self, record):
+        projection.apply(record.topic, record.partition, record.offset, record.value)
+
+    def on_batch_done(self, batch):
+        projection.checkpoint()
@@ -0,0 +1,168 @@
+import logging
+import re
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models.course import Course
+
+logger = logging.getLogger(__name__)
+
+# Полнотекстовый индекс по title и description:
+# SQLite - виртуальная таблица FTS5, MySQL - FULLTEXT-индекс на courses
+FTS_TABLE = "courses_fts"
+MYSQL_FULLTEXT_INDEX = "ft_courses_title_description"
+
+# Вес совпадения в названии относительно описания (для bm25 в SQLite)
+TITLE_WEIGHT = 10.0
+
+
+def ensure_search_index(engine: Engine):
+    """Создать полнотекстовый индекс курсов, если его ещё нет."""
+    dialect = engine.dialect.name
+
+    with engine.begin() as conn:
+        if dialect == "sqlite":
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": FTS_TABLE},
+            ).first()
+            if exists:
+                return
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                "title, description, content='courses', content_rowid='id', "
+                "tokenize='unicode61')"
+            ))
+            # Индексируем уже существующие курсы
+            conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+            logger.info("Создан полнотекстовый индекс курсов (FTS5)")
+
+        elif dialect == "mysql":
+            exists = conn.execute(
+                text("SHOW INDEX FROM courses WHERE Key_name = :name"),
+                {"name": MYSQL_FULLTEXT_INDEX},
+            ).first()
+            if exists:
+                return
+            conn.execute(text(
+                f"ALTER TABLE courses ADD FULLTEXT INDEX {MYSQL_FULLTEXT_INDEX} (title, description)"
+            ))
+            logger.info("Создан полнотекстовый индекс курсов (FULLTEXT)")
+
+        else:
+            logger.warning(f"Полнотекстовый поиск не поддерживается для '{dialect}', поиск будет через LIKE")
+
+
+def index_courses(db: Session, courses: Iterable[Course]):
+    """
+    Добавить курсы в полнотекстовый индекс в рамках текущей транзакции.
+
+    В MySQL FULLTEXT-индекс обновляется самой БД, индексировать вручную
+    нужно только внешнюю FTS5-таблицу SQLite.
+    """
+    if db.get_bind().dialect.name != "sqlite":
+        return
+
+    rows = [
+        {"id": course.id, "title": course.title, "description": course.description}
+        for course in courses
+    ]
+    if rows:
+        db.execute(
+            text(f"INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (:id, :title, :description)"),
+            rows,
+        )
+
+
+def _fts5_query(q: str) -> Optional[str]:
+    """
+    Превратить пользовательскую строку в безопасный запрос FTS5:
+    каждое слово в кавычках, последнее - как префикс.
+    """
+    words = re.findall(r"\w+", q)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _like_pattern(q: str) -> str:
+    """Шаблон LIKE "содержит q" с экранированием % и _."""
+    escaped = q.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def search_courses(
+    db: Session,
+    q: str,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+) -> List[Tuple[Course, float]]:
+    """
+    Найти курсы по title и description, отсортированные по релевантности.
+
+    Возвращает пары (курс, score), где больший score - более релевантный курс.
+    Пагинация keyset по (sort_rank, id): sort_rank = -score.
+
+    Для БД без полнотекстового индекса (не SQLite и не MySQL) - поиск
+    подстроки через LIKE: совпадение в названии выше совпадения в описании.
+    """
+    dialect = db.get_bind().dialect.name
+    params = {"limit": limit}
+
+    if dialect == "sqlite":
+        match = _fts5_query(q)
+        if match is None:
+            return []
+        params["q"] = match
+        ranked = (
+            f"SELECT rowid AS id, bm25({FTS_TABLE}, {TITLE_WEIGHT}, 1.0) AS sort_rank "
+            f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :q"
+        )
+    elif dialect == "mysql":
+        # RANK - зарезервированное слово в MySQL 8, поэтому sort_rank
+        params["q"] = q
+        ranked = (
+            "SELECT id, -MATCH(title, description) AGAINST (:q IN NATURAL LANGUAGE MODE) AS sort_rank "
+            "FROM courses WHERE MATCH(title, description) AGAINST (:q IN NATURAL LANGUAGE MODE)"
+        )
+    else:
+        params["q"] = _like_pattern(q)
+        ranked = (
+            "SELECT id, CASE WHEN LOWER(title) LIKE :q ESCAPE '\\' THEN -2.0 ELSE -1.0 END AS sort_rank "
+            "FROM courses WHERE LOWER(title) LIKE :q ESCAPE '\\' OR LOWER(description) LIKE :q ESCAPE '\\'"
+        )
+
+    where = ""
+    if cursor:
+        last_rank, last_id = decode_cursor(cursor, "rank")
+        params.update(last_rank=last_rank, last_id=last_id)
+        where = "WHERE sort_rank > :last_rank OR (sort_rank = :last_rank AND id > :last_id)"
+
+    hits = db.execute(
+        text(f"SELECT id, sort_rank FROM ({ranked}) AS ranked {where} ORDER BY sort_rank, id LIMIT :limit"),
+        params,
+    ).all()
+    if not hits:
+        return []
+
+    courses = {
+        course.id: course
+        for course in db.execute(
+            select(Course).where(Course.id.in_([hit.id for hit in hits]))
+        ).scalars()
+    }
+    return [(courses[hit.id], -hit.sort_rank) for hit in hits if hit.id in courses]
+
+
+def search_next_cursor(results: List[Tuple[Course, float]], limit: int) -> Optional[str]:
+    """Курсор следующей страницы поиска или None, если страница последняя."""
+    if not results or len(results) < limit:
+        return None
+    course, score = results[-1]
+    return encode_cursor("rank", -score, course.id)
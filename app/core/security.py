@@ -0,0 +1,146 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Формат хэша: $scrypt$n=16384,r=8,p=1$<соль>$<хэш> (base64 без '=')
+SCHEME = "scrypt"
+_PREFIX = f"${SCHEME}$"
+_SALT_BYTES = 16
+_KEY_BYTES = 32
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(
+        password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+        maxmem=256 * n * r * p + 1024 * 1024, dklen=_KEY_BYTES,
+    )
+
+
+def _parse(stored: str) -> Optional[Tuple[int, int, int, bytes, bytes]]:
+    """Разобрать хэш в формате $scrypt$... (None - пароль в старом формате)."""
+    if not stored.startswith(_PREFIX):
+        return None
+    try:
+        params, salt, key = stored[len(_PREFIX):].split("$")
+        values = dict(item.split("=") for item in params.split(","))
+        return int(values["n"]), int(values["r"]), int(values["p"]), _b64decode(salt), _b64decode(key)
+    except (ValueError, KeyError):
+        return None
+
+
+def hash_password(password: str) -> str:
+    """Захэшировать пароль (scrypt, параметры из настроек). Выполняется в текущем потоке."""
+    n, r, p = settings.PASSWORD_SCRYPT_N, settings.PASSWORD_SCRYPT_R, settings.PASSWORD_SCRYPT_P
+    salt = os.urandom(_SALT_BYTES)
+    key = _scrypt(password, salt, n, r, p)
+    return f"{_PREFIX}n={n},r={r},p={p}${_b64encode(salt)}${_b64encode(key)}"
+
+
+def verify_password(password: str, stored: str) -> bool:
+    """
+    Проверить пароль. Выполняется в текущем потоке.
+
+    Пароли, сохранённые до перехода на хэширование (в открытом виде),
+    сравниваются напрямую - после входа их заменит needs_rehash.
+    """
+    parsed = _parse(stored)
+    if parsed is None:
+        if stored.startswith(_PREFIX):
+            return False  # повреждённый хэш
+        return hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+    n, r, p, salt, key = parsed
+    return hmac.compare_digest(_scrypt(password, salt, n, r, p), key)
+
+
+def needs_rehash(stored: str) -> bool:
+    """Пароль в открытом виде или с параметрами слабее текущих настроек."""
+    parsed = _parse(stored)
+    if parsed is None:
+        return True
+    n, r, p, _, _ = parsed
+    return (
+        n < settings.PASSWORD_SCRYPT_N
+        or r < settings.PASSWORD_SCRYPT_R
+        or p < settings.PASSWORD_SCRYPT_P
+    )
+
+
+# Пул процессов для хэширования: CPU-bound работа не занимает
+# threadpool и event loop. Создаётся при первом обращении.
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> Optional[Executor]:
+    """Пул процессов из PASSWORD_HASH_WORKERS (None - считать в threadpool по умолчанию)."""
+    global _executor
+
+    if settings.PASSWORD_HASH_WORKERS <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            # spawn: в процессе приложения работают потоки Kafka, fork с ними небезопасен
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info(f"Пул хэширования паролей запущен ({settings.PASSWORD_HASH_WORKERS} процессов)")
+        return _executor
+
+
+def shutdown_executor():
+    """Остановить пул процессов (вызывается при завершении приложения)."""
+    global _executor
+
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True, cancel_futures=True)
+            _executor = None
+
+
+async def hash_password_async(password: str) -> str:
+    """Захэшировать пароль в пуле процессов."""
+    return await asyncio.get_running_loop().run_in_executor(get_executor(), hash_password, password)
+
+
+async def hash_passwords_async(passwords: List[str]) -> List[str]:
+    """Захэшировать несколько паролей параллельно (порядок сохраняется)."""
+    return list(await asyncio.gather(*(hash_password_async(password) for password in passwords)))
+
+
+async def verify_password_async(password: str, stored: str) -> bool:
+    """Проверить пароль в пуле процессов."""
+    return await asyncio.get_running_loop().run_in_executor(get_executor(), verify_password, password, stored)
+
+
+async def check_password(password: str, stored: str) -> Tuple[bool, Optional[str]]:
+    """
+    Проверить пароль и при необходимости подготовить новый хэш.
+
+    Returns:
+        (пароль верный, новый хэш или None, если обновлять не нужно)
+    """
+    if not await verify_password_async(password, stored):
+        return False, None
+    if needs_rehash(stored):
+        return True, await hash_password_async(password)
+    return True, None
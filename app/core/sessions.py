@@ -0,0 +1,114 @@
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore(ABC):
+    """Интерфейс хранилища сессий: токен -> id пользователя."""
+
+    @abstractmethod
+    def set(self, token: str, user_id: int):
+        """Сохранить сессию на SESSION_TTL_SECONDS."""
+
+    @abstractmethod
+    def get(self, token: str) -> Optional[int]:
+        """Получить id пользователя по токену (None, если сессии нет или она истекла)."""
+
+    @abstractmethod
+    def delete(self, token: str):
+        """Удалить сессию."""
+
+
+class MemorySessionStore(SessionStore):
+    """
+    Хранилище сессий в памяти процесса (LRU + TTL).
+
+    Быстрое, но сессии видны только в одном процессе uvicorn.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def set(self, token: str, user_id: int):
+        self._cache.set(token, user_id)
+
+    def get(self, token: str) -> Optional[int]:
+        return self._cache.get(token)
+
+    def delete(self, token: str):
+        self._cache.delete(token)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Общее для нескольких процессов хранилище сессий в файле SQLite.
+
+    Используется WAL-режим, чтобы воркеры могли читать параллельно.
+    Истёкшие сессии периодически удаляются.
+    """
+
+    # Как часто удалять истёкшие сессии (секунды)
+    PURGE_INTERVAL = 60.0
+
+    def __init__(self, path: str, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._last_purge = 0.0
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "token TEXT PRIMARY KEY, "
+            "user_id INTEGER NOT NULL, "
+            "expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_sessions_expires_at ON sessions (expires_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Отдельное соединение на каждый поток."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def set(self, token: str, user_id: int):
+        now = time.time()
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO sessions (token, user_id, expires_at) VALUES (?, ?, ?)",
+            (token, user_id, now + self.ttl),
+        )
+        if now - self._last_purge >= self.PURGE_INTERVAL:
+            self._last_purge = now
+            conn.execute("DELETE FROM sessions WHERE expires_at < ?", (now,))
+
+    def get(self, token: str) -> Optional[int]:
+        row = self._connection().execute(
+            "SELECT user_id FROM sessions WHERE token = ? AND expires_at >= ?",
+            (token, time.time()),
+        ).fetchone()
+        return row[0] if row else None
+
+    def delete(self, token: str):
+        self._connection().execute("DELETE FROM sessions WHERE token = ?", (token,))
+
+
+def create_session_store() -> SessionStore:
+    """Создать хранилище сессий согласно SESSION_BACKEND."""
+    if settings.SESSION_BACKEND == "sqlite":
+        logger.info(f"Сессии хранятся в SQLite: {settings.SESSION_SQLITE_PATH}")
+        return SQLiteSessionStore(settings.SESSION_SQLITE_PATH, settings.SESSION_TTL_SECONDS)
+
+    return MemorySessionStore(settings.SESSION_MAX_ENTRIES, settings.SESSION_TTL_SECONDS)
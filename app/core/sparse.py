@@ -0,0 +1,92 @@
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Type
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel, create_model
+from sqlalchemy import select
+from sqlalchemy.orm import load_only
+from sqlalchemy.sql import Select
+
+from app.core.config import settings
+
+# Поле, которое входит в ответ всегда (по нему клиент сопоставляет строки)
+KEY_FIELD = "id"
+
+
+def parse_ids(ids: Optional[str]) -> Optional[List[int]]:
+    """
+    Разобрать параметр ids=1,2,3 (повторы убираются, порядок сохраняется).
+
+    Returns:
+        Список id или None, если параметр не передан
+    """
+    if ids is None:
+        return None
+    try:
+        parsed = list(dict.fromkeys(int(part) for part in ids.split(",") if part.strip()))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Параметр ids должен быть списком чисел через запятую"
+        )
+    if len(parsed) > settings.MULTI_GET_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Не больше {settings.MULTI_GET_MAX_IDS} id в одном запросе"
+        )
+    return parsed
+
+
+def sparse_schema(schema: Type[BaseModel], fields: Optional[str]) -> Type[BaseModel]:
+    """
+    Схема ответа только с полями из fields=title,price (и id).
+
+    Без fields возвращается полная схема. Неизвестное поле - 400.
+    """
+    if fields is None:
+        return schema
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in schema.model_fields]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Неизвестные поля: {', '.join(unknown)}. Доступны: {', '.join(schema.model_fields)}"
+        )
+    # Порядок полей - как в полной схеме, чтобы одинаковые наборы давали одну модель
+    selected = tuple(name for name in schema.model_fields if name == KEY_FIELD or name in requested)
+    return _sparse_model(schema, selected)
+
+
+@lru_cache(maxsize=256)
+def _sparse_model(schema: Type[BaseModel], selected: Sequence[str]) -> Type[BaseModel]:
+    definitions: Dict[str, Any] = {
+        name: (schema.model_fields[name].annotation, schema.model_fields[name])
+        for name in selected
+    }
+    return create_model(
+        f"{schema.__name__}Sparse",
+        __config__=schema.model_config,
+        **definitions,
+    )
+
+
+def load_columns(model, schema: Type[BaseModel], *extra: str):
+    """
+    Загружать из БД только колонки схемы ответа (и extra - например, для курсора).
+
+    Остальные колонки (User.password, Course.description, если не запрошено)
+    не читаются.
+    """
+    names = dict.fromkeys((KEY_FIELD, *schema.model_fields, *extra))
+    return load_only(*(getattr(model, name) for name in names))
+
+
+def select_by_ids(model, ids: List[int]) -> Select:
+    """Все строки по списку id одним запросом (WHERE id IN (...))."""
+    return select(model).where(model.id.in_(ids))
+
+
+def order_by_ids(rows: List[Any], ids: List[int]) -> List[Any]:
+    """Строки в порядке запрошенных id (отсутствующие id пропускаются)."""
+    position = {row_id: index for index, row_id in enumerate(ids)}
+    return sorted(rows, key=lambda row: position[row.id])
@@ -1,5 +1,11 @@
+from typing import AsyncIterator, TYPE_CHECKING
+
 from sqlalchemy.orm import Session
-from app.core.database import SessionLocal
+from app.core import database
+from app.core.database import SessionLocal, ReadSessionLocal
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
 
 
 def get_db() -> Session:
@@ -8,4 +14,25 @@ def get_db() -> Session:
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+
+def get_read_db() -> Session:
+    """Зависимость для чтения: сессия реплики (DB_READ_URL) или основной БД."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db() -> AsyncIterator["AsyncSession"]:
+    """Зависимость для получения асинхронной сессии базы данных (DB_MODE=async)."""
+    async with database.AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db() -> AsyncIterator["AsyncSession"]:
+    """Асинхронная сессия для чтения: реплика или основная БД (DB_MODE=async)."""
+    async with database.AsyncReadSessionLocal() as db:
+        yield db
@@ -1,10 +1,15 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 import logging
-from app.core.database import engine, Base
-from app.models.user import User  # импортируем модели для создания таблиц
-from app.models.course import Course  # импортируем для создания таблицы курсов
-from app.routers import users, auth, courses
-from app.core.kafka_consumer import start_consumers
+from app.core.database import get_pool_stats
+from app.routers import users, auth, courses, enrollments, stats
+from app.core.kafka_consumer import start_cache_consumer, start_consumers, stop_consumers
+from app.core.consumer_runtime import handler_stats
+from app.core.event_bus import close_event_bus
+from app.core.outbox import start_outbox_relay, stop_outbox_relay
+from app.core.config import settings
+from app.core.security import shutdown_executor
+from app.core import metrics
+from app.core.admission import AdmissionMiddleware
 
 # Настройка логирования
 logging.basicConfig(
@@ -12,28 +17,89 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
-# Создание таблиц при запуске
-Base.metadata.create_all(bind=engine)
+# Таблицы создаются отдельной командой: python -m app.manage init-db
 
 app = FastAPI(title="Mini-CRM (online courses)")
 
-# Подключение роутеров
-app.include_router(users.router)
-app.include_router(auth.router)
-app.include_router(courses.router)
+# Ограничение нагрузки: лимиты запросов и одновременной обработки (429/503)
+app.add_middleware(AdmissionMiddleware)
+
+# Время ответа и количество SQL-запросов по маршрутам для /metrics
+# (добавлен последним - внешний, поэтому учитывает и отклонённые запросы)
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Подключение роутеров: синхронные (threadpool) или асинхронные (AsyncSession)
+if settings.DB_MODE == "async":
+    from app.routers import users_async, auth_async, courses_async, enrollments_async
+
+    app.include_router(users_async.router)
+    app.include_router(auth_async.router)
+    app.include_router(courses_async.router)
+    app.include_router(enrollments_async.router)
+else:
+    app.include_router(users.router)
+    app.include_router(auth.router)
+    app.include_router(courses.router)
+    app.include_router(enrollments.router)
+
+# Статистика не обращается к БД, роутер общий для обоих режимов
+app.include_router(stats.router)
 
 
 @app.on_event("startup")
 async def startup_event():
-    """Запуск Kafka consumers при старте приложения."""
+    """
+    Запуск consumers при старте приложения.
+
+    Обработчики событий работают в отдельном процессе (python -m app.worker);
+    в веб-процессе - только при RUN_CONSUMERS_IN_WEB или для шины inprocess,
+    события которой не выходят за пределы процесса. Сброс кэша каталога
+    нужен каждому веб-процессу, так как кэш у каждого свой.
+    """
     try:
-        start_consumers()
-        logging.info("✅ Kafka consumers запущены")
+        if settings.RUN_CONSUMERS_IN_WEB or settings.EVENT_BUS_BACKEND == "inprocess":
+            start_consumers()
+            logging.info("✅ Kafka consumers запущены")
+        elif settings.CATALOG_CACHE_EVENTS:
+            start_cache_consumer()
     except Exception as e:
         logging.error(f"❌ Ошибка при запуске Kafka consumers: {e}")
 
+    if settings.OUTBOX_RELAY_ENABLED:
+        start_outbox_relay()
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    """Остановить consumers и relay outbox, дослать события из очереди и закрыть Kafka producer."""
+    try:
+        stop_consumers()
+        stop_outbox_relay()
+        close_event_bus()
+        shutdown_executor()
+    except Exception as e:
+        logging.error(f"❌ Ошибка при закрытии Kafka producer: {e}")
+
 
 @app.get("/ping")
 async def ping():
     """Health-check эндпоинт."""
-    return {"ok": True} 
\ No newline at end of file
+    return {"ok": True}
+
+
+@app.get("/debug/pool")
+def pool_stats():
+    """Состояние пулов соединений и время ожидания соединения (для подбора размера пула)."""
+    return get_pool_stats()
+
+
+@app.get("/debug/consumers")
+def consumer_stats():
+    """Пропускная способность и задержка обработчиков событий Kafka."""
+    return handler_stats.snapshot()
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Метрики в текстовом формате Prometheus."""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
@@ -0,0 +1,195 @@
+"""
+Служебные команды, которые выполняются отдельно от веб-процессов.
+
+    python -m app.manage init-db
+    python -m app.manage redrive-dlq --topic user-events
+    python -m app.manage backfill --entity users --rate 20000
+"""
+import argparse
+import logging
+import sys
+import time
+
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateColumn
+
+from app.core.backfill import ENTITIES, run_backfill
+from app.core.config import settings
+from app.core.counters import init_counters
+from app.core.database import engine, Base, SessionLocal
+from app.core.event_bus import close_event_bus, get_event_bus
+from app.core.search import ensure_search_index
+from app.models.user import User  # импортируем модели для создания таблиц
+from app.models.course import Course  # импортируем для создания таблицы курсов
+from app.models.outbox import OutboxEvent, OutboxCheckpoint  # таблицы outbox
+from app.models.counter import RowCounter  # счётчики строк
+from app.models.enrollment import Enrollment  # записи на курсы
+
+logger = logging.getLogger(__name__)
+
+# Группа, в которой хранится позиция redrive-dlq в dead-letter топике
+REDRIVE_GROUP = "crm-dlq-redrive"
+
+
+def add_missing_columns():
+    """
+    Добавить в существующие таблицы колонки, появившиеся в моделях.
+
+    Новые колонки должны допускать NULL или иметь server_default.
+    """
+    inspector = inspect(engine)
+    preparer = engine.dialect.identifier_preparer
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                conn.exec_driver_sql(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {ddl}")
+                logger.info(f"Добавлена колонка {table.name}.{column.name}")
+
+
+def init_db():
+    """
+    Создать таблицы, индексы, счётчики строк и поисковый индекс
+    (однократно при развёртывании).
+
+    Повторный запуск безопасен: существующие данные не изменяются,
+    недостающие колонки и индексы создаются, счётчики пересчитываются по таблицам.
+    """
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+    # create_all не добавляет новые индексы в уже существующие таблицы
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    ensure_search_index(engine)
+    with SessionLocal() as db:
+        init_counters(db)
+    logger.info("✅ Таблицы и поисковый индекс созданы")
+
+
+def redrive_dlq(topic: str, limit: int = 0, batch_size: int = 500, idle_timeout: float = 5.0) -> int:
+    """
+    Переотправить события из dead-letter топика <topic>.dlq в исходный топик.
+
+    События отправляются пачками с исходными event_id и ключами: уже
+    обработанные повторы consumer отбросит, остальные обработает заново.
+    Позиция сохраняется в группе REDRIVE_GROUP, поэтому повторный запуск
+    продолжает с места остановки. Чтение заканчивается, когда новых
+    событий нет дольше idle_timeout секунд.
+
+    Returns:
+        Количество переотправленных событий
+    """
+    bus = get_event_bus()
+    dlq_topic = topic + settings.DLQ_SUFFIX
+    consumer = bus.create_consumer(dlq_topic, group_id=REDRIVE_GROUP, from_beginning=True)
+    redriven = 0
+    started = time.perf_counter()
+    try:
+        while not limit or redriven < limit:
+            max_records = min(batch_size, limit - redriven) if limit else batch_size
+            batch = consumer.poll(timeout_ms=int(idle_timeout * 1000), max_records=max_records)
+            if not batch:
+                break
+
+            records = [record for partition_records in batch.values() for record in partition_records]
+            items = [
+                (record.value.get('source_topic', topic), record.value['event'], record.value.get('key', record.key))
+                for record in records
+            ]
+            delivered = bus.publish_batch(items)
+            if delivered < len(items):
+                # Позиции партиций - на первое недоставленное событие
+                first_pending = {}
+                for record in records[delivered:]:
+                    first_pending.setdefault((record.topic, record.partition), record.offset)
+                for tp in batch:
+                    if (tp.topic, tp.partition) in first_pending:
+                        consumer.seek(tp, first_pending[(tp.topic, tp.partition)])
+                consumer.commit()
+                redriven += delivered
+                raise RuntimeError(f"Топик не принял события, переотправлено {redriven}")
+
+            consumer.commit()
+            redriven += delivered
+            logger.info(f"Переотправлено {redriven} событий из '{dlq_topic}'")
+    finally:
+        consumer.close(autocommit=False)
+        bus.flush()
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"✅ Из '{dlq_topic}' переотправлено {redriven} событий за {elapsed:.1f} с")
+    return redriven
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.manage", description="Служебные команды Mini-CRM")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("init-db", help="создать таблицы и поисковый индекс")
+
+    redrive = commands.add_parser("redrive-dlq", help="переотправить события из dead-letter топика")
+    redrive.add_argument("--topic", required=True, help="исходный топик (например, user-events)")
+    redrive.add_argument("--limit", type=int, default=0, help="не больше N событий (0 - все)")
+    redrive.add_argument("--batch-size", type=int, default=500, help="событий в пачке")
+    redrive.add_argument("--idle-timeout", type=float, default=5.0, help="завершить, если новых событий нет N секунд")
+
+    backfill = commands.add_parser("backfill", help="отправить события created по строкам таблиц")
+    backfill.add_argument("--entity", choices=[*ENTITIES, "all"], default="all", help="какую таблицу отправить")
+    backfill.add_argument("--rate", type=float, default=settings.BACKFILL_RATE, help="событий в секунду (0 - без ограничения)")
+    backfill.add_argument("--batch-size", type=int, default=settings.BACKFILL_BATCH_SIZE, help="строк в пачке")
+    backfill.add_argument("--checkpoint", default=settings.BACKFILL_CHECKPOINT_PATH, help="файл с позицией для продолжения")
+    backfill.add_argument("--restart", action="store_true", help="начать заново, игнорируя checkpoint")
+    backfill.add_argument(
+        "--mark-replay", action="store_true",
+        help="пометить события как повтор (replay): /stats их не учитывает",
+    )
+    backfill.add_argument(
+        "--run-id", default="",
+        help="новые event_id для намеренного повторного запуска (своя позиция в checkpoint)",
+    )
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    if args.command == "init-db":
+        init_db()
+    elif args.command == "redrive-dlq":
+        if settings.EVENT_BUS_BACKEND == "inprocess":
+            parser.error("шина inprocess не видна другим процессам")
+        try:
+            redrive_dlq(args.topic, limit=args.limit, batch_size=args.batch_size, idle_timeout=args.idle_timeout)
+        except RuntimeError as e:
+            logger.error(f"❌ {e}")
+            sys.exit(1)
+        finally:
+            close_event_bus()
+    elif args.command == "backfill":
+        if settings.EVENT_BUS_BACKEND == "inprocess":
+            parser.error("шина inprocess не видна другим процессам")
+        entities = list(ENTITIES) if args.entity == "all" else [args.entity]
+        try:
+            run_backfill(
+                entities,
+                checkpoint_path=args.checkpoint,
+                batch_size=args.batch_size,
+                rate=args.rate,
+                restart=args.restart,
+                mark_replay=args.mark_replay,
+                run_id=args.run_id,
+            )
+        except RuntimeError as e:
+            logger.error(f"❌ {e}")
+            sys.exit(1)
+        finally:
+            close_event_bus()
+
+
+if __name__ == "__main__":
+    main()
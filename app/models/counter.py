@@ -0,0 +1,10 @@
+from sqlalchemy import Column, BigInteger, String
+from app.core.database import Base
+
+
+class RowCounter(Base):
+    """Количество строк таблицы, обновляется в тех же транзакциях, что и вставки."""
+    __tablename__ = "row_counters"
+
+    name = Column(String(50), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
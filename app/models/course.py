@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, Numeric
+from sqlalchemy import Column, Integer, String, Text, Numeric, Index
 from app.core.database import Base
 
 
@@ -7,6 +7,16 @@ class Course(Base):
     __tablename__ = "courses"
 
     id = Column(Integer, primary_key=True, index=True)
-    title = Column(String(200), nullable=False, index=True)
+    title = Column(String(200), nullable=False)
     description = Column(Text, nullable=True)
-    price = Column(Numeric(10, 2), nullable=False)  # DECIMAL(10,2) в MySQL 
\ No newline at end of file
+    price = Column(Numeric(10, 2), nullable=False)  # DECIMAL(10,2) в MySQL
+    # Количество записей на курс: увеличивается в транзакции записи (app.core.enrollments),
+    # поэтому списки курсов не считают записи при чтении
+    enrolled_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        # Фильтр по диапазону цен и keyset-пагинация по цене (в обе стороны)
+        Index("ix_courses_price_id", "price", "id"),
+        # Фильтр по префиксу названия и keyset-пагинация по названию
+        Index("ix_courses_title_id", "title", "id"),
+    )
@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.orm import relationship
+
+from app.core.database import Base
+from app.models.course import Course
+from app.models.user import User
+
+
+class Enrollment(Base):
+    """Запись пользователя на курс."""
+    __tablename__ = "enrollments"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), nullable=False)
+    enrolled_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    # lazy="raise": курс и пользователь загружаются только явно (joinedload),
+    # обращение без него - ошибка, а не отдельный запрос на каждую строку (N+1)
+    user = relationship(User, lazy="raise")
+    course = relationship(Course, lazy="raise")
+
+    __table_args__ = (
+        # Одна запись на пару; индекс обслуживает курсы пользователя по порядку course_id
+        UniqueConstraint("user_id", "course_id", name="uq_enrollments_user_course"),
+        # Студенты курса по порядку user_id
+        Index("ix_enrollments_course_user", "course_id", "user_id"),
+    )
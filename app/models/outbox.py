@@ -0,0 +1,38 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from app.core.database import Base
+
+
+class OutboxEvent(Base):
+    """Событие, ожидающее отправки в Kafka (transactional outbox)."""
+    __tablename__ = "outbox_events"
+
+    id = Column(Integer, primary_key=True)  # порядок отправки = порядок записи
+    topic = Column(String(200), nullable=False)
+    key = Column(String(200), nullable=True)
+    payload = Column(Text, nullable=False)  # JSON события
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    # Время подтверждения доставки; NULL - событие ещё не отправлено
+    delivered_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Выборка очередной пачки: WHERE delivered_at IS NULL ORDER BY id
+        Index("ix_outbox_events_delivered_id", "delivered_at", "id"),
+    )
+
+
+class OutboxCheckpoint(Base):
+    """
+    Строка-блокировка relay: пересылку в каждый момент выполняет один relay.
+
+    Блокировка - аренда: relay, записавший себя в owner, пересылает события,
+    пока продлевает lease_until; после её истечения (relay остановился или
+    завис) строку забирает relay другого процесса. Позицию relay строка
+    не хранит - доставка отмечается в outbox_events.delivered_at.
+    """
+    __tablename__ = "outbox_checkpoints"
+
+    name = Column(String(50), primary_key=True)
+    owner = Column(String(200), nullable=True)  # "<host>:<pid>" процесса relay
+    lease_until = Column(DateTime, nullable=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean
+from sqlalchemy import Column, Integer, String, Boolean, DateTime
 from app.core.database import Base
 
 
@@ -9,5 +9,8 @@ class User(Base):
     email = Column(String(320), unique=True, nullable=False, index=True)
     name = Column(String(100), nullable=False)
     age = Column(Integer, nullable=False)
-    password = Column(String(100), nullable=False)  # для MVP храним в открытом виде
-    is_admin = Column(Boolean, default=False)
\ No newline at end of file
+    password = Column(String(255), nullable=False)  # хэш scrypt (app.core.security)
+    is_admin = Column(Boolean, default=False)
+    # Обновляются consumer'ом событий user.logged_in пачками (app.core.login_activity)
+    last_login_at = Column(DateTime, nullable=True)
+    login_count = Column(Integer, nullable=False, default=0, server_default="0")
@@ -1,23 +1,44 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi import APIRouter, Depends, HTTPException, status, Response, Cookie
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from datetime import datetime
+from typing import Optional
 
 from app.schemas.user import UserOut, UserLogin
 from app.schemas.events import UserLoggedInEvent
 from app.dependencies import get_db
-from app.auth import authenticate_user, create_session_token, get_current_user
+from app.auth import authenticate_user, create_session_token, delete_session, get_current_user
 from app.models.user import User
-from app.core.kafka_producer import send_event
+from app.core.event_bus import send_event
 from app.core.config import settings
 
 router = APIRouter(tags=["auth"])
 security = HTTPBasic()
 
+
+async def publish_login_event(user: User):
+    """
+    Отправить событие user.logged_in, не блокируя event loop.
+
+    send_event может ждать брокер (KAFKA_PRODUCER_MODE=sync) или место
+    в очереди, поэтому выполняется в threadpool.
+    """
+    event = UserLoggedInEvent(
+        user_id=user.id,
+        email=user.email,
+        timestamp=datetime.now().isoformat()
+    )
+    await run_in_threadpool(send_event, settings.KAFKA_TOPIC_USER_EVENTS, event.dict())
+
 @router.post("/login")
-def login(user_data: UserLogin, response: Response, db: Session = Depends(get_db)):
-    """Вход в систему и создание cookie-сессии."""
-    user = authenticate_user(user_data.email, user_data.password, db)
+async def login(user_data: UserLogin, response: Response, db: Session = Depends(get_db)):
+    """
+    Вход в систему и создание cookie-сессии.
+
+    Проверка пароля выполняется в пуле процессов и не занимает threadpool.
+    """
+    user = await authenticate_user(user_data.email, user_data.password, db)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -34,16 +55,11 @@ def login(user_data: UserLogin, response: Response, db: Session = Depends(get_db
         value=session_token,
         httponly=True,
         samesite="lax",
-        max_age=3600 * 24 * 7,  # 7 дней
+        max_age=settings.SESSION_TTL_SECONDS,
     )
     
-    # Отправка события в Kafka
-    event = UserLoggedInEvent(
-        user_id=user.id,
-        email=user.email,
-        timestamp=datetime.now().isoformat()
-    )
-    send_event(settings.KAFKA_TOPIC_USER_EVENTS, event.dict())
+    # Отправка события в Kafka (может ждать место в очереди или брокер - в threadpool)
+    await publish_login_event(user)
     
     return {"message": "Вход выполнен успешно"}
 
@@ -55,7 +71,12 @@ def get_current_user_info(current_user: User = Depends(get_current_user)):
 
 
 @router.post("/logout")
-def logout(response: Response):
-    """Выход из системы (удаление cookie)."""
+def logout(
+    response: Response,
+    session_token: Optional[str] = Cookie(None, alias="session_token")
+):
+    """Выход из системы (удаление сессии и cookie)."""
+    if session_token:
+        delete_session(session_token)
     response.delete_cookie(key="session_token")
     return {"message": "Выход выполнен успешно"} 
\ No newline at end of file
@@ -0,0 +1,53 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.user import UserOut, UserLogin
+from app.dependencies import get_async_db
+from app.auth import create_session_token
+from app.auth_async import authenticate_user_async, get_current_user_async
+from app.models.user import User
+from app.core.config import settings
+from app.routers.auth import logout, publish_login_event
+
+
+# Асинхронная версия роутера авторизации (DB_MODE=async)
+router = APIRouter(tags=["auth"])
+
+
+@router.post("/login")
+async def login(user_data: UserLogin, response: Response, db: AsyncSession = Depends(get_async_db)):
+    """Вход в систему и создание cookie-сессии."""
+    user = await authenticate_user_async(user_data.email, user_data.password, db)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Неверный email или пароль",
+            headers={"WWW-Authenticate": "Basic"},
+        )
+
+    # Создаём токен сессии
+    session_token = create_session_token(user.id)
+
+    # Устанавливаем cookie
+    response.set_cookie(
+        key="session_token",
+        value=session_token,
+        httponly=True,
+        samesite="lax",
+        max_age=settings.SESSION_TTL_SECONDS,
+    )
+
+    # Отправка события в Kafka (может ждать место в очереди или брокер - в threadpool)
+    await publish_login_event(user)
+
+    return {"message": "Вход выполнен успешно"}
+
+
+@router.get("/me", response_model=UserOut)
+async def get_current_user_info(current_user: User = Depends(get_current_user_async)):
+    """Получить информацию о текущем пользователе."""
+    return current_user
+
+
+# Выход не обращается к БД, обработчик общий для обоих режимов
+router.add_api_route("/logout", logout, methods=["POST"])
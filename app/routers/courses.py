@@ -1,15 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Response, Request, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Literal, Optional
 from datetime import datetime
+from decimal import Decimal
 
-from app.schemas.course import CourseCreate, CourseOut
+from app.schemas.course import CourseCreate, CourseOut, CourseSearchResult
+from app.schemas.bulk import BulkResult, BulkRowResult
 from app.schemas.events import CourseCreatedEvent
 from app.models.course import Course
-from app.dependencies import get_db
+from app.dependencies import get_db, get_read_db
 from app.auth import get_current_user
 from app.models.user import User
-from app.core.kafka_producer import send_event
+from app.core.outbox import add_outbox_event, add_outbox_events
+from app.core.bulk import BulkRow, iter_row_chunks
+from app.core.export import ExportFormat, export_response
+from app.core.search import index_courses, search_courses, search_next_cursor
+from app.core import catalog_cache, counters
+from app.core.codecs import serialize_rows
+from app.core.listing import list_courses
+from app.core.pagination import NEXT_CURSOR_HEADER, page_limit
+from app.core.sparse import parse_ids, sparse_schema
 from app.core.config import settings
 
 
@@ -33,10 +46,10 @@ def create_course(
     # Создание курса
     db_course = Course(**course_data.dict())
     db.add(db_course)
-    db.commit()
-    db.refresh(db_course)
+    db.flush()  # получаем id курса до коммита
+    index_courses(db, [db_course])  # полнотекстовый индекс обновляется в той же транзакции
     
-    # Отправка события в Kafka
+    # Событие пишется в outbox в той же транзакции, в Kafka его отправит relay
     event = CourseCreatedEvent(
         course_id=db_course.id,
         title=db_course.title,
@@ -44,30 +57,191 @@ def create_course(
         created_by=current_user.id,
         timestamp=datetime.now().isoformat()
     )
-    send_event(settings.KAFKA_TOPIC_COURSE_EVENTS, event.dict())
+    add_outbox_event(db, settings.KAFKA_TOPIC_COURSE_EVENTS, event.dict(), key=str(db_course.id))
+    counters.increment(db, "courses")
+    db.commit()
+    catalog_cache.invalidate_course(db_course.id)
     
     return db_course
 
 
-@router.get("/{course_id}", response_model=CourseOut)
-def get_course(course_id: int, db: Session = Depends(get_db)):
-    """Получить информацию о курсе по ID."""
-    course = db.query(Course).filter(Course.id == course_id).first()
-    if not course:
+def _import_courses_chunk(db: Session, chunk: List[BulkRow], created_by: int) -> List[BulkRowResult]:
+    """Вставить пачку курсов и их события одной транзакцией."""
+    results = [
+        BulkRowResult(row=row_no, status="error", error=error)
+        for row_no, _, error in chunk if error
+    ]
+    to_create = [
+        (row_no, Course(**data.dict()))
+        for row_no, data, error in chunk if error is None
+    ]
+    
+    if to_create:
+        try:
+            db.add_all([course for _, course in to_create])
+            db.flush()  # пачка INSERT'ов, получаем id для событий
+            index_courses(db, [course for _, course in to_create])
+            
+            timestamp = datetime.now().isoformat()
+            add_outbox_events(db, settings.KAFKA_TOPIC_COURSE_EVENTS, [
+                (CourseCreatedEvent(
+                    course_id=course.id,
+                    title=course.title,
+                    price=float(course.price),
+                    created_by=created_by,
+                    timestamp=timestamp
+                ).dict(), str(course.id))
+                for _, course in to_create
+            ])
+            counters.increment(db, "courses", len(to_create))
+            db.commit()
+            catalog_cache.invalidate_course()
+            results.extend(
+                BulkRowResult(row=row_no, status="created", id=course.id)
+                for row_no, course in to_create
+            )
+        except SQLAlchemyError as e:
+            db.rollback()
+            results.extend(
+                BulkRowResult(row=row_no, status="error", error=f"Ошибка БД: {e.__class__.__name__}")
+                for row_no, _ in to_create
+            )
+    
+    results.sort(key=lambda r: r.row)
+    return results
+
+
+@router.post("/bulk", response_model=BulkResult)
+async def bulk_create_courses(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Массовое создание курсов (только для администраторов).
+    
+    Принимает JSON-массив или NDJSON (Content-Type: application/x-ndjson).
+    Строки вставляются пачками по BULK_CHUNK_SIZE, в ответе - результат
+    по каждой строке.
+    """
+    if not current_user.is_admin:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Курс не найден"
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Только администраторы могут создавать курсы"
         )
     
-    return course
+    results: List[BulkRowResult] = []
+    async for chunk in iter_row_chunks(request, CourseCreate):
+        results.extend(await run_in_threadpool(_import_courses_chunk, db, chunk, current_user.id))
+    
+    created = sum(1 for r in results if r.status == "created")
+    return BulkResult(total=len(results), created=created, failed=len(results) - created, results=results)
+
+
+@router.get("/export")
+def export_courses(format: ExportFormat = "ndjson", compress: bool = False):
+    """Потоковая выгрузка всех курсов в NDJSON или CSV (при compress=true - gzip)."""
+    stmt = select(Course.id, Course.title, Course.description, Course.price).order_by(Course.id)
+    return export_response(stmt, format, compress, filename="courses")
+
+
+@router.get("/search", response_model=List[CourseSearchResult])
+def search(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Depends(page_limit(20)),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Полнотекстовый поиск курсов по названию и описанию.
+    
+    Результаты отсортированы по релевантности, курсор следующей страницы
+    возвращается в заголовке X-Next-Cursor.
+    """
+    results = search_courses(db, q, limit=limit, cursor=cursor)
+    
+    cursor_value = search_next_cursor(results, limit)
+    if cursor_value:
+        response.headers[NEXT_CURSOR_HEADER] = cursor_value
+    
+    return [
+        CourseSearchResult(**CourseOut.model_validate(course).dict(), score=score)
+        for course, score in results
+    ]
+
+
+@router.get("/{course_id}", response_model=CourseOut)
+def get_course(course_id: int, request: Request, db: Session = Depends(get_read_db)):
+    """
+    Получить информацию о курсе по ID.
+    
+    Ответ кэшируется и отдаётся с ETag: при совпадении If-None-Match
+    возвращается 304 без обращения к БД.
+    """
+    key = catalog_cache.course_key(course_id)
+    entry = catalog_cache.get(key)
+    
+    if entry is None:
+        course = db.query(Course).filter(Course.id == course_id).first()
+        if not course:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Курс не найден"
+            )
+        entry = catalog_cache.put(key, CourseOut.model_validate(course).model_dump(mode="json"))
+    
+    return catalog_cache.respond(request, entry)
 
 
 @router.get("", response_model=List[CourseOut])
 def get_courses(
-    skip: int = 0, 
-    limit: int = 100, 
-    db: Session = Depends(get_db)
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Depends(page_limit(100)),
+    cursor: Optional[str] = None,
+    order_by: Literal["id", "title", "price"] = "id",
+    order: Literal["asc", "desc"] = "asc",
+    min_price: Optional[Decimal] = Query(None, ge=0, description="Цена не меньше"),
+    max_price: Optional[Decimal] = Query(None, ge=0, description="Цена не больше"),
+    title_prefix: Optional[str] = Query(None, max_length=200, description="Название начинается с"),
+    ids: Optional[str] = Query(None, description="Список id через запятую (одним запросом)"),
+    fields: Optional[str] = Query(None, description="Поля ответа через запятую (id есть всегда)"),
+    db: Session = Depends(get_read_db)
 ):
-    """Получить список всех курсов с пагинацией."""
-    courses = db.query(Course).offset(skip).limit(limit).all()
-    return courses 
\ No newline at end of file
+    """
+    Получить список всех курсов с пагинацией.
+    
+    Курсор следующей страницы возвращается в заголовке X-Next-Cursor.
+    Пагинация по cursor не зависит от глубины страницы, skip оставлен
+    для обратной совместимости. Страницы кэшируются и отдаются с ETag.
+    
+    min_price/max_price и title_prefix фильтруют курсы, order_by и order
+    задают сортировку. Количество курсов под фильтры (по всем страницам)
+    возвращается в заголовке X-Total-Count: без фильтров - из счётчика
+    строк, с фильтрами - COUNT(*), закэшированный до изменения каталога.
+    
+    ids=1,2,3 возвращает курсы по списку id (в том же порядке) одним
+    запросом WHERE id IN; fields=title,price читает из БД и отдаёт только
+    эти колонки (например, без description).
+    """
+    schema = sparse_schema(CourseOut, fields)
+    id_list = parse_ids(ids)
+    filter_params = (min_price, max_price, title_prefix or None)
+    key = catalog_cache.list_key(
+        skip, limit, cursor, order_by, order, filter_params, tuple(id_list or ()), tuple(schema.model_fields)
+    )
+    entry = catalog_cache.get(key)
+    
+    if entry is None:
+        courses, headers = list_courses(
+            db, schema, id_list, filter_params, cursor, limit,
+            skip=skip, order_by=order_by, descending=order == "desc",
+        )
+        entry = catalog_cache.put(
+            key,
+            serialize_rows(courses, schema),
+            headers,
+        )
+    
+    return catalog_cache.respond(request, entry)
@@ -0,0 +1,196 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Response, Request, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+from datetime import datetime
+from decimal import Decimal
+
+from app.schemas.course import CourseCreate, CourseOut, CourseSearchResult
+from app.schemas.bulk import BulkResult, BulkRowResult
+from app.schemas.events import CourseCreatedEvent
+from app.models.course import Course
+from app.dependencies import get_async_db, get_async_read_db
+from app.auth_async import get_current_user_async
+from app.models.user import User
+from app.core.outbox import add_outbox_event
+from app.core.bulk import iter_row_chunks
+from app.core.search import index_courses, search_courses, search_next_cursor
+from app.core import catalog_cache, counters
+from app.core.codecs import serialize_rows
+from app.core.listing import list_courses
+from app.core.pagination import NEXT_CURSOR_HEADER, page_limit
+from app.core.sparse import parse_ids, sparse_schema
+from app.core.config import settings
+from app.routers.courses import _import_courses_chunk, export_courses
+
+
+# Асинхронная версия роутера курсов (DB_MODE=async)
+router = APIRouter(prefix="/courses", tags=["courses"])
+
+
+@router.post("", response_model=CourseOut, status_code=status.HTTP_201_CREATED)
+async def create_course(
+    course_data: CourseCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    """Создать новый курс (только для администраторов)."""
+    # Проверка прав администратора
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Только администраторы могут создавать курсы"
+        )
+
+    # Создание курса
+    db_course = Course(**course_data.dict())
+    db.add(db_course)
+    await db.flush()  # получаем id курса до коммита
+    await db.run_sync(index_courses, [db_course])  # полнотекстовый индекс в той же транзакции
+
+    # Событие пишется в outbox в той же транзакции, в Kafka его отправит relay
+    event = CourseCreatedEvent(
+        course_id=db_course.id,
+        title=db_course.title,
+        price=float(db_course.price),
+        created_by=current_user.id,
+        timestamp=datetime.now().isoformat()
+    )
+    add_outbox_event(db, settings.KAFKA_TOPIC_COURSE_EVENTS, event.dict(), key=str(db_course.id))
+    await db.run_sync(counters.increment, "courses")
+    await db.commit()
+    catalog_cache.invalidate_course(db_course.id)
+
+    return db_course
+
+
+@router.post("/bulk", response_model=BulkResult)
+async def bulk_create_courses(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    """
+    Массовое создание курсов (только для администраторов).
+
+    Принимает JSON-массив или NDJSON (Content-Type: application/x-ndjson).
+    Строки вставляются пачками по BULK_CHUNK_SIZE, в ответе - результат
+    по каждой строке.
+    """
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Только администраторы могут создавать курсы"
+        )
+
+    results: List[BulkRowResult] = []
+    async for chunk in iter_row_chunks(request, CourseCreate):
+        results.extend(await db.run_sync(_import_courses_chunk, chunk, current_user.id))
+
+    created = sum(1 for r in results if r.status == "created")
+    return BulkResult(total=len(results), created=created, failed=len(results) - created, results=results)
+
+
+# Выгрузка читает БД потоково в своём генераторе, он общий для обоих режимов
+router.add_api_route("/export", export_courses, methods=["GET"])
+
+
+@router.get("/search", response_model=List[CourseSearchResult])
+async def search(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Depends(page_limit(20)),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Полнотекстовый поиск курсов по названию и описанию.
+
+    Результаты отсортированы по релевантности, курсор следующей страницы
+    возвращается в заголовке X-Next-Cursor.
+    """
+    results = await db.run_sync(search_courses, q, limit, cursor)
+
+    cursor_value = search_next_cursor(results, limit)
+    if cursor_value:
+        response.headers[NEXT_CURSOR_HEADER] = cursor_value
+
+    return [
+        CourseSearchResult(**CourseOut.model_validate(course).dict(), score=score)
+        for course, score in results
+    ]
+
+
+@router.get("/{course_id}", response_model=CourseOut)
+async def get_course(course_id: int, request: Request, db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Получить информацию о курсе по ID.
+
+    Ответ кэшируется и отдаётся с ETag: при совпадении If-None-Match
+    возвращается 304 без обращения к БД.
+    """
+    key = catalog_cache.course_key(course_id)
+    entry = catalog_cache.get(key)
+
+    if entry is None:
+        course = await db.get(Course, course_id)
+        if not course:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Курс не найден"
+            )
+        entry = catalog_cache.put(key, CourseOut.model_validate(course).model_dump(mode="json"))
+
+    return catalog_cache.respond(request, entry)
+
+
+@router.get("", response_model=List[CourseOut])
+async def get_courses(
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Depends(page_limit(100)),
+    cursor: Optional[str] = None,
+    order_by: Literal["id", "title", "price"] = "id",
+    order: Literal["asc", "desc"] = "asc",
+    min_price: Optional[Decimal] = Query(None, ge=0, description="Цена не меньше"),
+    max_price: Optional[Decimal] = Query(None, ge=0, description="Цена не больше"),
+    title_prefix: Optional[str] = Query(None, max_length=200, description="Название начинается с"),
+    ids: Optional[str] = Query(None, description="Список id через запятую (одним запросом)"),
+    fields: Optional[str] = Query(None, description="Поля ответа через запятую (id есть всегда)"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Получить список всех курсов с пагинацией.
+
+    Курсор следующей страницы возвращается в заголовке X-Next-Cursor.
+    Пагинация по cursor не зависит от глубины страницы, skip оставлен
+    для обратной совместимости. Страницы кэшируются и отдаются с ETag.
+
+    min_price/max_price и title_prefix фильтруют курсы, order_by и order
+    задают сортировку. Количество курсов под фильтры (по всем страницам)
+    возвращается в заголовке X-Total-Count: без фильтров - из счётчика
+    строк, с фильтрами - COUNT(*), закэшированный до изменения каталога.
+
+    ids=1,2,3 возвращает курсы по списку id (в том же порядке) одним
+    запросом WHERE id IN; fields=title,price читает из БД и отдаёт только
+    эти колонки (например, без description).
+    """
+    schema = sparse_schema(CourseOut, fields)
+    id_list = parse_ids(ids)
+    filter_params = (min_price, max_price, title_prefix or None)
+    key = catalog_cache.list_key(
+        skip, limit, cursor, order_by, order, filter_params, tuple(id_list or ()), tuple(schema.model_fields)
+    )
+    entry = catalog_cache.get(key)
+
+    if entry is None:
+        courses, headers = await db.run_sync(
+            list_courses, schema, id_list, filter_params, cursor, limit,
+            skip=skip, order_by=order_by, descending=order == "desc",
+        )
+        entry = catalog_cache.put(
+            key,
+            serialize_rows(courses, schema),
+            headers,
+        )
+
+    return catalog_cache.respond(request, entry)
@@ -0,0 +1,198 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.schemas.bulk import BulkResult, BulkRowResult
+from app.schemas.course import CourseOut
+from app.schemas.enrollment import BulkEnrollRequest, EnrolledCourseOut, EnrollmentOut, StudentOut
+from app.models.course import Course
+from app.models.enrollment import Enrollment
+from app.models.user import User
+from app.dependencies import get_db, get_read_db
+from app.auth import get_current_user
+from app.core import catalog_cache
+from app.core.codecs import fast_json_response, serialize_rows
+from app.core.enrollments import (
+    ALREADY_ENROLLED, course_students_page, enroll_users, enrollments_next_cursor, user_courses_page,
+)
+from app.core.pagination import NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER, page_limit
+from app.core.config import settings
+
+
+router = APIRouter(tags=["enrollments"])
+
+
+def _enroll_one(db: Session, course_id: int, user_id: int) -> Enrollment:
+    """Записать пользователя на курс (409, если он уже записан)."""
+    try:
+        enrollments, errors = enroll_users(db, course_id, [user_id])
+        if errors:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=errors[user_id])
+        db.commit()
+    except IntegrityError:
+        # Параллельный запрос успел записать того же пользователя
+        db.rollback()
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=ALREADY_ENROLLED)
+    catalog_cache.invalidate_course(course_id, lists=False)
+    return enrollments[0]
+
+
+def _enroll_chunk(db: Session, course_id: int, chunk: List[Tuple[int, int]]) -> List[BulkRowResult]:
+    """Записать пачку пользователей (row, user_id) одной транзакцией."""
+    try:
+        enrollments, errors = enroll_users(db, course_id, [user_id for _, user_id in chunk])
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        return [
+            BulkRowResult(row=row_no, status="error", error=f"Ошибка БД: {e.__class__.__name__}")
+            for row_no, _ in chunk
+        ]
+
+    created = {enrollment.user_id: enrollment.id for enrollment in enrollments}
+    return [
+        BulkRowResult(row=row_no, status="created", id=created[user_id])
+        if user_id in created else
+        BulkRowResult(row=row_no, status="error", error=errors[user_id])
+        for row_no, user_id in chunk
+    ]
+
+
+def enroll_bulk_rows(user_ids: List[int]) -> Tuple[List[List[Tuple[int, int]]], List[BulkRowResult]]:
+    """
+    Разбить список user_id на пачки по BULK_CHUNK_SIZE.
+
+    Returns:
+        (пачки [(row, user_id)], результаты для повторов user_id в запросе)
+    """
+    seen = set()
+    rows, duplicates = [], []
+    for row_no, user_id in enumerate(user_ids):
+        if user_id in seen:
+            duplicates.append(BulkRowResult(row=row_no, status="error", error="Повтор в запросе"))
+            continue
+        seen.add(user_id)
+        rows.append((row_no, user_id))
+    chunks = [rows[i:i + settings.BULK_CHUNK_SIZE] for i in range(0, len(rows), settings.BULK_CHUNK_SIZE)]
+    return chunks, duplicates
+
+
+def bulk_result(results: List[BulkRowResult]) -> BulkResult:
+    results.sort(key=lambda r: r.row)
+    created = sum(1 for r in results if r.status == "created")
+    return BulkResult(total=len(results), created=created, failed=len(results) - created, results=results)
+
+
+def courses_response(enrollments: List[Enrollment], limit: int):
+    """Курсы пользователя с датой записи (без повторной валидации pydantic)."""
+    rows = serialize_rows([enrollment.course for enrollment in enrollments], CourseOut)
+    for row, enrollment in zip(rows, enrollments):
+        row["enrolled_at"] = enrollment.enrolled_at
+
+    headers = {}
+    cursor_value = enrollments_next_cursor(enrollments, "course_id", limit)
+    if cursor_value:
+        headers[NEXT_CURSOR_HEADER] = cursor_value
+    return fast_json_response(rows, headers)
+
+
+def students_response(enrollments: List[Enrollment], limit: int, total: int):
+    """Студенты курса с датой записи; X-Total-Count - enrolled_count курса."""
+    rows: List[Dict[str, Any]] = [
+        {
+            "id": enrollment.user.id,
+            "email": enrollment.user.email,
+            "name": enrollment.user.name,
+            "enrolled_at": enrollment.enrolled_at,
+        }
+        for enrollment in enrollments
+    ]
+
+    headers = {TOTAL_COUNT_HEADER: str(total)}
+    cursor_value = enrollments_next_cursor(enrollments, "user_id", limit)
+    if cursor_value:
+        headers[NEXT_CURSOR_HEADER] = cursor_value
+    return fast_json_response(rows, headers)
+
+
+@router.post("/courses/{course_id}/enroll", response_model=EnrollmentOut, status_code=status.HTTP_201_CREATED)
+def enroll(
+    course_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Записаться на курс.
+
+    Запись, увеличение enrolled_count курса и событие course.enrolled
+    (через outbox) сохраняются одной транзакцией.
+    """
+    return _enroll_one(db, course_id, current_user.id)
+
+
+@router.post("/courses/{course_id}/enroll/bulk", response_model=BulkResult)
+def enroll_bulk(
+    course_id: int,
+    data: BulkEnrollRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Записать пользователей на курс (только для администраторов).
+
+    Пользователи записываются пачками по BULK_CHUNK_SIZE, в ответе -
+    результат по каждому user_id.
+    """
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Только администраторы могут записывать других пользователей"
+        )
+
+    chunks, results = enroll_bulk_rows(data.user_ids)
+    for chunk in chunks:
+        results.extend(_enroll_chunk(db, course_id, chunk))
+    catalog_cache.invalidate_course(course_id, lists=False)
+    return bulk_result(results)
+
+
+@router.get("/users/{user_id}/courses", response_model=List[EnrolledCourseOut])
+def get_user_courses(
+    user_id: int,
+    limit: int = Depends(page_limit(100)),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Курсы пользователя по возрастанию id курса.
+
+    Курсы загружаются в том же запросе (JOIN), курсор следующей страницы -
+    в заголовке X-Next-Cursor.
+    """
+    if db.get(User, user_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Пользователь не найден")
+
+    enrollments = db.execute(user_courses_page(user_id, cursor, limit)).scalars().all()
+    return courses_response(enrollments, limit)
+
+
+@router.get("/courses/{course_id}/students", response_model=List[StudentOut])
+def get_course_students(
+    course_id: int,
+    limit: int = Depends(page_limit(100)),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Студенты курса по возрастанию id пользователя.
+
+    Пользователи загружаются в том же запросе (JOIN), количество студентов
+    (X-Total-Count) берётся из enrolled_count курса, без COUNT(*).
+    """
+    course = db.get(Course, course_id)
+    if course is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Курс не найден")
+
+    enrollments = db.execute(course_students_page(course_id, cursor, limit)).scalars().all()
+    return students_response(enrollments, limit, course.enrolled_count)
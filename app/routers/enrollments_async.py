@@ -0,0 +1,103 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from app.schemas.bulk import BulkResult
+from app.schemas.enrollment import BulkEnrollRequest, EnrolledCourseOut, EnrollmentOut, StudentOut
+from app.models.course import Course
+from app.models.user import User
+from app.dependencies import get_async_db, get_async_read_db
+from app.auth_async import get_current_user_async
+from app.core import catalog_cache
+from app.core.config import settings
+from app.core.pagination import page_limit
+from app.core.enrollments import course_students_page, user_courses_page
+from app.routers.enrollments import (
+    _enroll_chunk, _enroll_one, bulk_result, courses_response, enroll_bulk_rows, students_response,
+)
+
+
+# Асинхронная версия роутера записей на курсы (DB_MODE=async)
+router = APIRouter(tags=["enrollments"])
+
+
+@router.post("/courses/{course_id}/enroll", response_model=EnrollmentOut, status_code=status.HTTP_201_CREATED)
+async def enroll(
+    course_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    """
+    Записаться на курс.
+
+    Запись, увеличение enrolled_count курса и событие course.enrolled
+    (через outbox) сохраняются одной транзакцией.
+    """
+    return await db.run_sync(_enroll_one, course_id, current_user.id)
+
+
+@router.post("/courses/{course_id}/enroll/bulk", response_model=BulkResult)
+async def enroll_bulk(
+    course_id: int,
+    data: BulkEnrollRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async)
+):
+    """
+    Записать пользователей на курс (только для администраторов).
+
+    Пользователи записываются пачками по BULK_CHUNK_SIZE, в ответе -
+    результат по каждому user_id.
+    """
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Только администраторы могут записывать других пользователей"
+        )
+
+    chunks, results = enroll_bulk_rows(data.user_ids)
+    for chunk in chunks:
+        results.extend(await db.run_sync(_enroll_chunk, course_id, chunk))
+    catalog_cache.invalidate_course(course_id, lists=False)
+    return bulk_result(results)
+
+
+@router.get("/users/{user_id}/courses", response_model=List[EnrolledCourseOut])
+async def get_user_courses(
+    user_id: int,
+    limit: int = Depends(page_limit(100)),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Курсы пользователя по возрастанию id курса.
+
+    Курсы загружаются в том же запросе (JOIN), курсор следующей страницы -
+    в заголовке X-Next-Cursor.
+    """
+    if await db.get(User, user_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Пользователь не найден")
+
+    enrollments = (await db.execute(user_courses_page(user_id, cursor, limit))).scalars().all()
+    return courses_response(enrollments, limit)
+
+
+@router.get("/courses/{course_id}/students", response_model=List[StudentOut])
+async def get_course_students(
+    course_id: int,
+    limit: int = Depends(page_limit(100)),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Студенты курса по возрастанию id пользователя.
+
+    Пользователи загружаются в том же запросе (JOIN), количество студентов
+    (X-Total-Count) берётся из enrolled_count курса, без COUNT(*).
+    """
+    course = await db.get(Course, course_id)
+    if course is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Курс не найден")
+
+    enrollments = (await db.execute(course_students_page(course_id, cursor, limit))).scalars().all()
+    return students_response(enrollments, limit, course.enrolled_count)
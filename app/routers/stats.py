@@ -0,0 +1,20 @@
+from fastapi import APIRouter
+
+from app.schemas.stats import StatsOut
+from app.core.projections import projection
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+
+@router.get("", response_model=StatsOut)
+def get_stats():
+    """
+    Аналитика: регистрации, входы по часам, курсы по администраторам
+    и распределение цен.
+
+    Данные берутся из проекции, которую consumers обновляют по событиям
+    Kafka, таблицы users и courses не читаются. Если проекцию ведёт
+    app.worker, состояние перечитывается из её файла.
+    """
+    projection.refresh()
+    return projection.snapshot()
@@ -1,21 +1,42 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 from datetime import datetime
+from typing import List, Optional
 
 from app.schemas.user import UserCreate, UserOut
+from app.schemas.bulk import BulkResult, BulkRowResult
 from app.schemas.events import UserCreatedEvent
 from app.models.user import User
-from app.dependencies import get_db
-from app.core.kafka_producer import send_event
+from app.dependencies import get_db, get_read_db
+from app.core.outbox import add_outbox_event, add_outbox_events
+from app.core.bulk import BulkRow, iter_row_chunks
+from app.core.export import ExportFormat, export_response
+from app.core.security import hash_password_async, hash_passwords_async
+from app.core.codecs import fast_json_response, serialize_rows
+from app.core.listing import list_users
+from app.core.sparse import parse_ids, sparse_schema
 from app.core.config import settings
+from app.core.pagination import page_limit
 
 
 router = APIRouter(prefix="/users", tags=["users"])
 
 
 @router.post("", response_model=UserOut, status_code=status.HTTP_201_CREATED)
-def create_user(user_data: UserCreate, db: Session = Depends(get_db)):
-    """Создать нового пользователя."""
+async def create_user(user_data: UserCreate, db: Session = Depends(get_db)):
+    """
+    Создать нового пользователя.
+    
+    Пароль хэшируется в пуле процессов, запросы к БД выполняются в threadpool.
+    """
+    password_hash = await hash_password_async(user_data.password)
+    return await run_in_threadpool(_create_user, db, user_data, password_hash)
+
+
+def _create_user(db: Session, user_data: UserCreate, password_hash: str) -> User:
     # Проверка на существующий email
     existing_user = db.query(User).filter(User.email == user_data.email).first()
     if existing_user:
@@ -24,14 +45,13 @@ def create_user(user_data: UserCreate, db: Session = Depends(get_db)):
             detail="Email уже зарегистрирован"
         )
     
-    # Создание пользователя
-    db_user = User(**user_data.dict())
+    # Создание пользователя (в БД хранится только хэш пароля)
+    db_user = User(**user_data.dict(exclude={"password"}), password=password_hash)
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    db.flush()  # получаем id пользователя до коммита
     
-    # Отправка события в Kafka
+    # Событие пишется в outbox в той же транзакции, в Kafka его отправит relay
     event = UserCreatedEvent(
         user_id=db_user.id,
         email=db_user.email,
@@ -40,13 +60,112 @@ def create_user(user_data: UserCreate, db: Session = Depends(get_db)):
         is_admin=db_user.is_admin,
         timestamp=datetime.now().isoformat()
     )
-    send_event(settings.KAFKA_TOPIC_USER_EVENTS, event.dict())
+    add_outbox_event(db, settings.KAFKA_TOPIC_USER_EVENTS, event.dict(), key=str(db_user.id))
+    db.commit()
     
     return db_user
 
 
+async def _hash_chunk_passwords(chunk: List[BulkRow]) -> List[BulkRow]:
+    """Заменить пароли валидных строк пачки хэшами (параллельно в пуле процессов)."""
+    valid = [i for i, (_, _, error) in enumerate(chunk) if error is None]
+    hashes = await hash_passwords_async([chunk[i][1].password for i in valid])
+    
+    chunk = list(chunk)
+    for i, password_hash in zip(valid, hashes):
+        row_no, data, error = chunk[i]
+        chunk[i] = (row_no, data.model_copy(update={"password": password_hash}), error)
+    return chunk
+
+
+def _import_users_chunk(db: Session, chunk: List[BulkRow]) -> List[BulkRowResult]:
+    """
+    Вставить пачку пользователей и их события одной транзакцией.
+    
+    Пароли в пачке должны быть уже захэшированы (_hash_chunk_passwords).
+    """
+    results: List[BulkRowResult] = []
+    
+    # Дубликаты email проверяем одним запросом на всю пачку
+    emails = {data.email for _, data, error in chunk if error is None}
+    existing = set(
+        db.execute(select(User.email).where(User.email.in_(emails))).scalars()
+    ) if emails else set()
+    
+    to_create: List[tuple[int, User]] = []
+    for row_no, data, error in chunk:
+        if error is None and data.email in existing:
+            error = "Email уже зарегистрирован"
+        if error:
+            results.append(BulkRowResult(row=row_no, status="error", error=error))
+            continue
+        existing.add(data.email)  # дубликаты внутри самой пачки
+        to_create.append((row_no, User(**data.dict())))
+    
+    if to_create:
+        try:
+            db.add_all([user for _, user in to_create])
+            db.flush()  # пачка INSERT'ов, получаем id для событий
+            
+            timestamp = datetime.now().isoformat()
+            add_outbox_events(db, settings.KAFKA_TOPIC_USER_EVENTS, [
+                (UserCreatedEvent(
+                    user_id=user.id,
+                    email=user.email,
+                    name=user.name,
+                    age=user.age,
+                    is_admin=user.is_admin,
+                    timestamp=timestamp
+                ).dict(), str(user.id))
+                for _, user in to_create
+            ])
+            db.commit()
+            results.extend(
+                BulkRowResult(row=row_no, status="created", id=user.id)
+                for row_no, user in to_create
+            )
+        except SQLAlchemyError as e:
+            db.rollback()
+            results.extend(
+                BulkRowResult(row=row_no, status="error", error=f"Ошибка БД: {e.__class__.__name__}")
+                for row_no, _ in to_create
+            )
+    
+    results.sort(key=lambda r: r.row)
+    return results
+
+
+@router.post("/bulk", response_model=BulkResult)
+async def bulk_create_users(request: Request, db: Session = Depends(get_db)):
+    """
+    Массовое создание пользователей.
+    
+    Принимает JSON-массив или NDJSON (Content-Type: application/x-ndjson).
+    Строки вставляются пачками по BULK_CHUNK_SIZE, в ответе - результат
+    по каждой строке.
+    """
+    results: List[BulkRowResult] = []
+    async for chunk in iter_row_chunks(request, UserCreate):
+        chunk = await _hash_chunk_passwords(chunk)
+        results.extend(await run_in_threadpool(_import_users_chunk, db, chunk))
+    
+    created = sum(1 for r in results if r.status == "created")
+    return BulkResult(total=len(results), created=created, failed=len(results) - created, results=results)
+
+
+@router.get("/export")
+def export_users(format: ExportFormat = "ndjson", compress: bool = False):
+    """
+    Потоковая выгрузка всех пользователей в NDJSON или CSV.
+    
+    Пароли не выгружаются. При compress=true ответ сжимается gzip.
+    """
+    stmt = select(User.id, User.email, User.name, User.age, User.is_admin).order_by(User.id)
+    return export_response(stmt, format, compress, filename="users")
+
+
 @router.get("/{user_id}", response_model=UserOut)
-def get_user(user_id: int, db: Session = Depends(get_db)):
+def get_user(user_id: int, db: Session = Depends(get_read_db)):
     """Получить пользователя по ID."""
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
@@ -59,7 +178,26 @@ def get_user(user_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("", response_model=list[UserOut])
-def get_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Получить список пользователей с пагинацией."""
-    users = db.query(User).offset(skip).limit(limit).all()
-    return users 
\ No newline at end of file
+def get_users(
+    skip: int = Query(0, ge=0),
+    limit: int = Depends(page_limit(100)),
+    cursor: Optional[str] = None,
+    ids: Optional[str] = Query(None, description="Список id через запятую (одним запросом)"),
+    fields: Optional[str] = Query(None, description="Поля ответа через запятую (id есть всегда)"),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Получить список пользователей с пагинацией.
+    
+    Курсор следующей страницы возвращается в заголовке X-Next-Cursor.
+    Пагинация по cursor не зависит от глубины страницы, skip оставлен
+    для обратной совместимости.
+
+    ids=1,2,3 возвращает пользователей по списку id (в том же порядке)
+    одним запросом WHERE id IN; fields=name,email читает из БД и отдаёт
+    только эти колонки.
+    """
+    schema = sparse_schema(UserOut, fields)
+    users, headers = list_users(db, schema, parse_ids(ids), cursor, limit, skip=skip)
+    # Строки из БД уже соответствуют UserOut, повторная валидация не нужна
+    return fast_json_response(serialize_rows(users, schema), headers)
@@ -0,0 +1,118 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from typing import List, Optional
+
+from app.schemas.user import UserCreate, UserOut
+from app.schemas.bulk import BulkResult, BulkRowResult
+from app.schemas.events import UserCreatedEvent
+from app.models.user import User
+from app.dependencies import get_async_db, get_async_read_db
+from app.core.outbox import add_outbox_event
+from app.core.codecs import fast_json_response, serialize_rows
+from app.core.listing import list_users
+from app.core.sparse import parse_ids, sparse_schema
+from app.core.bulk import iter_row_chunks
+from app.core.config import settings
+from app.core.pagination import page_limit
+from app.core.security import hash_password_async
+from app.routers.users import _hash_chunk_passwords, _import_users_chunk, export_users
+
+
+# Асинхронная версия роутера пользователей (DB_MODE=async)
+router = APIRouter(prefix="/users", tags=["users"])
+
+
+@router.post("", response_model=UserOut, status_code=status.HTTP_201_CREATED)
+async def create_user(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    """Создать нового пользователя (пароль хэшируется в пуле процессов)."""
+    # Проверка на существующий email
+    existing_user = await db.scalar(select(User.id).where(User.email == user_data.email))
+    if existing_user:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email уже зарегистрирован"
+        )
+
+    # Создание пользователя (в БД хранится только хэш пароля)
+    password_hash = await hash_password_async(user_data.password)
+    db_user = User(**user_data.dict(exclude={"password"}), password=password_hash)
+
+    db.add(db_user)
+    await db.flush()  # получаем id пользователя до коммита
+
+    # Событие пишется в outbox в той же транзакции, в Kafka его отправит relay
+    event = UserCreatedEvent(
+        user_id=db_user.id,
+        email=db_user.email,
+        name=db_user.name,
+        age=db_user.age,
+        is_admin=db_user.is_admin,
+        timestamp=datetime.now().isoformat()
+    )
+    add_outbox_event(db, settings.KAFKA_TOPIC_USER_EVENTS, event.dict(), key=str(db_user.id))
+    await db.commit()
+
+    return db_user
+
+
+@router.post("/bulk", response_model=BulkResult)
+async def bulk_create_users(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """
+    Массовое создание пользователей.
+
+    Принимает JSON-массив или NDJSON (Content-Type: application/x-ndjson).
+    Строки вставляются пачками по BULK_CHUNK_SIZE, в ответе - результат
+    по каждой строке.
+    """
+    results: List[BulkRowResult] = []
+    async for chunk in iter_row_chunks(request, UserCreate):
+        chunk = await _hash_chunk_passwords(chunk)
+        results.extend(await db.run_sync(_import_users_chunk, chunk))
+
+    created = sum(1 for r in results if r.status == "created")
+    return BulkResult(total=len(results), created=created, failed=len(results) - created, results=results)
+
+
+# Выгрузка читает БД потоково в своём генераторе, он общий для обоих режимов
+router.add_api_route("/export", export_users, methods=["GET"])
+
+
+@router.get("/{user_id}", response_model=UserOut)
+async def get_user(user_id: int, db: AsyncSession = Depends(get_async_read_db)):
+    """Получить пользователя по ID."""
+    user = await db.get(User, user_id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Пользователь не найден"
+        )
+
+    return user
+
+
+@router.get("", response_model=list[UserOut])
+async def get_users(
+    skip: int = Query(0, ge=0),
+    limit: int = Depends(page_limit(100)),
+    cursor: Optional[str] = None,
+    ids: Optional[str] = Query(None, description="Список id через запятую (одним запросом)"),
+    fields: Optional[str] = Query(None, description="Поля ответа через запятую (id есть всегда)"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Получить список пользователей с пагинацией.
+
+    Курсор следующей страницы возвращается в заголовке X-Next-Cursor.
+    Пагинация по cursor не зависит от глубины страницы, skip оставлен
+    для обратной совместимости.
+
+    ids=1,2,3 возвращает пользователей по списку id (в том же порядке)
+    одним запросом WHERE id IN; fields=name,email читает из БД и отдаёт
+    только эти колонки.
+    """
+    schema = sparse_schema(UserOut, fields)
+    users, headers = await db.run_sync(list_users, schema, parse_ids(ids), cursor, limit, skip=skip)
+    # Строки из БД уже соответствуют UserOut, повторная валидация не нужна
+    return fast_json_response(serialize_rows(users, schema), headers)
@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+
+class BulkRowResult(BaseModel):
+    """Результат обработки одной строки массового импорта."""
+    row: int  # номер строки во входных данных (с нуля)
+    status: str  # "created" или "error"
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BulkResult(BaseModel):
+    """Сводка по массовому импорту."""
+    total: int
+    created: int
+    failed: int
+    results: List[BulkRowResult]
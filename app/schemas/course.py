@@ -16,6 +16,12 @@ class CourseOut(BaseModel):
     title: str
     description: Optional[str] = None
     price: Decimal
+    enrolled_count: int = 0
 
     class Config:
-        from_attributes = True  # для SQLAlchemy моделей 
\ No newline at end of file
+        from_attributes = True  # для SQLAlchemy моделей
+
+
+class CourseSearchResult(CourseOut):
+    """Курс в результатах поиска с оценкой релевантности."""
+    score: float  # чем больше, тем релевантнее
@@ -0,0 +1,35 @@
+from datetime import datetime
+from typing import List
+
+from pydantic import BaseModel, EmailStr, Field
+
+from app.schemas.course import CourseOut
+
+
+class EnrollmentOut(BaseModel):
+    """Запись на курс."""
+    id: int
+    user_id: int
+    course_id: int
+    enrolled_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class BulkEnrollRequest(BaseModel):
+    """Массовая запись пользователей на курс."""
+    user_ids: List[int] = Field(..., min_length=1)
+
+
+class EnrolledCourseOut(CourseOut):
+    """Курс пользователя с датой записи."""
+    enrolled_at: datetime
+
+
+class StudentOut(BaseModel):
+    """Студент курса с датой записи."""
+    id: int
+    email: EmailStr
+    name: str
+    enrolled_at: datetime
@@ -1,9 +1,26 @@
-from pydantic import BaseModel
+import uuid
+
+from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import Optional
 
 
-class UserCreatedEvent(BaseModel):
+def new_event_id() -> str:
+    """Уникальный id события (uuid4 в hex)."""
+    return uuid.uuid4().hex
+
+
+class Event(BaseModel):
+    """
+    Общие поля событий.
+
+    event_id назначается при создании события и не меняется при повторной
+    отправке, поэтому consumers по нему отбрасывают повторы.
+    """
+    event_id: str = Field(default_factory=new_event_id)
+
+
+class UserCreatedEvent(Event):
     """Событие создания нового пользователя."""
     event_type: str = "user.created"
     user_id: int
@@ -14,7 +31,7 @@ class UserCreatedEvent(BaseModel):
     timestamp: str
 
 
-class UserLoggedInEvent(BaseModel):
+class UserLoggedInEvent(Event):
     """Событие входа пользователя в систему."""
     event_type: str = "user.logged_in"
     user_id: int
@@ -22,7 +39,7 @@ class UserLoggedInEvent(BaseModel):
     timestamp: str
 
 
-class CourseCreatedEvent(BaseModel):
+class CourseCreatedEvent(Event):
     """Событие создания нового курса."""
     event_type: str = "course.created"
     course_id: int
@@ -31,3 +48,10 @@ class CourseCreatedEvent(BaseModel):
     created_by: int  # user_id администратора
     timestamp: str
 
+
+class CourseEnrolledEvent(Event):
+    """Событие записи пользователя на курс."""
+    event_type: str = "course.enrolled"
+    course_id: int
+    user_id: int
+    timestamp: str
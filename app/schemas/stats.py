@@ -0,0 +1,26 @@
+from pydantic import BaseModel
+from typing import Dict, Optional
+
+
+class HourlyCounter(BaseModel):
+    """Общий счётчик и счётчики по часам ('2024-01-01T13:00' -> количество)."""
+    total: int
+    per_hour: Dict[str, int]
+
+
+class PriceStats(BaseModel):
+    """Распределение цен курсов."""
+    count: int
+    sum: float
+    mean: Optional[float]
+    min: Optional[float]
+    max: Optional[float]
+    histogram: Dict[str, int]
+
+
+class StatsOut(BaseModel):
+    """Агрегаты для GET /stats."""
+    signups: HourlyCounter
+    logins: HourlyCounter
+    courses_per_admin: Dict[str, int]
+    prices: PriceStats
@@ -1,3 +1,6 @@
+from datetime import datetime
+from typing import Optional
+
 from pydantic import BaseModel, EmailStr, Field
 
 
@@ -17,6 +20,8 @@ class UserOut(BaseModel):
     name: str
     age: int
     is_admin: bool
+    last_login_at: Optional[datetime] = None  # обновляется с задержкой до CONSUMER_COMMIT_INTERVAL
+    login_count: int = 0
 
     class Config:
         from_attributes = True  # для SQLAlchemy моделей (ранее orm_mode)
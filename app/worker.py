@@ -0,0 +1,172 @@
+"""
+Отдельный процесс для обработчиков событий.
+
+    python -m app.worker --processes 4
+
+Обработчики событий пользователей и курсов работают в общей группе
+consumers, поэтому процессы воркера (и разные машины) делят партиции
+топиков между собой. По умолчанию процессов столько, сколько партиций:
+больше участников группы Kafka всё равно не загрузит. Проекция
+статистики ведётся только в процессе 0 и сохраняется в STATS_STORE_PATH,
+откуда её читают веб-процессы.
+"""
+import argparse
+import logging
+import multiprocessing
+import signal
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.event_bus import close_event_bus, get_event_bus
+from app.core.kafka_consumer import start_group_consumers, start_projection_consumers, stop_consumers
+
+logger = logging.getLogger(__name__)
+
+# Сколько ждать завершения процесса после SIGTERM (секунды)
+STOP_TIMEOUT = settings.CONSUMER_POLL_TIMEOUT_MS / 1000 + 15
+
+
+def _setup_logging():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(processName)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+
+def _stop_on_signals() -> threading.Event:
+    """Событие, которое выставляется по SIGTERM/SIGINT."""
+    stopping = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stopping.set())
+    return stopping
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """GET /metrics воркера (у воркера нет FastAPI-приложения)."""
+
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", metrics.CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _start_metrics_server(port: int) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="worker-metrics", daemon=True).start()
+    logger.info(f"Метрики воркера: http://0.0.0.0:{port}/metrics")
+    return server
+
+
+def run_worker(index: int):
+    """
+    Процесс воркера: обработчики событий до SIGTERM/SIGINT.
+
+    Args:
+        index: Номер процесса (0 - также ведёт проекцию статистики)
+    """
+    _setup_logging()
+    stopping = _stop_on_signals()
+
+    server = None
+    if settings.WORKER_METRICS_PORT:
+        server = _start_metrics_server(settings.WORKER_METRICS_PORT + index)
+
+    start_group_consumers()
+    if index == 0 and settings.STATS_ENABLED:
+        start_projection_consumers()
+    logger.info(f"🚀 Воркер {index} запущен")
+
+    stopping.wait()
+
+    logger.info(f"Остановка воркера {index}...")
+    stop_consumers()
+    close_event_bus()
+    if server is not None:
+        server.shutdown()
+
+
+def resolve_processes(requested: int) -> int:
+    """
+    Число процессов воркера.
+
+    Для шины без распределённых групп (log) - всегда 1: позиция группы
+    хранится в одном файле и не делится между процессами.
+    """
+    bus = get_event_bus()
+    if not bus.distributed:
+        if requested > 1:
+            logger.warning(f"Шина '{bus.name}' не делит партиции между процессами, запускается 1 процесс")
+        return 1
+
+    partitions = max(
+        bus.partitions(topic)
+        for topic in (settings.KAFKA_TOPIC_USER_EVENTS, settings.KAFKA_TOPIC_COURSE_EVENTS)
+    )
+    if requested <= 0:
+        return partitions
+    if requested > partitions:
+        logger.warning(f"Процессов ({requested}) больше, чем партиций ({partitions}): часть будет простаивать")
+    return requested
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.worker", description="Процессы обработчиков событий")
+    parser.add_argument(
+        "--processes", type=int, default=settings.WORKER_PROCESSES,
+        help="количество процессов (0 - по числу партиций топиков)",
+    )
+    args = parser.parse_args(argv)
+    _setup_logging()
+
+    if settings.EVENT_BUS_BACKEND == "inprocess":
+        parser.error("шина inprocess не видна другим процессам: обработчики запускает веб-процесс")
+
+    processes = resolve_processes(args.processes)
+    if processes == 1:
+        run_worker(0)
+        return
+
+    # spawn: процессы не наследуют потоки и соединения родителя
+    context = multiprocessing.get_context("spawn")
+    children: Dict[int, multiprocessing.Process] = {}
+
+    def spawn(index: int):
+        process = context.Process(target=run_worker, args=(index,), name=f"worker-{index}")
+        process.start()
+        children[index] = process
+
+    stopping = _stop_on_signals()
+    for index in range(processes):
+        spawn(index)
+    logger.info(f"Запущено процессов воркера: {processes}")
+
+    # Упавший процесс перезапускается (не чаще раза в секунду)
+    while not stopping.wait(1.0):
+        for index, process in list(children.items()):
+            if not process.is_alive():
+                logger.error(f"Процесс воркера {index} завершился с кодом {process.exitcode}, перезапуск")
+                spawn(index)
+
+    for process in children.values():
+        if process.is_alive():
+            process.terminate()
+    for process in children.values():
+        process.join(timeout=STOP_TIMEOUT)
+        if process.is_alive():
+            process.kill()
+
+
+if __name__ == "__main__":
+    main()
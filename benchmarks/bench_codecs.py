@@ -0,0 +1,98 @@
+"""
+Микробенчмарк кодеков событий и сериализации списков.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_codecs
+    python -m benchmarks.bench_codecs --number 20000
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime
+from decimal import Decimal
+
+from app.core.codecs import CODECS, json_dumps, serialize_rows
+from app.models.course import Course
+from app.models.user import User
+from app.schemas.course import CourseOut
+from app.schemas.events import CourseCreatedEvent, UserCreatedEvent, UserLoggedInEvent
+from app.schemas.user import UserOut
+
+
+def sample_events():
+    now = datetime.now().isoformat()
+    return {
+        "user.created": UserCreatedEvent(
+            user_id=123456, email="ivan.petrov@example.com", name="Иван Петров",
+            age=29, is_admin=False, timestamp=now,
+        ).dict(),
+        "user.logged_in": UserLoggedInEvent(
+            user_id=123456, email="ivan.petrov@example.com", timestamp=now,
+        ).dict(),
+        "course.created": CourseCreatedEvent(
+            course_id=4242, title="Основы FastAPI и Kafka", price=1999.0,
+            created_by=1, timestamp=now,
+        ).dict(),
+    }
+
+
+def sample_rows(count: int):
+    users = [
+        User(id=i, email=f"user{i}@example.com", name=f"Пользователь {i}", age=20 + i % 50,
+             password="secret", is_admin=i % 10 == 0)
+        for i in range(1, count + 1)
+    ]
+    courses = [
+        Course(id=i, title=f"Курс номер {i}", description="Описание курса " * 5,
+               price=Decimal("990.00") + i)
+        for i in range(1, count + 1)
+    ]
+    return users, courses
+
+
+def bench(label: str, func, number: int):
+    seconds = min(timeit.repeat(func, number=number, repeat=3))
+    print(f"  {label:<42} {seconds / number * 1e6:10.2f} мкс/оп")
+
+
+def stdlib_encode(event):
+    return json.dumps(event).encode("utf-8")
+
+
+def stdlib_decode(data):
+    return json.loads(data.decode("utf-8"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=50000, help="повторов на одно событие")
+    parser.add_argument("--rows", type=int, default=100, help="строк в странице списка")
+    args = parser.parse_args()
+
+    print("События (encode / decode, размер):")
+    for event_type, event in sample_events().items():
+        print(f"{event_type}:")
+        data = stdlib_encode(event)
+        bench(f"stdlib json encode ({len(data)} байт)", lambda: stdlib_encode(event), args.number)
+        bench("stdlib json decode", lambda: stdlib_decode(data), args.number)
+        for name, codec in CODECS.items():
+            encoded = codec.encode(event)
+            assert codec.decode(encoded) == event, f"{name}: событие не совпадает после decode"
+            bench(f"{name} encode ({len(encoded)} байт)", lambda: codec.encode(event), args.number)
+            bench(f"{name} decode", lambda: codec.decode(encoded), args.number)
+
+    users, courses = sample_rows(args.rows)
+    number = max(args.number // args.rows, 10)
+    print(f"\nСтраница списка ({args.rows} строк):")
+    for label, rows, schema in (("users", users, UserOut), ("courses", courses, CourseOut)):
+        print(f"{label}:")
+        bench(
+            "pydantic model_validate + json.dumps",
+            lambda: json.dumps([schema.model_validate(r).model_dump(mode="json") for r in rows]).encode("utf-8"),
+            number,
+        )
+        bench("serialize_rows + json_dumps", lambda: json_dumps(serialize_rows(rows, schema)), number)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Нагрузочный бенчмарк POST /login: задержка (p50/p95/p99) и пропускная
+способность при параллельных входах.
+
+Приложение запускается в процессе (без uvicorn) на временной SQLite БД,
+Kafka не нужна: события отбрасываются при переполнении очереди.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_login
+    python -m benchmarks.bench_login --workers 0 --concurrency 32
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+
+def percentile(values, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+async def run(args):
+    import httpx
+    from app.main import app
+    from app.manage import init_db
+    from app.core.security import shutdown_executor
+
+    init_db()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        credentials = [
+            {"email": f"bench{i}@example.com", "password": f"password-{i}"}
+            for i in range(args.users)
+        ]
+        for i, creds in enumerate(credentials):
+            response = await client.post("/users", json={**creds, "name": f"Bench {i}", "age": 30})
+            response.raise_for_status()
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+        latencies = []
+
+        async def login(i: int):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post("/login", json=credentials[i % len(credentials)])
+                latencies.append(time.perf_counter() - started)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(login(i) for i in range(args.requests)))
+        elapsed = time.perf_counter() - started
+
+    shutdown_executor()
+
+    print(
+        f"workers={args.workers} concurrency={args.concurrency} requests={args.requests} "
+        f"scrypt n={os.environ['PASSWORD_SCRYPT_N']}"
+    )
+    print(f"  пропускная способность: {args.requests / elapsed:8.1f} входов/с")
+    print(f"  среднее:                {statistics.mean(latencies) * 1000:8.1f} мс")
+    for label, p in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99)):
+        print(f"  {label}:                    {percentile(latencies, p) * 1000:8.1f} мс")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2,
+                        help="процессов в пуле хэширования (0 - без пула)")
+    parser.add_argument("--concurrency", type=int, default=16, help="одновременных запросов")
+    parser.add_argument("--requests", type=int, default=200, help="всего входов")
+    parser.add_argument("--users", type=int, default=20, help="пользователей в БД")
+    parser.add_argument("--scrypt-n", type=int, default=16384, help="параметр стоимости scrypt")
+    args = parser.parse_args()
+
+    # Настройки читаются при импорте app, поэтому задаются до него
+    db_path = os.path.join(tempfile.mkdtemp(prefix="bench-login-"), "bench.db")
+    os.environ.update(
+        DB_URL=f"sqlite:///{db_path}",
+        PASSWORD_HASH_WORKERS=str(args.workers),
+        PASSWORD_SCRYPT_N=str(args.scrypt_n),
+        OUTBOX_RELAY_ENABLED="false",
+        KAFKA_OVERFLOW_POLICY="drop",
+        # Все запросы идут с одного адреса - лимиты на клиента исказили бы замер
+        RATE_LIMIT_ENABLED="false",
+    )
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Замена Kafka в памяти процесса для бенчмарков.
+
+Повторяет ту часть API KafkaProducer, которой пользуется приложение
+(send/flush/close и future с callbacks), сериализует события тем же
+кодеком и складывает их в списки по топикам.
+"""
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from app.core import kafka_producer
+from app.core.codecs import encode_event
+
+
+class RecordMetadata(NamedTuple):
+    topic: str
+    partition: int
+    offset: int
+
+
+class DeliveredFuture:
+    """Future уже доставленного сообщения (интерфейс kafka.future.Future)."""
+
+    is_done = True
+    exception = None
+
+    def __init__(self, metadata: RecordMetadata):
+        self.value = metadata
+
+    def succeeded(self) -> bool:
+        return True
+
+    def failed(self) -> bool:
+        return False
+
+    def get(self, timeout: Optional[float] = None) -> RecordMetadata:
+        return self.value
+
+    def add_callback(self, fn: Callable, *args, **kwargs) -> "DeliveredFuture":
+        fn(*args, self.value, **kwargs)
+        return self
+
+    def add_errback(self, fn: Callable, *args, **kwargs) -> "DeliveredFuture":
+        return self
+
+
+class InMemoryProducer:
+    """Producer, который "доставляет" сообщения в память."""
+
+    def __init__(self):
+        self.topics: Dict[str, List[Tuple[Optional[str], bytes]]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def send(self, topic: str, value: Dict[str, Any] = None, key: Optional[str] = None) -> DeliveredFuture:
+        data = encode_event(value)
+        with self._lock:
+            messages = self.topics[topic]
+            messages.append((key, data))
+            offset = len(messages) - 1
+        return DeliveredFuture(RecordMetadata(topic, 0, offset))
+
+    def flush(self, timeout: Optional[float] = None):
+        pass
+
+    def close(self, timeout: Optional[float] = None):
+        pass
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {topic: len(messages) for topic, messages in self.topics.items()}
+
+
+def install() -> InMemoryProducer:
+    """Подменить Kafka producer приложения на InMemoryProducer."""
+    producer = InMemoryProducer()
+    kafka_producer._producer = producer
+    return producer
@@ -0,0 +1,310 @@
+"""
+Нагрузочный бенчмарк всех основных эндпоинтов.
+
+Приложение запускается в процессе (ASGI-транспорт httpx) или под uvicorn
+на временной SQLite БД, Kafka заменяется хранилищем в памяти
+(benchmarks/fake_kafka.py). Смесь запросов к /users, /courses, /login и /me
+задаётся весами маршрутов; по каждому маршруту считаются пропускная
+способность и задержка p50/p95/p99.
+
+Запуск из корня проекта:
+    python -m benchmarks.load
+    python -m benchmarks.load --save-baseline benchmarks/baselines/load.json
+    python -m benchmarks.load --baseline benchmarks/baselines/load.json --threshold 0.25
+    python -m benchmarks.load --mode uvicorn --concurrency 64
+
+Код возврата 1, если хотя бы один маршрут хуже базовой линии больше,
+чем на --threshold (по метрике --metric).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, List, NamedTuple
+
+import httpx
+
+# Метрики, для которых "больше" - это хуже (для остальных - лучше)
+LATENCY_METRICS = {"mean_ms", "p50_ms", "p95_ms", "p99_ms"}
+
+
+class Route(NamedTuple):
+    name: str
+    weight: int
+    call: Callable[["LoadState", random.Random], Awaitable[httpx.Response]]
+
+
+class LoadState:
+    """Клиенты и данные, созданные при подготовке БД."""
+
+    def __init__(self, anonymous: httpx.AsyncClient, sessions: List[httpx.AsyncClient], admin: httpx.AsyncClient):
+        self.anonymous = anonymous
+        self.sessions = sessions
+        self.admin = admin
+        self.credentials: List[Dict[str, str]] = []
+        self.user_ids: List[int] = []
+        self.course_ids: List[int] = []
+        self.counter = 0
+
+    def unique(self) -> int:
+        self.counter += 1
+        return self.counter
+
+
+async def _create_user(state: LoadState, rnd: random.Random) -> httpx.Response:
+    n = state.unique()
+    return await state.anonymous.post("/users", json={
+        "email": f"load-new-{n}-{rnd.randrange(10 ** 9)}@example.com",
+        "name": f"Новый пользователь {n}", "age": 30, "password": "password-new",
+    })
+
+
+async def _create_course(state: LoadState, rnd: random.Random) -> httpx.Response:
+    n = state.unique()
+    return await state.admin.post("/courses", json={
+        "title": f"Новый курс {n}", "description": "Курс из нагрузочного теста",
+        "price": str(rnd.randint(0, 5000)),
+    })
+
+
+ROUTES = [
+    Route("GET /users", 15, lambda s, r: s.anonymous.get("/users", params={"limit": 50})),
+    Route("GET /users/{id}", 15, lambda s, r: s.anonymous.get(f"/users/{r.choice(s.user_ids)}")),
+    Route("POST /users", 3, _create_user),
+    Route("GET /courses", 20, lambda s, r: s.anonymous.get("/courses", params={"limit": 50})),
+    Route("GET /courses/{id}", 20, lambda s, r: s.anonymous.get(f"/courses/{r.choice(s.course_ids)}")),
+    Route("POST /courses", 2, _create_course),
+    Route("POST /login", 5, lambda s, r: s.anonymous.post("/login", json=r.choice(s.credentials))),
+    Route("GET /me", 20, lambda s, r: r.choice(s.sessions).get("/me")),
+]
+
+
+async def seed(state: LoadState, users: int, courses: int):
+    """Заполнить БД через API и залогинить клиентов."""
+    admin_creds = {"email": "load-admin@example.com", "password": "admin-password"}
+    response = await state.anonymous.post("/users", json={**admin_creds, "name": "Админ", "age": 40, "is_admin": True})
+    response.raise_for_status()
+    (await state.admin.post("/login", json=admin_creds)).raise_for_status()
+
+    state.credentials = [
+        {"email": f"load-{i}@example.com", "password": f"password-{i}"} for i in range(users)
+    ]
+    response = await state.anonymous.post("/users/bulk", json=[
+        {**creds, "name": f"Пользователь {i}", "age": 20 + i % 60}
+        for i, creds in enumerate(state.credentials)
+    ])
+    response.raise_for_status()
+    state.user_ids = [row["id"] for row in response.json()["results"] if row["status"] == "created"]
+
+    response = await state.admin.post("/courses/bulk", json=[
+        {"title": f"Курс {i}", "description": "Описание курса " * 10, "price": str(100 + i)}
+        for i in range(courses)
+    ])
+    response.raise_for_status()
+    state.course_ids = [row["id"] for row in response.json()["results"] if row["status"] == "created"]
+
+    for client, creds in zip(state.sessions, state.credentials):
+        (await client.post("/login", json=creds)).raise_for_status()
+
+
+def percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else 0.0
+
+
+async def drive(state: LoadState, requests: int, concurrency: int, seed_value: int) -> Dict[str, Dict[str, float]]:
+    """Выполнить requests запросов в concurrency параллельных потоков."""
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    weights = [route.weight for route in ROUTES]
+    remaining = iter(range(requests))
+
+    async def worker(worker_id: int):
+        rnd = random.Random(seed_value + worker_id)
+        for _ in remaining:
+            route = rnd.choices(ROUTES, weights)[0]
+            started = time.perf_counter()
+            try:
+                response = await route.call(state, rnd)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            latencies[route.name].append(time.perf_counter() - started)
+            errors[route.name] += int(failed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    report = {}
+    for route in ROUTES:
+        values = latencies.get(route.name)
+        if not values:
+            continue
+        report[route.name] = {
+            "count": len(values),
+            "errors": errors[route.name],
+            "throughput_rps": len(values) / elapsed,
+            "mean_ms": statistics.mean(values) * 1000,
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p95_ms": percentile(values, 0.95) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000,
+        }
+    report["total"] = {"count": requests, "elapsed_s": elapsed, "throughput_rps": requests / elapsed}
+    return report
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_uvicorn(app) -> str:
+    """Запустить uvicorn в фоновом потоке, вернуть базовый URL."""
+    import uvicorn
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True, name="uvicorn").start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+async def run(args) -> Dict:
+    from app.main import app
+    from app.manage import init_db
+    from app.core.security import shutdown_executor
+    from benchmarks import fake_kafka
+
+    init_db()
+    producer = fake_kafka.install()
+
+    if args.mode == "uvicorn":
+        base_url = start_uvicorn(app)
+        make_client = lambda: httpx.AsyncClient(base_url=base_url, timeout=60)
+    else:
+        transport = httpx.ASGITransport(app=app)
+        make_client = lambda: httpx.AsyncClient(transport=transport, base_url="http://load", timeout=60)
+
+    sessions = [make_client() for _ in range(min(args.sessions, args.users))]
+    state = LoadState(anonymous=make_client(), sessions=sessions, admin=make_client())
+    try:
+        await seed(state, args.users, args.courses)
+        if args.warmup:
+            await drive(state, args.warmup, args.concurrency, args.seed + 10 ** 6)
+        routes = await drive(state, args.requests, args.concurrency, args.seed)
+    finally:
+        for client in (state.anonymous, state.admin, *sessions):
+            await client.aclose()
+        shutdown_executor()
+
+    return {
+        "meta": {
+            "mode": args.mode,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "users": args.users,
+            "courses": args.courses,
+            "scrypt_n": int(os.environ["PASSWORD_SCRYPT_N"]),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "events_published": producer.counts(),
+        },
+        "routes": routes,
+    }
+
+
+def print_report(report: Dict):
+    meta = report["meta"]
+    print(f"mode={meta['mode']} requests={meta['requests']} concurrency={meta['concurrency']}")
+    print(f"{'маршрут':<18} {'запросов':>8} {'ошибок':>7} {'rps':>9} {'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9}")
+    for name, stats in report["routes"].items():
+        if name == "total":
+            continue
+        print(
+            f"{name:<18} {stats['count']:>8} {stats['errors']:>7} {stats['throughput_rps']:>9.1f} "
+            f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}"
+        )
+    total = report["routes"]["total"]
+    print(f"всего: {total['count']} запросов за {total['elapsed_s']:.2f} с ({total['throughput_rps']:.1f} rps)")
+
+
+def compare(report: Dict, baseline: Dict, metric: str, threshold: float) -> List[str]:
+    """Маршруты, которые хуже базовой линии больше чем на threshold."""
+    regressions = []
+    for name, stats in report["routes"].items():
+        base = baseline["routes"].get(name)
+        if not base or metric not in stats or metric not in base or not base[metric]:
+            continue
+        ratio = stats[metric] / base[metric]
+        worse = ratio > 1 + threshold if metric in LATENCY_METRICS else ratio < 1 - threshold
+        if worse:
+            regressions.append(f"{name}: {metric} {base[metric]:.2f} -> {stats[metric]:.2f} ({ratio - 1:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--requests", type=int, default=2000, help="запросов в замере")
+    parser.add_argument("--warmup", type=int, default=200, help="запросов на прогрев (не учитываются)")
+    parser.add_argument("--concurrency", type=int, default=16, help="одновременных запросов")
+    parser.add_argument("--users", type=int, default=200, help="пользователей в БД")
+    parser.add_argument("--courses", type=int, default=500, help="курсов в БД")
+    parser.add_argument("--sessions", type=int, default=20, help="залогиненных клиентов для /me")
+    parser.add_argument("--scrypt-n", type=int, default=16384, help="параметр стоимости scrypt")
+    parser.add_argument("--seed", type=int, default=42, help="seed смеси запросов")
+    parser.add_argument("--output", help="сохранить результат в JSON")
+    parser.add_argument("--save-baseline", help="сохранить результат как базовую линию")
+    parser.add_argument("--baseline", help="сравнить с базовой линией (JSON)")
+    parser.add_argument("--metric", default="p95_ms",
+                        choices=sorted(LATENCY_METRICS | {"throughput_rps"}), help="метрика сравнения")
+    parser.add_argument("--threshold", type=float, default=0.25, help="допустимое ухудшение (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    # Настройки читаются при импорте app, поэтому задаются до него
+    db_path = os.path.join(tempfile.mkdtemp(prefix="bench-load-"), "load.db")
+    os.environ.update(
+        DB_URL=f"sqlite:///{db_path}",
+        PASSWORD_SCRYPT_N=str(args.scrypt_n),
+        STATS_ENABLED="false",
+        KAFKA_OVERFLOW_POLICY="drop",
+        # Все запросы идут с одного адреса - лимиты на клиента исказили бы замер
+        RATE_LIMIT_ENABLED="false",
+    )
+
+    report = asyncio.run(run(args))
+    print_report(report)
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Результат сохранён в {path}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.metric, args.threshold)
+        if regressions:
+            print(f"\nРегрессия (порог {args.threshold:.0%}):")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nРегрессий нет (метрика {args.metric}, порог {args.threshold:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import admission
+from app.core.admission import AdmissionMiddleware, Limit, SQLiteRateLimitStore, parse_rules, take_token
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setattr(admission.settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(admission.settings, "RATE_LIMIT_BACKEND", "memory")
+    monkeypatch.setattr(admission.settings, "RATE_LIMIT_CLIENT_RULES", "POST /login=0.01/2")
+    monkeypatch.setattr(admission.settings, "RATE_LIMIT_ROUTE_RULES", "POST /login=0.01/3")
+    monkeypatch.setattr(admission.settings, "ADMISSION_MAX_CONCURRENCY", 0)
+    return monkeypatch
+
+
+def _client():
+    app = FastAPI()
+
+    @app.post("/login")
+    def login():
+        return {"ok": True}
+
+    @app.get("/users")
+    def users():
+        return []
+
+    middleware = AdmissionMiddleware(app)
+    return TestClient(middleware), middleware
+
+
+def _login(client, forwarded=None):
+    return client.post("/login", headers={"X-Forwarded-For": forwarded} if forwarded else {})
+
+
+def test_parse_rules():
+    assert parse_rules("POST /login/=1/10, GET /users=0.5") == {
+        "POST /login": Limit(1.0, 10.0),
+        "GET /users": Limit(0.5, 0.5),
+    }
+
+
+def test_take_token():
+    limit = Limit(rate=2, burst=2)
+    assert take_token(2, 0, 0, limit) == (1, 0)
+    tokens, retry_after = take_token(0, 0, 0, limit)
+    assert (tokens, retry_after) == (0, 0.5)
+    assert take_token(0, 0, 1, limit) == (1, 0)  # за секунду пополнилось 2 токена
+    assert take_token(0, 0, 0, Limit(0, 0))[1] == 3600.0
+
+
+def test_disabled_by_default(limits):
+    assert type(admission.settings).model_fields["RATE_LIMIT_ENABLED"].default is False
+    limits.setattr(admission.settings, "RATE_LIMIT_ENABLED", False)
+    client, _ = _client()
+    assert all(_login(client).status_code == 200 for _ in range(20))
+
+
+def test_client_limit_429_with_retry_after(limits):
+    client, _ = _client()
+    assert [_login(client).status_code for _ in range(3)] == [200, 200, 429]
+    response = _login(client)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    # Маршрут без правил не ограничивается
+    assert client.get("/users").status_code == 200
+
+
+def test_forwarded_client_only_when_trusted(limits):
+    client, _ = _client()
+    assert [_login(client, f"10.0.0.{i}").status_code for i in range(3)] == [200, 200, 429]
+
+    limits.setattr(admission.settings, "RATE_LIMIT_TRUST_FORWARDED", True)
+    limits.setattr(admission.settings, "RATE_LIMIT_ROUTE_RULES", "")
+    client, _ = _client()
+    assert [_login(client, f"10.0.0.{i}").status_code for i in range(5)] == [200] * 5
+    assert [_login(client, "10.0.0.9").status_code for _ in range(3)] == [200, 200, 429]
+
+
+def test_route_limit_shared_by_clients(limits):
+    limits.setattr(admission.settings, "RATE_LIMIT_TRUST_FORWARDED", True)
+    client, _ = _client()
+    statuses = [_login(client, f"10.0.0.{i}").status_code for i in range(4)]
+    assert statuses == [200, 200, 200, 429]
+
+
+def test_concurrency_limit_503(limits):
+    limits.setattr(admission.settings, "ADMISSION_MAX_CONCURRENCY", 1)
+    client, middleware = _client()
+    middleware.in_flight = 1  # один запрос уже обрабатывается
+    response = client.get("/users")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+    middleware.in_flight = 0
+    assert client.get("/users").status_code == 200
+    assert middleware.in_flight == 0
+
+
+def test_exempt_paths_not_limited(limits):
+    limits.setattr(admission.settings, "ADMISSION_MAX_CONCURRENCY", 1)
+    client, middleware = _client()
+    middleware.in_flight = 1
+    assert client.get("/metrics").status_code == 404  # не 503: маршрут не ограничивается
+
+
+def test_sqlite_store_shared_between_processes(limits, tmp_path):
+    path = str(tmp_path / "limits.db")
+    limits.setattr(admission.settings, "RATE_LIMIT_BACKEND", "sqlite")
+    limits.setattr(admission.settings, "RATE_LIMIT_SQLITE_PATH", path)
+    first, _ = _client()
+    second, _ = _client()
+    assert [_login(first).status_code, _login(second).status_code, _login(first).status_code] == [200, 200, 429]
+
+    limit = Limit(rate=0.01, burst=1)
+    store = SQLiteRateLimitStore(path)
+    assert store.acquire("key", limit) == 0
+    assert SQLiteRateLimitStore(path).acquire("key", limit) > 0
@@ -0,0 +1,114 @@
+import json
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core import backfill
+from app.core.backfill import REPLAY_FIELD, Backfill, backfill_event_id
+from app.core.config import settings
+from app.core.event_bus import InProcessBus
+from app.core.projections import StatsProjection
+from app.models.course import Course
+from app.models.user import User
+
+USERS = 7
+
+
+class FlakyBus(InProcessBus):
+    """Шина в памяти, которая принимает только первые accept событий."""
+
+    def __init__(self, accept: int | None = None):
+        super().__init__(maxsize=100)
+        self.accept = accept
+
+    def publish(self, topic, event, key=None):
+        if self.accept is not None:
+            if not self.accept:
+                return False
+            self.accept -= 1
+        return super().publish(topic, event, key)
+
+
+@pytest.fixture(autouse=True)
+def db(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    User.__table__.create(bind=engine)
+    Course.__table__.create(bind=engine)
+    with Session(engine) as session:
+        session.add_all([
+            User(id=i, email=f"user{i}@example.com", name=f"user{i}", age=30, password="-")
+            for i in range(1, USERS + 1)
+        ])
+        session.add(Course(id=1, title="Python", price=Decimal("10.00")))
+        session.commit()
+    monkeypatch.setattr(backfill, "ReadSessionLocal", sessionmaker(bind=engine))
+    yield
+    engine.dispose()
+
+
+@pytest.fixture
+def checkpoint_path(tmp_path):
+    return str(tmp_path / "checkpoint.json")
+
+
+def _received(consumer):
+    return [r.value for records in consumer.poll(max_records=100).values() for r in records]
+
+
+def test_resume_from_checkpoint(checkpoint_path):
+    bus = FlakyBus(accept=5)
+    consumer = bus.create_consumer(settings.KAFKA_TOPIC_USER_EVENTS)
+
+    with pytest.raises(RuntimeError):
+        Backfill(bus, checkpoint_path, batch_size=3).run(["users"])
+    assert [e["user_id"] for e in _received(consumer)] == [1, 2, 3, 4, 5]
+    with open(checkpoint_path) as f:
+        assert json.load(f) == {"users": 5}
+
+    bus.accept = None
+    assert Backfill(bus, checkpoint_path, batch_size=3).run(["users"]) == {"users": 2}
+    events = _received(consumer)
+    assert [e["user_id"] for e in events] == [6, 7]
+    assert events[0]["event_id"] == backfill_event_id(settings.KAFKA_TOPIC_USER_EVENTS, 6)
+
+    # Всё отправлено: повторный запуск ничего не шлёт
+    assert Backfill(bus, checkpoint_path).run(["users"]) == {"users": 0}
+
+
+def test_replay_marking_is_opt_in(checkpoint_path):
+    bus = InProcessBus(maxsize=100)
+    consumer = bus.create_consumer(settings.KAFKA_TOPIC_COURSE_EVENTS)
+
+    Backfill(bus, checkpoint_path).run(["courses"])
+    assert REPLAY_FIELD not in _received(consumer)[0]
+
+    Backfill(bus, checkpoint_path, mark_replay=True, run_id="marked").run(["courses"])
+    assert _received(consumer)[0][REPLAY_FIELD] is True
+
+
+def test_run_id_salts_event_ids_and_checkpoint(checkpoint_path):
+    bus = InProcessBus(maxsize=100)
+    consumer = bus.create_consumer(settings.KAFKA_TOPIC_USER_EVENTS)
+
+    Backfill(bus, checkpoint_path).run(["users"])
+    first = [e["event_id"] for e in _received(consumer)]
+    Backfill(bus, checkpoint_path, run_id="rerun").run(["users"])
+    second = [e["event_id"] for e in _received(consumer)]
+
+    assert len(second) == USERS
+    assert not set(first) & set(second)
+    assert second[0] == backfill_event_id(settings.KAFKA_TOPIC_USER_EVENTS, 1, "rerun")
+    with open(checkpoint_path) as f:
+        assert json.load(f) == {"users": USERS, "users@rerun": USERS}
+
+
+def test_projection_counts_backfill_unless_marked(tmp_path):
+    projection = StatsProjection(str(tmp_path / "stats.json"))
+    event = {"event_type": "user.created", "user_id": 1, "timestamp": "2024-01-01T12:00:00"}
+
+    projection.apply("user-events", 0, 0, event)
+    projection.apply("user-events", 0, 1, {**event, REPLAY_FIELD: True})
+    assert projection.signups_total == 1
+    assert projection.offset("user-events", 0) == 1
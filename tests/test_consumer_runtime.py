@@ -0,0 +1,144 @@
+import time
+from collections import defaultdict
+
+import pytest
+
+from app.core import consumer_runtime
+from app.core.config import settings
+from app.core.consumer_runtime import ConsumerRuntime, before_commit
+from app.core.event_bus import InProcessBus
+
+TOPIC = "user-events"
+GROUP = "group"
+
+
+@pytest.fixture(autouse=True)
+def fast(monkeypatch):
+    monkeypatch.setattr(settings, "CONSUMER_POLL_TIMEOUT_MS", 10)
+    monkeypatch.setattr(settings, "CONSUMER_RETRY_BACKOFF", 0.001)
+    monkeypatch.setattr(settings, "CONSUMER_COMMIT_INTERVAL", 0.0)
+    monkeypatch.setattr(settings, "CONSUMER_MAX_BATCH_RETRIES", 2)
+    monkeypatch.setattr(consumer_runtime, "_commit_hooks", defaultdict(list))
+
+
+@pytest.fixture
+def bus():
+    bus = InProcessBus(maxsize=1000)
+    # Очередь группы создаётся до публикации: события до подписки не доставляются
+    bus.create_consumer(TOPIC, group_id=GROUP)
+    return bus
+
+
+def _publish(bus, seqs, keys=1):
+    for seq in seqs:
+        key = f"k{seq % keys}"
+        assert bus.publish(TOPIC, {"event_type": "user.login", "seq": seq, "key": key}, key=key)
+
+
+def _wait(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "consumer не обработал события"
+        time.sleep(0.005)
+
+
+def test_key_order_kept_across_workers(bus):
+    handled = defaultdict(list)
+
+    def dispatcher(event):
+        if event["seq"] % 3 == 0:
+            time.sleep(0.001)
+        handled[event["key"]].append(event["seq"])
+
+    runtime = ConsumerRuntime(TOPIC, bus.create_consumer, group_id=GROUP, dispatcher=dispatcher, workers=4).start()
+    _publish(bus, range(40), keys=4)
+    _wait(lambda: sum(len(seqs) for seqs in handled.values()) == 40)
+    runtime.stop(timeout=5)
+
+    assert len(handled) == 4
+    for seqs in handled.values():
+        assert seqs == sorted(seqs)
+
+
+def test_failed_batch_retried_from_start(bus):
+    handled = []
+    failures = {"left": 2}
+
+    def dispatcher(event):
+        if event["seq"] == 3 and failures["left"]:
+            failures["left"] -= 1
+            raise RuntimeError("временная ошибка")
+        handled.append(event["seq"])
+
+    _publish(bus, range(5))
+    runtime = ConsumerRuntime(TOPIC, bus.create_consumer, group_id=GROUP, dispatcher=dispatcher, workers=1).start()
+    _wait(lambda: 4 in handled)
+    runtime.stop(timeout=5)
+
+    # Без индекса обработанных событий повтор пачки обрабатывает начало заново
+    assert handled == [0, 1, 2] * 2 + [0, 1, 2, 3, 4]
+
+
+def test_batch_skipped_after_retries(bus):
+    handled = []
+
+    def dispatcher(event):
+        if event["seq"] == 1:
+            raise RuntimeError("постоянная ошибка")
+        handled.append(event["seq"])
+
+    _publish(bus, range(3))
+    runtime = ConsumerRuntime(TOPIC, bus.create_consumer, group_id=GROUP, dispatcher=dispatcher, workers=1).start()
+    _wait(lambda: len(handled) == 3)
+    _publish(bus, [10])
+    _wait(lambda: 10 in handled)
+    runtime.stop(timeout=5)
+
+    # Попытка и CONSUMER_MAX_BATCH_RETRIES повторов, затем следующая пачка
+    assert handled == [0, 0, 0, 10]
+
+
+def _spy_factory(bus, log):
+    def factory(topic, group_id=None, rebalance_listener=None):
+        consumer = bus.create_consumer(topic, group_id=group_id)
+        commit = consumer.commit
+
+        def logged_commit():
+            log.append("commit")
+            commit()
+
+        consumer.commit = logged_commit
+        return consumer
+    return factory
+
+
+def test_commit_after_batch_and_hooks(bus):
+    log = []
+    before_commit(TOPIC)(lambda: log.append("hook"))
+
+    def dispatcher(event):
+        log.append(event["seq"])
+
+    runtime = ConsumerRuntime(TOPIC, _spy_factory(bus, log), group_id=GROUP, dispatcher=dispatcher, workers=1).start()
+    _publish(bus, range(3))
+    _wait(lambda: "commit" in log)
+    runtime.stop(timeout=5)
+
+    first_commit = log.index("commit")
+    assert log[first_commit - 1] == "hook"
+    assert set(log[:first_commit - 1]) <= {0, 1, 2}
+
+
+def test_commit_interval_defers_commit_to_stop(bus, monkeypatch):
+    monkeypatch.setattr(settings, "CONSUMER_COMMIT_INTERVAL", 100.0)
+    log = []
+
+    runtime = ConsumerRuntime(
+        TOPIC, _spy_factory(bus, log), group_id=GROUP, dispatcher=lambda event: log.append(event["seq"]), workers=1,
+    ).start()
+    _publish(bus, range(3))
+    _wait(lambda: len(log) == 3)
+    assert "commit" not in log
+
+    runtime.stop(timeout=5)
+    assert log == [0, 1, 2, "commit"]
@@ -0,0 +1,227 @@
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.core import consumer_runtime, dedup
+from app.core.config import settings
+from app.core.consumer_runtime import ConsumerRuntime
+from app.core.dedup import SeenIndex, event_key
+from app.core.event_bus import InProcessBus
+
+TOPIC = "user-events"
+DLQ = "user-events.dlq"
+GROUP = "group"
+
+
+class ProcessIndex(SeenIndex):
+    """Индекс "другого процесса": свои файлы поколений с номером pid."""
+
+    def __init__(self, pid: int, *args, **kwargs):
+        self.pid = pid
+        super().__init__(*args, **kwargs)
+
+    def _own_suffix(self) -> str:
+        return f".{self.pid}{dedup.FILE_SUFFIX}"
+
+
+@pytest.fixture
+def directory(tmp_path):
+    return str(tmp_path / "seen")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1_000_000.0)
+    monkeypatch.setattr(dedup, "time", SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+def _index(directory, pid=1, window=100.0, max_ids=1000):
+    return ProcessIndex(pid, directory, window=window, generations=10, max_ids=max_ids)
+
+
+def _files(directory):
+    return sorted(os.listdir(directory))
+
+
+def test_restart_loads_flushed_ids(directory):
+    index = _index(directory)
+    index.add("a" * 32)
+    index.add("event-b")
+    assert index.contains("event-b")
+    assert not _index(directory).contains("event-b")
+
+    index.flush()
+    restarted = _index(directory)
+    assert restarted.contains("a" * 32)
+    assert restarted.contains("event-b")
+    assert len(restarted) == 2
+
+
+def test_reload_reads_ids_of_other_process(directory):
+    first, second = _index(directory, pid=1), _index(directory, pid=2)
+    first.add("event-a")
+    first.flush()
+    assert not second.contains("event-a")
+
+    assert second.reload() == 1
+    assert second.contains("event-a")
+
+    # Дочитываются только новые байты
+    first.add("event-b")
+    first.flush()
+    assert second.reload() == 1
+    assert second.reload() == 0
+
+
+def test_partial_tail_read_later(directory):
+    index = _index(directory, pid=1)
+    index.add("event-a")
+    index.flush()
+    path = os.path.join(directory, _files(directory)[0])
+    key = event_key("event-b").to_bytes(8, "little")
+    with open(path, "ab") as f:
+        f.write(key[:3])
+
+    other = _index(directory, pid=2)
+    assert other.contains("event-a")
+    assert not other.contains("event-b")
+
+    with open(path, "ab") as f:
+        f.write(key[3:])
+    assert other.reload() == 1
+    assert other.contains("event-b")
+
+
+def test_max_ids_drops_only_own_file(directory, clock):
+    other = _index(directory, pid=2)
+    other.add("event-other")
+    other.flush()
+
+    index = _index(directory, pid=1, max_ids=2)
+    index.add("event-a")
+    index.flush()
+    clock.now += 10
+    index.add("event-b")
+    index.flush()
+    clock.now += 10
+    index.add("event-c")
+    index.flush()
+
+    # Самое старое поколение вытеснено из памяти и с диска, но только файл этого процесса
+    assert not index.contains("event-a")
+    assert not index.contains("event-other")
+    assert index.contains("event-c")
+    assert "1000000.2.ids" in _files(directory)
+    assert "1000000.1.ids" not in _files(directory)
+
+    # Вытесненное поколение не загружается обратно при reload
+    index.reload()
+    assert not index.contains("event-other")
+
+
+def test_expired_generations_removed_for_all(directory, clock):
+    for pid in (1, 2):
+        index = _index(directory, pid=pid)
+        index.add(f"event-{pid}")
+        index.flush()
+
+    clock.now += 200
+    assert not index.contains("event-2")
+    assert _files(directory) == []
+
+
+def test_rebalance_hands_over_seen_ids(directory):
+    bus = InProcessBus(maxsize=10)
+    consumer = bus.create_consumer(TOPIC, group_id=GROUP)
+    bus.publish(TOPIC, {"event_type": "user.login", "event_id": "event-a"})
+    record = consumer.poll()[consumer._tp][0]
+
+    handled = []
+    first = ConsumerRuntime(TOPIC, bus.create_consumer, group_id=GROUP,
+                            dispatcher=handled.append, seen_index=_index(directory, pid=1))
+    second = ConsumerRuntime(TOPIC, bus.create_consumer, group_id=GROUP,
+                             dispatcher=handled.append, seen_index=_index(directory, pid=2))
+
+    first._consumer = consumer
+    first._handle_once(record)
+    first._uncommitted = True
+    # Первый участник отдаёт партицию: отметки сохраняются до коммита offset'ов
+    first.on_partitions_revoked({consumer._tp})
+    assert not first._uncommitted
+
+    # Второй получает партицию и не обрабатывает событие повторно
+    second.on_partitions_assigned({consumer._tp})
+    second._handle_once(record)
+    assert len(handled) == 1
+
+
+@pytest.fixture
+def fast(monkeypatch):
+    monkeypatch.setattr(settings, "CONSUMER_POLL_TIMEOUT_MS", 10)
+    monkeypatch.setattr(settings, "CONSUMER_RETRY_BACKOFF", 0.001)
+    monkeypatch.setattr(settings, "CONSUMER_COMMIT_INTERVAL", 0.0)
+    monkeypatch.setattr(settings, "CONSUMER_MAX_BATCH_RETRIES", 2)
+
+
+def _wait(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "consumer не обработал события"
+        time.sleep(0.005)
+
+
+def test_retried_batch_not_handled_twice(directory, fast):
+    bus = InProcessBus(maxsize=100)
+    bus.create_consumer(TOPIC, group_id=GROUP)
+    handled = []
+    failures = {"left": 2}
+
+    def dispatcher(event):
+        if event["seq"] == 2 and failures["left"]:
+            failures["left"] -= 1
+            raise RuntimeError("временная ошибка")
+        handled.append(event["seq"])
+
+    for seq in range(4):
+        bus.publish(TOPIC, {"event_type": "user.login", "event_id": f"event-{seq}", "seq": seq})
+    runtime = ConsumerRuntime(TOPIC, bus.create_consumer, group_id=GROUP, dispatcher=dispatcher,
+                              workers=1, seen_index=_index(directory)).start()
+    _wait(lambda: 3 in handled)
+    runtime.stop(timeout=5)
+
+    assert handled == [0, 1, 2, 3]
+
+
+def test_failed_events_sent_to_dead_letter(directory, fast, monkeypatch):
+    bus = InProcessBus(maxsize=100)
+    monkeypatch.setattr(consumer_runtime, "get_event_bus", lambda: bus)
+    bus.create_consumer(TOPIC, group_id=GROUP)
+    dead_letters = bus.create_consumer(DLQ)
+    handled = []
+
+    def dispatcher(event):
+        if event["seq"] == 1:
+            raise RuntimeError("постоянная ошибка")
+        handled.append(event["seq"])
+
+    for seq in range(3):
+        bus.publish(TOPIC, {"event_type": "user.login", "event_id": f"event-{seq}", "seq": seq}, key=str(seq))
+    index = _index(directory)
+    runtime = ConsumerRuntime(TOPIC, bus.create_consumer, group_id=GROUP, dispatcher=dispatcher,
+                              workers=1, seen_index=index, dead_letter_topic=DLQ).start()
+    _wait(lambda: bus.highwater(DLQ) == 1)
+    runtime.stop(timeout=5)
+
+    # Остальные события пачки обработаны один раз, событие с ошибкой - в dead-letter топике
+    assert handled == [0, 2]
+    record = dead_letters.poll()[dead_letters._tp][0]
+    assert record.key == "1"
+    assert record.value["source_topic"] == TOPIC
+    assert record.value["offset"] == 1
+    assert "постоянная ошибка" in record.value["error"]
+    assert record.value["event"]["seq"] == 1
+    # Событие не отмечено обработанным: после redrive-dlq оно обработается заново
+    assert not index.contains("event-1")
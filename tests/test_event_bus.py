@@ -0,0 +1,115 @@
+import pytest
+
+from app.core import event_bus
+from app.core.event_bus import InProcessBus, LogBus, stamp_event
+
+TOPIC = "user-events"
+
+
+def _events(n, start=0):
+    return [(TOPIC, {"event_type": "user.created", "user_id": i}, str(i)) for i in range(start, start + n)]
+
+
+def _poll(consumer, max_records=100):
+    return [r for records in consumer.poll(timeout_ms=0, max_records=max_records).values() for r in records]
+
+
+def _ids(records):
+    return [r.value["user_id"] for r in records]
+
+
+@pytest.fixture
+def fast_timeout(monkeypatch):
+    monkeypatch.setattr(event_bus.settings, "KAFKA_ENQUEUE_TIMEOUT", 0.05)
+
+
+def test_inprocess_group_shares_queue_and_ungrouped_gets_copy():
+    bus = InProcessBus(maxsize=100)
+    first = bus.create_consumer(TOPIC, group_id="group")
+    second = bus.create_consumer(TOPIC, group_id="group")
+    ungrouped = bus.create_consumer(TOPIC)
+
+    assert bus.publish_batch(_events(3)) == 3
+    assert _ids(_poll(first, max_records=2)) + _ids(_poll(second)) == [0, 1, 2]
+    records = _poll(ungrouped)
+    assert _ids(records) == [0, 1, 2]
+    assert [r.offset for r in records] == [0, 1, 2]
+    assert bus.highwater(TOPIC) == 3
+
+
+def test_inprocess_seek_redelivers_batch():
+    bus = InProcessBus(maxsize=100)
+    consumer = bus.create_consumer(TOPIC)
+    bus.publish_batch(_events(3))
+
+    records = _poll(consumer)
+    consumer.seek(consumer._tp, records[1].offset)
+    assert _ids(_poll(consumer)) == [1, 2]
+    consumer.commit()
+    assert _poll(consumer) == []
+
+
+def test_inprocess_full_queue_delivers_to_nobody(fast_timeout):
+    bus = InProcessBus(maxsize=2)
+    fast = bus.create_consumer(TOPIC)
+    stalled = bus.create_consumer(TOPIC)
+
+    assert bus.publish_batch(_events(3)) == 2
+    # Быстрый подписчик не получает событие, которое не поместилось в очередь остановившегося
+    assert _ids(_poll(fast)) == [0, 1]
+    assert bus.highwater(TOPIC) == 2
+
+    # Повтор публикации после освобождения места - без дублей и с тем же offset'ом
+    _poll(stalled)
+    assert bus.publish_batch(_events(1, start=2)) == 1
+    fast_records, stalled_records = _poll(fast), _poll(stalled)
+    assert _ids(fast_records) == _ids(stalled_records) == [2]
+    assert fast_records[0].offset == stalled_records[0].offset == 2
+
+
+def test_inprocess_unsubscribed_queue_not_waited(fast_timeout):
+    bus = InProcessBus(maxsize=1)
+    consumer = bus.create_consumer(TOPIC)
+    consumer.close()
+    assert bus.publish_batch(_events(3)) == 3
+
+
+def test_log_bus_resumes_group_from_commit(tmp_path):
+    bus = LogBus(str(tmp_path), fsync=False)
+    try:
+        bus.publish_batch(_events(3))
+        consumer = bus.create_consumer(TOPIC, group_id="group", from_beginning=True)
+        assert _ids(_poll(consumer, max_records=2)) == [0, 1]
+        consumer.commit()
+        assert _ids(_poll(consumer)) == [2]
+
+        # Без commit последнее событие читается снова
+        restarted = bus.create_consumer(TOPIC, group_id="group")
+        assert _ids(_poll(restarted)) == [2]
+
+        # Новая группа без from_beginning читает только новые события
+        latest = bus.create_consumer(TOPIC, group_id="other")
+        bus.publish_batch(_events(1, start=3))
+        assert _ids(_poll(latest)) == [3]
+    finally:
+        bus.close()
+
+
+def test_log_bus_skips_partial_record(tmp_path):
+    bus = LogBus(str(tmp_path), fsync=False)
+    try:
+        bus.publish_batch(_events(1))
+        with open(bus.topic_path(TOPIC), "ab") as f:
+            f.write(b'{"key": "1", "ev')
+        consumer = bus.create_consumer(TOPIC, from_beginning=True)
+        assert _ids(_poll(consumer)) == [0]
+        assert _poll(consumer) == []
+    finally:
+        bus.close()
+
+
+def test_stamp_event_keeps_id_and_picks_key():
+    event, key = stamp_event({"event_type": "course.created", "course_id": 7})
+    assert key == "7"
+    assert event["event_id"]
+    assert stamp_event(event, "custom") == (event, "custom")
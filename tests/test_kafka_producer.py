@@ -0,0 +1,151 @@
+import json
+import os
+
+import pytest
+from kafka.errors import KafkaError, KafkaTimeoutError
+
+from app.core import kafka_producer
+
+TOPIC = "user-events"
+
+
+class Crash(BaseException):
+    """Падение процесса посреди переотправки."""
+
+
+class FakeFuture:
+    def __init__(self):
+        self.callbacks = []
+        self.errbacks = []
+
+    def add_callback(self, callback):
+        self.callbacks.append(callback)
+
+    def add_errback(self, errback):
+        self.errbacks.append(errback)
+
+
+class FakeProducer:
+    """Producer в памяти: подтверждения и ошибки доставки приходят на flush()."""
+
+    def __init__(self, reject=(), crash_after=None, flush_error=None):
+        self.reject = set(reject)
+        self.crash_after = crash_after
+        self.flush_error = flush_error
+        self.pending = []
+        self.sent = []
+
+    def send(self, topic, value=None, key=None):
+        if self.crash_after is not None and len(self.pending) >= self.crash_after:
+            raise Crash()
+        future = FakeFuture()
+        self.pending.append((value, future))
+        return future
+
+    def flush(self, timeout=None):
+        if self.flush_error is not None:
+            raise self.flush_error
+        pending, self.pending = self.pending, []
+        for value, future in pending:
+            if value["user_id"] in self.reject:
+                for errback in future.errbacks:
+                    errback(KafkaError("rejected"))
+            else:
+                self.sent.append(value["user_id"])
+                for callback in future.callbacks:
+                    callback(None)
+
+
+@pytest.fixture
+def spill_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "spill.jsonl")
+    monkeypatch.setattr(kafka_producer.settings, "KAFKA_SPILL_PATH", path)
+    monkeypatch.setattr(kafka_producer.settings, "KAFKA_OVERFLOW_POLICY", "spill")
+    return path
+
+
+def _use_producer(monkeypatch, producer):
+    monkeypatch.setattr(kafka_producer, "_producer", producer)
+    return producer
+
+
+def _items(ids):
+    return [(TOPIC, {"event_type": "user.login", "user_id": i}, str(i)) for i in ids]
+
+
+def _spilled(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line)["event"]["user_id"] for line in f]
+
+
+def test_replay_sends_spilled_events(spill_path, monkeypatch):
+    producer = _use_producer(monkeypatch, FakeProducer())
+    assert kafka_producer._spill(_items([1, 2, 3]))
+
+    kafka_producer._replay_spill()
+    assert producer.sent == [1, 2, 3]
+    assert not os.path.exists(spill_path)
+    assert not os.path.exists(spill_path + ".replay")
+
+
+def test_leftover_replay_file_sent_first(spill_path, monkeypatch):
+    producer = _use_producer(monkeypatch, FakeProducer())
+    kafka_producer._spill(_items([1, 2]))
+    os.replace(spill_path, spill_path + ".replay")
+    kafka_producer._spill(_items([3]))
+
+    # .replay от прерванного прохода не затирается новым файлом переполнения
+    kafka_producer._replay_spill()
+    assert producer.sent == [1, 2]
+    assert _spilled(spill_path) == [3]
+
+    kafka_producer._replay_spill()
+    assert producer.sent == [1, 2, 3]
+    assert not os.path.exists(spill_path)
+
+
+def test_crash_during_replay_keeps_file(spill_path, monkeypatch):
+    _use_producer(monkeypatch, FakeProducer(crash_after=1))
+    kafka_producer._spill(_items([1, 2, 3]))
+
+    with pytest.raises(Crash):
+        kafka_producer._replay_spill()
+    assert _spilled(spill_path + ".replay") == [1, 2, 3]
+
+    producer = _use_producer(monkeypatch, FakeProducer())
+    kafka_producer._replay_spill()
+    assert producer.sent == [1, 2, 3]
+    assert not os.path.exists(spill_path + ".replay")
+
+
+def test_unconfirmed_replay_keeps_file(spill_path, monkeypatch):
+    _use_producer(monkeypatch, FakeProducer(flush_error=KafkaTimeoutError()))
+    kafka_producer._spill(_items([1, 2]))
+
+    kafka_producer._replay_spill()
+    assert _spilled(spill_path + ".replay") == [1, 2]
+
+
+def test_rejected_events_spilled_again(spill_path, monkeypatch):
+    producer = _use_producer(monkeypatch, FakeProducer(reject={2}))
+    kafka_producer._spill(_items([1, 2, 3]))
+
+    # Событие из файла возвращается в файл даже после смены политики
+    monkeypatch.setattr(kafka_producer.settings, "KAFKA_OVERFLOW_POLICY", "drop")
+    kafka_producer._replay_spill()
+    assert producer.sent == [1, 3]
+    assert _spilled(spill_path) == [2]
+    assert not os.path.exists(spill_path + ".replay")
+
+
+def test_truncated_line_skipped(spill_path, monkeypatch):
+    producer = _use_producer(monkeypatch, FakeProducer())
+    kafka_producer._spill(_items([1]))
+    with open(spill_path, "a") as f:
+        f.write('{"topic": "user-events", "ev')
+
+    kafka_producer._replay_spill()
+    assert producer.sent == [1]
+    assert not os.path.exists(spill_path + ".replay")
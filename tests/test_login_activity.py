@@ -0,0 +1,129 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core import consumer_runtime, kafka_consumer, login_activity as login_activity_module
+from app.core.config import settings
+from app.core.consumer_runtime import ConsumerRuntime, before_commit
+from app.core.event_bus import InProcessBus
+from app.core.login_activity import LoginActivity
+from app.models.user import User
+
+T0 = datetime(2024, 1, 1, 12, 0)
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    User.__table__.create(bind=engine)
+    with Session(engine) as session:
+        session.add_all([
+            User(id=i, email=f"user{i}@example.com", name=f"user{i}", age=30, password="-")
+            for i in (1, 2, 3)
+        ])
+        session.commit()
+    monkeypatch.setattr(login_activity_module, "SessionLocal", sessionmaker(bind=engine))
+    yield engine
+    engine.dispose()
+
+
+def _users(engine):
+    with Session(engine) as session:
+        return {u.id: (u.login_count, u.last_login_at) for u in session.query(User).all()}
+
+
+def _logins():
+    return [(user_id, T0 + timedelta(minutes=i)) for i in range(10) for user_id in (1, 2)]
+
+
+def test_logins_coalesced_into_one_executemany(engine):
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE"):
+            statements.append((executemany, len(parameters)))
+
+    activity = LoginActivity()
+    for user_id, at in _logins():
+        activity.record(user_id, at)
+    assert len(activity) == 2
+
+    assert activity.flush() == 2
+    assert statements == [(True, 2)]
+    assert len(activity) == 0
+    users = _users(engine)
+    assert users[1] == users[2] == (10, T0 + timedelta(minutes=9))
+    assert users[3] == (0, None)
+    assert activity.flush() == 0
+
+
+def test_replay_after_crash_not_counted_twice(engine):
+    activity = LoginActivity()
+    for user_id, at in _logins():
+        activity.record(user_id, at)
+    activity.flush()
+
+    # Падение после flush() и до коммита offset'ов: новый процесс читает те же события
+    # и ещё один новый вход
+    restarted = LoginActivity()
+    for user_id, at in _logins() + [(1, T0 + timedelta(hours=1))]:
+        restarted.record(user_id, at)
+    assert restarted.flush() == 1
+
+    users = _users(engine)
+    assert users[1] == (11, T0 + timedelta(hours=1))
+    assert users[2] == (10, T0 + timedelta(minutes=9))
+
+
+def test_failed_flush_keeps_logins(engine, monkeypatch, tmp_path):
+    activity = LoginActivity()
+    activity.record(1, T0)
+
+    unavailable = create_engine(f"sqlite:///{tmp_path / 'missing' / 'test.db'}")
+    monkeypatch.setattr(login_activity_module, "SessionLocal", sessionmaker(bind=unavailable))
+    with pytest.raises(OperationalError):
+        activity.flush()
+    activity.record(1, T0 + timedelta(minutes=1))
+    assert len(activity) == 1
+
+    monkeypatch.setattr(login_activity_module, "SessionLocal", sessionmaker(bind=engine))
+    assert activity.flush() == 1
+    assert _users(engine)[1] == (2, T0 + timedelta(minutes=1))
+
+
+def test_login_flush_registered_only_for_user_events():
+    hooks = consumer_runtime._commit_hooks
+    assert kafka_consumer.flush_login_activity in hooks[settings.KAFKA_TOPIC_USER_EVENTS]
+    assert kafka_consumer.flush_login_activity not in hooks.get(settings.KAFKA_TOPIC_COURSE_EVENTS, ())
+
+
+def test_commit_runs_only_own_topic_hooks(monkeypatch):
+    monkeypatch.setattr(consumer_runtime, "_commit_hooks", defaultdict(list))
+    calls = []
+    before_commit("users")(lambda: calls.append("users"))
+    before_commit("courses")(lambda: calls.append("courses"))
+
+    bus = InProcessBus(maxsize=10)
+    for topic in ("courses", "users"):
+        runtime = ConsumerRuntime(topic, bus.create_consumer, group_id="group")
+        assert runtime._commit(bus.create_consumer(topic, group_id="group"))
+    assert calls == ["courses", "users"]
+
+
+def test_failed_hook_blocks_commit(monkeypatch):
+    monkeypatch.setattr(consumer_runtime, "_commit_hooks", defaultdict(list))
+
+    @before_commit("users")
+    def broken():
+        raise RuntimeError("БД недоступна")
+
+    bus = InProcessBus(maxsize=10)
+    runtime = ConsumerRuntime("users", bus.create_consumer, group_id="group")
+    runtime._uncommitted = True
+    assert not runtime._commit(bus.create_consumer("users", group_id="group"))
+    assert runtime._uncommitted
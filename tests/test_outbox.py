@@ -0,0 +1,158 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.core import outbox
+from app.core.event_bus import InProcessBus
+from app.core.outbox import add_outbox_event, prune_delivered, relay_batch
+from app.models.outbox import OutboxCheckpoint, OutboxEvent
+
+TOPIC = "user-events"
+
+
+class FlakyBus(InProcessBus):
+    """Шина в памяти, которая принимает только первые accept событий."""
+
+    def __init__(self, accept: int | None = None, on_publish=None):
+        super().__init__(maxsize=100)
+        self.accept = accept
+        self.on_publish = on_publish
+
+    def publish(self, topic, event, key=None):
+        if self.on_publish is not None:
+            self.on_publish()
+        if self.accept is not None:
+            if not self.accept:
+                return False
+            self.accept -= 1
+        return super().publish(topic, event, key)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # Короткое ожидание блокировки: запись, которая ждёт relay, сразу падает
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", connect_args={"timeout": 0.2})
+    OutboxEvent.__table__.create(bind=engine)
+    OutboxCheckpoint.__table__.create(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    with Session(engine) as session:
+        yield session
+
+
+def _use_bus(monkeypatch, bus):
+    monkeypatch.setattr(outbox, "get_event_bus", lambda: bus)
+    return bus.create_consumer(TOPIC)
+
+
+def _add(db, count, start=0):
+    for user_id in range(start, start + count):
+        add_outbox_event(db, TOPIC, {"event_type": "user.created", "user_id": user_id})
+    db.commit()
+
+
+def _received(consumer):
+    return [r.value["user_id"] for r in consumer.poll(max_records=100).get(consumer._tp, [])]
+
+
+def _pending(db):
+    return db.scalars(select(OutboxEvent.id).where(OutboxEvent.delivered_at.is_(None))).all()
+
+
+def test_relay_delivers_in_order(db, monkeypatch):
+    consumer = _use_bus(monkeypatch, FlakyBus())
+    _add(db, 5)
+
+    assert relay_batch(db) == 5
+    assert _received(consumer) == [0, 1, 2, 3, 4]
+    assert _pending(db) == []
+    assert relay_batch(db) == 0
+
+
+def test_relay_marks_only_delivered_prefix(db, monkeypatch):
+    bus = FlakyBus(accept=2)
+    consumer = _use_bus(monkeypatch, bus)
+    _add(db, 5)
+
+    assert relay_batch(db) == 2
+    assert _received(consumer) == [0, 1]
+    assert len(_pending(db)) == 3
+
+    bus.accept = None
+    assert relay_batch(db) == 3
+    assert _received(consumer) == [2, 3, 4]
+    assert _pending(db) == []
+
+
+def test_relay_batch_size(db, monkeypatch):
+    monkeypatch.setattr(outbox.settings, "OUTBOX_BATCH_SIZE", 2)
+    consumer = _use_bus(monkeypatch, FlakyBus())
+    _add(db, 3)
+
+    assert relay_batch(db) == 2
+    assert relay_batch(db) == 1
+    assert _received(consumer) == [0, 1, 2]
+
+
+def test_publish_outside_transaction(engine, db, monkeypatch):
+    """Пока relay ждёт брокер, запросы API могут писать в outbox."""
+    def write_during_publish():
+        with Session(engine) as other:
+            _add(other, 1, start=100)
+
+    bus = FlakyBus(on_publish=write_during_publish)
+    consumer = _use_bus(monkeypatch, bus)
+    _add(db, 1)
+
+    assert relay_batch(db) == 1
+    bus.on_publish = None
+    assert relay_batch(db) == 1
+    assert _received(consumer) == [0, 100]
+
+
+def test_single_relay_holds_lease(engine, db, monkeypatch):
+    consumer = _use_bus(monkeypatch, FlakyBus())
+    _add(db, 2)
+
+    monkeypatch.setattr(outbox, "_relay_owner", lambda: "host:1")
+    assert outbox.acquire_relay_lease(db)
+
+    # Relay другого процесса не пересылает, пока аренда действует
+    monkeypatch.setattr(outbox, "_relay_owner", lambda: "host:2")
+    with Session(engine) as other:
+        assert relay_batch(other) == 0
+    assert _received(consumer) == []
+
+    # ... и забирает её после истечения
+    db.get(OutboxCheckpoint, outbox.RELAY_NAME).lease_until = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+    with Session(engine) as other:
+        assert relay_batch(other) == 2
+    assert db.scalar(select(OutboxCheckpoint.owner)) == "host:2"
+
+
+def test_released_lease_taken_over(engine, db, monkeypatch):
+    monkeypatch.setattr(outbox, "_relay_owner", lambda: "host:1")
+    assert outbox.acquire_relay_lease(db)
+    outbox.release_relay_lease(db)
+
+    monkeypatch.setattr(outbox, "_relay_owner", lambda: "host:2")
+    assert outbox.acquire_relay_lease(db)
+
+
+def test_prune_delivered(db, monkeypatch):
+    _use_bus(monkeypatch, FlakyBus())
+    _add(db, 3)
+    relay_batch(db)
+    _add(db, 1, start=3)
+
+    monkeypatch.setattr(outbox.settings, "OUTBOX_RETENTION_SECONDS", -1)
+    assert prune_delivered(db) == 3
+    assert db.scalar(select(OutboxEvent.id)) is not None
+    assert len(_pending(db)) == 1
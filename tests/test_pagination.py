@@ -0,0 +1,168 @@
+from decimal import Decimal
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.core import catalog_cache
+from app.core.config import settings
+from app.core.enrollments import enrollments_next_cursor
+from app.core.listing import list_courses
+from app.core.pagination import (
+    decode_cursor, encode_cursor, keyset_select, next_cursor, NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER,
+)
+from app.dependencies import get_read_db
+from app.models.course import Course
+from app.models.user import User
+from app.routers import courses, enrollments, users
+from app.schemas.course import CourseOut
+
+PRICES = ["10.00", "5.50", "10.00", "0.00", "99.99", "5.50", "10.00"]
+TITLES = ["b", "a", "b", "c", "a", "Б", "b"]
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Course.__table__.create(bind=engine)
+    with Session(engine) as session:
+        session.add_all([
+            Course(id=i, title=title, price=Decimal(price))
+            for i, (title, price) in enumerate(zip(TITLES, PRICES), start=1)
+        ])
+        session.commit()
+        yield session
+    engine.dispose()
+
+
+def _walk(db, order_by, descending, limit):
+    """Пройти все страницы по курсорам, вернуть id в порядке выдачи."""
+    ids, cursor = [], None
+    for _ in range(len(PRICES) + 2):
+        stmt = keyset_select(Course, order_by=order_by, cursor=cursor, limit=limit, descending=descending)
+        rows = db.execute(stmt).scalars().all()
+        ids.extend(row.id for row in rows)
+        cursor = next_cursor(rows, order_by, limit, descending=descending)
+        if cursor is None:
+            return ids
+    pytest.fail("курсоры не закончились")
+
+
+@pytest.mark.parametrize("order_by", ["id", "price", "title"])
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("limit", [1, 2, 3, 7, 100])
+def test_keyset_round_trip(db, order_by, descending, limit):
+    courses_ = db.query(Course).all()
+    expected = sorted(courses_, key=lambda c: (getattr(c, order_by), c.id), reverse=descending)
+    assert _walk(db, order_by, descending, limit) == [c.id for c in expected]
+
+
+@pytest.mark.parametrize("order_by, value", [
+    ("id", 42),
+    ("price", Decimal("10.50")),
+    ("title", "Курс"),
+    ("-price", Decimal("0.01")),
+])
+def test_cursor_round_trip(order_by, value):
+    decoded, last_id = decode_cursor(encode_cursor(order_by, value, 7), order_by,
+                                     numeric=isinstance(value, Decimal))
+    assert (decoded, last_id) == (value, 7)
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor",
+    "",
+    "W10",  # []
+    encode_cursor("price", "10.00", "7"),
+    encode_cursor("price", "10.00", True),
+    encode_cursor("price", "abc", 1),
+    encode_cursor("price", "NaN", 1),
+    encode_cursor("price", None, 1),
+    encode_cursor("price", ["10.00"], 1),
+    encode_cursor("-price", "10.00", 1),  # курсор другой сортировки
+])
+def test_invalid_cursor(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor, "price", numeric=True)
+    assert exc.value.status_code == 400
+
+
+def test_invalid_price_cursor_in_select():
+    with pytest.raises(HTTPException) as exc:
+        keyset_select(Course, order_by="price", cursor=encode_cursor("price", "abc", 1))
+    assert exc.value.status_code == 400
+
+
+def test_list_courses_filters_and_total(db):
+    catalog_cache.invalidate_course()
+    filter_params = (Decimal("5"), Decimal("10"), "b")
+    courses_, headers = list_courses(db, CourseOut, None, filter_params, None, 2, order_by="price", descending=True)
+    assert [c.id for c in courses_] == [7, 3]
+    assert headers[TOTAL_COUNT_HEADER] == "3"
+
+    rest, headers = list_courses(db, CourseOut, None, filter_params, headers[NEXT_CURSOR_HEADER], 2,
+                                 order_by="price", descending=True)
+    assert [c.id for c in rest] == [1]
+    assert NEXT_CURSOR_HEADER not in headers
+
+    by_ids, headers = list_courses(db, CourseOut, [5, 2, 42], filter_params, None, 2)
+    assert [c.id for c in by_ids] == [5, 2]
+    assert headers == {}
+
+
+def test_next_cursor_empty_page():
+    assert next_cursor([], "id", 0) is None
+    assert next_cursor([], "id", 10) is None
+    assert enrollments_next_cursor([], "course_id", 0) is None
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(users.router)
+    app.include_router(courses.router)
+    app.include_router(enrollments.router)
+    app.dependency_overrides[get_read_db] = lambda: None
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("path", ["/users", "/courses"])
+@pytest.mark.parametrize("params", [
+    {"limit": 0},
+    {"limit": -1},
+    {"skip": -1},
+])
+def test_list_limit_validation(client, path, params):
+    assert client.get(path, params=params).status_code == 422
+
+
+@pytest.mark.parametrize("path", ["/users/1/courses", "/courses/1/students", "/courses/search?q=python"])
+@pytest.mark.parametrize("limit", [0, -1])
+def test_nested_list_limit_validation(client, path, limit):
+    assert client.get(path, params={"limit": limit}).status_code == 422
+
+
+def test_limit_above_max_clamped(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    User.__table__.create(bind=engine)
+    with Session(engine) as session:
+        session.add_all([
+            User(id=i, email=f"user{i}@example.com", name=f"user{i}", age=30, password="-")
+            for i in range(1, 6)
+        ])
+        session.commit()
+
+        app = FastAPI()
+        app.include_router(users.router)
+        app.dependency_overrides[get_read_db] = lambda: session
+        monkeypatch.setattr(settings, "PAGE_MAX_LIMIT", 3)
+
+        # Страница урезается до PAGE_MAX_LIMIT, остальное - по курсору
+        response = TestClient(app).get("/users", params={"limit": 10 ** 6})
+        assert response.status_code == 200
+        assert [u["id"] for u in response.json()] == [1, 2, 3]
+        assert NEXT_CURSOR_HEADER in response.headers
+    engine.dispose()
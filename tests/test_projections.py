@@ -0,0 +1,149 @@
+import json
+import time
+
+import pytest
+
+from app.core import projections
+from app.core.config import settings
+from app.core.event_bus import InProcessBus
+from app.core.projections import ProjectionRuntime, StatsProjection
+
+USERS = "user-events"
+COURSES = "course-events"
+
+
+@pytest.fixture(autouse=True)
+def buckets(monkeypatch):
+    monkeypatch.setattr(settings, "STATS_PRICE_BUCKETS", "10,100")
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "stats.json")
+
+
+def _signup(hour):
+    return {"event_type": "user.created", "timestamp": f"2024-01-01T{hour:02d}:15:00"}
+
+
+def _course(price, admin=1):
+    return {"event_type": "course.created", "price": price, "created_by": admin}
+
+
+def _fill(projection):
+    projection.apply(USERS, 0, 0, _signup(12))
+    projection.apply(USERS, 0, 1, _signup(12))
+    projection.apply(USERS, 0, 2, _signup(13))
+    projection.apply(USERS, 0, 3, {"event_type": "user.logged_in", "timestamp": "2024-01-01T13:00:00"})
+    for offset, price in enumerate([5, 50, 500]):
+        projection.apply(COURSES, 0, offset, _course(price, admin=offset % 2))
+
+
+def test_aggregates(path):
+    projection = StatsProjection(path)
+    _fill(projection)
+
+    stats = projection.snapshot()
+    assert stats["signups"] == {"total": 3, "per_hour": {"2024-01-01T12:00": 2, "2024-01-01T13:00": 1}}
+    assert stats["logins"]["total"] == 1
+    assert stats["courses_per_admin"] == {"0": 2, "1": 1}
+    assert stats["prices"] == {
+        "count": 3, "sum": 555.0, "mean": 185.0, "min": 5.0, "max": 500.0,
+        "histogram": {"<10": 1, "10-100": 1, ">=100": 1},
+    }
+
+
+def test_repeated_offset_skipped(path):
+    projection = StatsProjection(path)
+    projection.apply(USERS, 0, 0, _signup(12))
+    projection.apply(USERS, 0, 0, _signup(12))
+    projection.apply(USERS, 1, 0, _signup(12))
+    assert projection.signups_total == 2
+    assert projection.offset(USERS, 0) == 0
+
+
+def test_checkpoint_restores_state_and_offsets(path, monkeypatch):
+    monkeypatch.setattr(settings, "STATS_CHECKPOINT_INTERVAL", 100.0)
+    projection = StatsProjection(path)
+    _fill(projection)
+    projection.checkpoint(force=True)
+
+    # Без force сохранение не чаще STATS_CHECKPOINT_INTERVAL
+    projection.apply(USERS, 0, 4, _signup(14))
+    projection.checkpoint()
+
+    restarted = StatsProjection(path)
+    assert restarted.offset(USERS, 0) == 3
+    assert restarted.offset(COURSES, 0) == 2
+    assert restarted.signups_total == 3
+    assert restarted.snapshot()["prices"]["histogram"] == {"<10": 1, "10-100": 1, ">=100": 1}
+
+    # После перезапуска повтор уже учтённых событий не меняет агрегаты
+    _fill(restarted)
+    assert restarted.signups_total == 3
+
+
+def test_changed_buckets_rebuild(path, monkeypatch):
+    projection = StatsProjection(path)
+    _fill(projection)
+    projection.checkpoint(force=True)
+
+    monkeypatch.setattr(settings, "STATS_PRICE_BUCKETS", "10,50,100")
+    rebuilt = StatsProjection(path)
+    assert rebuilt.offset(USERS, 0) is None
+    assert rebuilt.signups_total == 0
+
+
+def test_hourly_retention(path, monkeypatch):
+    monkeypatch.setattr(settings, "STATS_HOURLY_RETENTION", 2)
+    projection = StatsProjection(path)
+    for offset, hour in enumerate([10, 11, 12, 13]):
+        projection.apply(USERS, 0, offset, _signup(hour))
+    projection.checkpoint(force=True)
+
+    with open(path) as f:
+        assert sorted(json.load(f)["signups_per_hour"]) == ["2024-01-01T12:00", "2024-01-01T13:00"]
+    assert projection.signups_total == 4
+
+
+def test_single_writer_and_reader_refresh(path):
+    writer, reader = StatsProjection(path), StatsProjection(path)
+    assert writer.acquire_writer()
+    assert not reader.acquire_writer()
+
+    writer.apply(USERS, 0, 0, _signup(12))
+    writer.checkpoint(force=True)
+    reader.refresh()
+    assert reader.signups_total == 1
+
+    # Писатель ведёт проекцию в памяти и файл не перечитывает
+    writer.refresh()
+    assert writer.live
+
+    writer.release_writer()
+    assert reader.acquire_writer()
+    reader.release_writer()
+
+
+def test_runtime_applies_records_and_checkpoints(path, monkeypatch):
+    monkeypatch.setattr(settings, "CONSUMER_POLL_TIMEOUT_MS", 10)
+    monkeypatch.setattr(settings, "STATS_CHECKPOINT_INTERVAL", 0.0)
+    projection = StatsProjection(path)
+    monkeypatch.setattr(projections, "projection", projection)
+
+    bus = InProcessBus(maxsize=100)
+    runtime = ProjectionRuntime(USERS, bus.create_consumer)
+    runtime.start()
+    deadline = time.monotonic() + 5
+    while not bus._subscribers.get(USERS):
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+    for hour in (12, 13):
+        bus.publish(USERS, _signup(hour))
+    while StatsProjection(path).signups_total < 2:
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+    runtime.stop(timeout=5)
+
+    assert projection.offset(USERS, bus.epoch) == 1
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app import auth
+from app.core import security
+from app.core.config import settings
+from app.core.security import check_password, hash_password, needs_rehash, verify_password
+from app.models.user import User
+
+
+@pytest.fixture(autouse=True)
+def cheap_scrypt(monkeypatch):
+    monkeypatch.setattr(settings, "PASSWORD_SCRYPT_N", 1024)
+    monkeypatch.setattr(settings, "PASSWORD_SCRYPT_R", 8)
+    monkeypatch.setattr(settings, "PASSWORD_SCRYPT_P", 1)
+    monkeypatch.setattr(settings, "PASSWORD_HASH_WORKERS", 0)
+
+
+def test_hash_and_verify():
+    stored = hash_password("secret")
+    assert stored.startswith("$scrypt$n=1024,r=8,p=1$")
+    assert stored != hash_password("secret")  # своя соль у каждого хэша
+    assert verify_password("secret", stored)
+    assert not verify_password("wrong", stored)
+    assert not needs_rehash(stored)
+
+
+def test_plaintext_password_verified_and_rehashed():
+    assert verify_password("secret", "secret")
+    assert not verify_password("wrong", "secret")
+    assert needs_rehash("secret")
+
+
+def test_corrupted_hash_rejected():
+    assert not verify_password("secret", "$scrypt$n=1024$broken")
+    assert not verify_password("$scrypt$n=1024$broken", "$scrypt$n=1024$broken")
+
+
+def test_weaker_params_need_rehash(monkeypatch):
+    stored = hash_password("secret")
+    monkeypatch.setattr(settings, "PASSWORD_SCRYPT_N", 2048)
+    assert needs_rehash(stored)
+    # Старые параметры хранятся в хэше, проверка работает и после их смены
+    assert verify_password("secret", stored)
+
+
+def test_check_password_returns_new_hash(monkeypatch):
+    stored = hash_password("secret")
+    assert asyncio.run(check_password("secret", stored)) == (True, None)
+    assert asyncio.run(check_password("wrong", stored)) == (False, None)
+
+    monkeypatch.setattr(settings, "PASSWORD_SCRYPT_N", 2048)
+    valid, new_hash = asyncio.run(check_password("secret", stored))
+    assert valid
+    assert new_hash.startswith("$scrypt$n=2048,")
+
+
+def test_process_pool(monkeypatch):
+    monkeypatch.setattr(settings, "PASSWORD_HASH_WORKERS", 1)
+    try:
+        stored = asyncio.run(security.hash_password_async("secret"))
+        assert asyncio.run(security.verify_password_async("secret", stored))
+        assert security.get_executor() is security.get_executor()
+    finally:
+        security.shutdown_executor()
+    assert security._executor is None
+
+
+def test_login_replaces_plaintext_password(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", connect_args={"check_same_thread": False})
+    User.__table__.create(bind=engine)
+    with Session(engine) as db:
+        db.add(User(id=1, email="user1@example.com", name="user1", age=30, password="secret"))
+        db.commit()
+
+        assert asyncio.run(auth.authenticate_user("user1@example.com", "wrong", db)) is None
+        assert db.get(User, 1).password == "secret"
+
+        assert asyncio.run(auth.authenticate_user("user1@example.com", "secret", db)).id == 1
+        stored = db.get(User, 1).password
+        assert stored.startswith("$scrypt$")
+        assert verify_password("secret", stored)
+    engine.dispose()
@@ -0,0 +1,124 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app import auth
+from app.core.cache import TTLCache
+from app.core.sessions import MemorySessionStore, SQLiteSessionStore
+from app.models.user import User
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    User.__table__.create(bind=engine)
+    with Session(engine) as session:
+        session.add(User(id=1, email="user1@example.com", name="user1", age=30, password="hash"))
+        session.commit()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    with Session(engine) as session:
+        yield session
+
+
+@pytest.fixture(autouse=True)
+def stores(monkeypatch):
+    monkeypatch.setattr(auth, "session_store", MemorySessionStore(maxsize=100, ttl=60))
+    monkeypatch.setattr(auth, "principal_cache", TTLCache(maxsize=100, ttl=60))
+
+
+def _count_selects(engine):
+    selects = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SELECT"):
+            selects.append(statement)
+
+    return selects
+
+
+@pytest.mark.parametrize("make_store", [
+    lambda tmp_path, ttl: MemorySessionStore(maxsize=10, ttl=ttl),
+    lambda tmp_path, ttl: SQLiteSessionStore(str(tmp_path / "sessions.db"), ttl=ttl),
+], ids=["memory", "sqlite"])
+def test_store_set_get_delete_and_expiry(tmp_path, make_store):
+    store = make_store(tmp_path, 60)
+    store.set("token", 1)
+    assert store.get("token") == 1
+    store.delete("token")
+    assert store.get("token") is None
+
+    expired = make_store(tmp_path, -1)
+    expired.set("old", 2)
+    assert expired.get("old") is None
+
+
+def test_sqlite_store_shared_between_workers(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    first, second = SQLiteSessionStore(path, ttl=60), SQLiteSessionStore(path, ttl=60)
+
+    first.set("token", 1)
+    assert second.get("token") == 1
+    second.delete("token")
+    assert first.get("token") is None
+
+
+def test_sqlite_store_purges_expired(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"), ttl=-1)
+    store.set("old", 1)
+    store.ttl = 60
+    store._last_purge = 0.0
+    store.set("new", 2)
+
+    rows = store._connection().execute("SELECT token FROM sessions").fetchall()
+    assert rows == [("new",)]
+
+
+def test_principal_cached_without_password(engine, db):
+    token = auth.create_session_token(1)
+    selects = _count_selects(engine)
+
+    user = auth.get_current_user(token, db)
+    assert user.email == "user1@example.com"
+    assert user.password is None
+    assert len(selects) == 1
+
+    assert auth.get_current_user(token, db) is user
+    assert len(selects) == 1
+
+
+def test_user_update_invalidates_principal(db):
+    token = auth.create_session_token(1)
+    auth.get_current_user(token, db)
+
+    db.get(User, 1).name = "renamed"
+    db.commit()
+    assert auth.get_current_user(token, db).name == "renamed"
+
+
+def test_logout_drops_session_and_principal(db):
+    token = auth.create_session_token(1)
+    auth.get_current_user(token, db)
+
+    auth.delete_session(token)
+    assert auth.principal_cache.get(1) is None
+    with pytest.raises(HTTPException) as exc:
+        auth.get_current_user(token, db)
+    assert exc.value.status_code == 401
+
+
+def test_deleted_user_session_removed(db):
+    token = auth.create_session_token(1)
+    db.delete(db.get(User, 1))
+    db.commit()
+
+    with pytest.raises(HTTPException) as exc:
+        auth.get_current_user(token, db)
+    assert exc.value.status_code == 401
+    assert auth.session_store.get(token) is None